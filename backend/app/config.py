@@ -0,0 +1,78 @@
+import os
+
+# Memory budget (bytes) for parsed datasets kept by the shared dataset registry
+DATASET_CACHE_MAX_BYTES = int(os.getenv("DATASET_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# Largest accepted upload (bytes); larger uploads are rejected with 413
+MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", str(5 * 1024 ** 3)))
+
+# Size of the chunks uploads are streamed to disk in
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 ** 2)))
+
+# CSV uploads larger than this (bytes) are ingested in chunks instead of
+# being loaded into memory at once
+CHUNKED_INGEST_THRESHOLD = int(os.getenv("CHUNKED_INGEST_THRESHOLD", str(512 * 1024 ** 2)))
+
+# Rows per chunk when reading CSV files in chunks
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "100000"))
+
+# Rows per Parquet row group of the columnar store. Filters skip row groups
+# whose min/max statistics rule out a match, so smaller groups skip more.
+STORE_ROW_GROUP_ROWS = int(os.getenv("STORE_ROW_GROUP_ROWS", "100000"))
+
+# Worker pools for CPU-bound work: threads for pandas/NumPy code that releases
+# the GIL, processes for pure-Python work such as Excel parsing
+THREAD_POOL_WORKERS = int(os.getenv("THREAD_POOL_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", str(os.cpu_count() or 1)))
+
+# Tasks allowed to wait for a free worker before new work is rejected with 503
+EXECUTOR_MAX_QUEUE = int(os.getenv("EXECUTOR_MAX_QUEUE", "64"))
+
+# Finished background jobs whose status and result are kept for polling
+JOB_HISTORY_LIMIT = int(os.getenv("JOB_HISTORY_LIMIT", "1000"))
+
+# Analysis results cache: recent results in memory, all results in SQLite.
+# Entries are keyed by upload content, so they outlive the uploads themselves.
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "data/cache/results.db")
+RESULT_CACHE_MEMORY_BYTES = int(os.getenv("RESULT_CACHE_MEMORY_BYTES", str(64 * 1024 ** 2)))
+RESULT_CACHE_DISK_BYTES = int(os.getenv("RESULT_CACHE_DISK_BYTES", str(1024 ** 3)))
+
+# Shrink loaded datasets (smaller numeric widths, categoricals for
+# low-cardinality text) before they are stored and cached
+OPTIMIZE_DTYPES = os.getenv("OPTIMIZE_DTYPES", "true").lower() in ("1", "true", "yes")
+
+# Keep numeric columns as memory-mapped .npy files shared by all worker processes
+MEMORY_MAP_COLUMNS = os.getenv("MEMORY_MAP_COLUMNS", "true").lower() in ("1", "true", "yes")
+
+# Uploaded CSV files record the byte offset of every Nth row so any page of
+# rows can be parsed without reading the rest of the file
+ROW_INDEX_INTERVAL = int(os.getenv("ROW_INDEX_INTERVAL", "1000"))
+
+# Catalog of ingested datasets (name, size, shape, schema, content hash).
+# It lives with the uploads so it is removed together with them.
+DATASET_CATALOG_PATH = os.getenv("DATASET_CATALOG_PATH", "data/uploads/.store/catalog.db")
+
+# Correlations are computed between blocks of this many columns at a time;
+# each pair of blocks is one matrix product on the thread pool
+CORRELATION_BLOCK_COLUMNS = int(os.getenv("CORRELATION_BLOCK_COLUMNS", "256"))
+
+# Text columns with more distinct values than this are left out of Cramér's V
+CORRELATION_MAX_CATEGORIES = int(os.getenv("CORRELATION_MAX_CATEGORIES", "100"))
+
+# Chart data: numeric columns are binned into this many histogram bins at
+# ingest, column pairs into a square grid of this many bins per axis and
+# lines into this many x buckets on first request. Zooms are answered from
+# these, so they bound the finest resolution. Bin counts are rounded up to
+# powers of two.
+VISUALIZATION_HISTOGRAM_BINS = int(os.getenv("VISUALIZATION_HISTOGRAM_BINS", "4096"))
+VISUALIZATION_DENSITY_BINS = int(os.getenv("VISUALIZATION_DENSITY_BINS", "256"))
+VISUALIZATION_LINE_BUCKETS = int(os.getenv("VISUALIZATION_LINE_BUCKETS", "4096"))
+
+# Sampled profiles draw this many rows by default. CSV files up to
+# SAMPLE_SCAN_BYTES are read in full through a reservoir; larger ones are
+# sampled in short runs of rows from random offsets in equal slices of the
+# file, so the time taken does not grow with the file. Confidence intervals
+# use SAMPLE_CONFIDENCE unless a request asks for another level.
+SAMPLE_ROWS = int(os.getenv("SAMPLE_ROWS", "10000"))
+SAMPLE_SCAN_BYTES = int(os.getenv("SAMPLE_SCAN_BYTES", str(256 * 1024 ** 2)))
+SAMPLE_CONFIDENCE = float(os.getenv("SAMPLE_CONFIDENCE", "0.95"))
@@ -1,13 +1,23 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import data_router, analysis_router
+from fastapi.responses import JSONResponse
+from .routers import data_router, analysis_router, jobs_router
 from .utils.file_handlers import start_cleanup_task
+from .utils.executors import thread_executor, process_executor
+from .utils.result_cache import result_cache
+from .utils.dataset_catalog import dataset_catalog
+from .utils.json_response import NumpyJSONResponse
+from .config import MAX_FILE_SIZE
 import asyncio
 
+# Allowance for multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
 app = FastAPI(
     title="Data Analysis API",
     description="API for data analysis and cleaning operations",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=NumpyJSONResponse
 )
 
 app.add_middleware(
@@ -18,14 +28,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Reject oversized uploads from the Content-Length header before the body is read
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_FILE_SIZE + MULTIPART_OVERHEAD:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"File too large. Maximum size is {MAX_FILE_SIZE} bytes"}
+        )
+    return await call_next(request)
+
 app.include_router(data_router.router, prefix="/api/v1/data", tags=["data"])
 app.include_router(analysis_router.router, prefix="/api/v1/analysis", tags=["analysis"])
+app.include_router(jobs_router.router, prefix="/api/v1/jobs", tags=["jobs"])
 
 @app.on_event("startup")
 async def startup_event():
     # Start the cleanup task
     asyncio.create_task(start_cleanup_task())
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Stop the worker pools
+    thread_executor.shutdown()
+    process_executor.shutdown()
+    result_cache.close()
+    dataset_catalog.close()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
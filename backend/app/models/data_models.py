@@ -1,6 +1,5 @@
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
-import numpy as np
 
 class DatasetMetadata(BaseModel):
     filename: str
@@ -30,19 +29,32 @@ class AnalysisResult(BaseModel):
     column_name: str
     analysis_type: str
     result: Dict[str, Any]
-    
-    class Config:
-        json_encoders = {
-            np.float64: float,
-            np.int64: int
-        }
+
+class ColumnAnalysisRequest(BaseModel):
+    columns: Optional[List[str]] = None
+    analysis_type: str = "full"
+
+class FilterRequest(BaseModel):
+    where: str
+    mode: str = "count"
+    columns: Optional[List[str]] = None
+    offset: int = 0
+    limit: int = 100
+
+class GroupByRequest(BaseModel):
+    keys: List[str]
+    aggregations: Dict[str, List[str]] = {}
+    sort_by: Optional[str] = None
+    descending: bool = False
+    offset: int = 0
+    limit: int = 100
 
 class VisualizationRequest(BaseModel):
     dataset_id: str
     chart_type: str
     x_column: str
-    y_column: Optional[str]
-    additional_params: Optional[dict]
+    y_column: Optional[str] = None
+    additional_params: Optional[dict] = None
 
 class MissingValueInfo(BaseModel):
     count: int
@@ -50,27 +62,18 @@ class MissingValueInfo(BaseModel):
 
 class ColumnAnalysis(BaseModel):
     basic_stats: Dict[str, Any]
-    numeric_stats: Optional[Dict[str, Any]]
-    categorical_stats: Optional[Dict[str, Any]]
-    
-    class Config:
-        json_encoders = {
-            np.float64: float,
-            np.int64: int
-        }
+    numeric_stats: Optional[Dict[str, Any]] = None
+    categorical_stats: Optional[Dict[str, Any]] = None
 
 class DatasetAnalysis(BaseModel):
-    basic_statistics: Dict[str, Dict[str, float]]
+    basic_statistics: Dict[str, Dict[str, Optional[float]]]
     missing_values: Dict[str, MissingValueInfo]
     total_rows: int
     total_columns: int
     column_analyses: Optional[Dict[str, ColumnAnalysis]]
-
-    class Config:
-        json_encoders = {
-            np.float64: float,
-            np.int64: int
-        }
+    # Set when the statistics come from a sample of the rows: how it was
+    # drawn and the confidence intervals of the estimates
+    sample: Optional[Dict[str, Any]] = None
 
 class DataQualityAnalysis(BaseModel):
     unique_counts: Dict[str, int]
@@ -79,9 +82,3 @@ class DataQualityAnalysis(BaseModel):
     null_counts: Dict[str, int]
     inconsistent_data: Dict[str, List[Any]]
     total_rows: int
-    
-    class Config:
-        json_encoders = {
-            np.float64: float,
-            np.int64: int
-        }
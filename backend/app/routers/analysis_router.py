@@ -1,16 +1,20 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import Dict, List, Any
-from ..models.data_models import AnalysisResult
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Any, Optional
+from ..models.data_models import AnalysisResult, ColumnAnalysisRequest, VisualizationRequest
 from ..services.analysis_service import AnalysisService
+from ..utils.jobs import job_manager
+from ..utils.json_response import NumpyJSONResponse, dumps
+from ..config import SAMPLE_ROWS, SAMPLE_CONFIDENCE
 
-router = APIRouter()
+router = APIRouter(default_response_class=NumpyJSONResponse)
 analysis_service = AnalysisService()
 
 @router.post("/analyze/{dataset_id}/{column_name}")
 async def analyze_column(
     dataset_id: str,
     column_name: str,
-    analysis_type: str = Query("full", description="Type of analysis to perform (full, basic, numeric, categorical)")
+    analysis_type: str = Query("full", description="Type of analysis to perform (full, basic, numeric, categorical, approximate)")
 ) -> AnalysisResult:
     """
     Analyze a specific column in the dataset
@@ -18,23 +22,56 @@ async def analyze_column(
     Parameters:
     - dataset_id: ID of the dataset to analyze
     - column_name: Name of the column to analyze
-    - analysis_type: Type of analysis to perform (default: "full")
+    - analysis_type: Type of analysis to perform (default: "full").
+      "approximate" answers from sketches built at upload and reports error bounds
     
     Returns:
     - Column analysis results including statistics and data quality metrics
     """
-    return await analysis_service.analyze_column(dataset_id, column_name, analysis_type)
+    return NumpyJSONResponse(await analysis_service.analyze_column(dataset_id, column_name, analysis_type))
+
+@router.post("/analyze/{dataset_id}")
+async def analyze_columns(
+    dataset_id: str,
+    request: Optional[ColumnAnalysisRequest] = None,
+    stream: bool = Query(False, description="Stream one JSON line per column as it finishes")
+):
+    """
+    Analyze several columns of the dataset, reading it only once
+    
+    Parameters:
+    - dataset_id: ID of the dataset to analyze
+    - request: Columns to analyze (default: all) and the analysis type, as for a single column
+    - stream: Return newline-delimited JSON, one line per column in the order they finish,
+      instead of a single response
+    
+    Returns:
+    - Analysis results of every column, and the error of any column that failed
+    """
+    request = request or ColumnAnalysisRequest()
+    if not stream:
+        return NumpyJSONResponse(await analysis_service.analyze_columns(dataset_id, request.columns, request.analysis_type))
+
+    _, results = await analysis_service.stream_column_analyses(dataset_id, request.columns, request.analysis_type)
+
+    async def lines():
+        async for column, result, error in results:
+            if error is not None:
+                yield dumps({"column_name": column, "analysis_type": request.analysis_type, "error": error}) + b"\n"
+            else:
+                yield dumps(result) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @router.get("/columns/{dataset_id}")
 async def get_columns(
-    dataset_id: str,
-    analysis_service: AnalysisService = Depends()
+    dataset_id: str
 ) -> Dict[str, Any]:
     """
     Get column names and their information
     """
     try:
-        return await analysis_service.get_column_names(dataset_id)
+        return NumpyJSONResponse(await analysis_service.get_column_names(dataset_id))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -43,17 +80,76 @@ async def get_columns(
             detail=f"Error retrieving columns: {str(e)}"
         )
 
+@router.get("/correlation/{dataset_id}")
+async def get_correlations(
+    dataset_id: str,
+    method: str = Query("pearson", description="Correlation method (pearson, spearman, cramers_v)"),
+    top_k: int = Query(50, ge=1, le=1000, description="Number of column pairs to return")
+) -> Dict[str, Any]:
+    """
+    Find the most strongly associated pairs of columns
+    
+    Parameters:
+    - dataset_id: ID of the dataset to analyze
+    - method: "pearson" or "spearman" for numeric columns, "cramers_v" for
+      categorical columns with up to CORRELATION_MAX_CATEGORIES distinct values
+    - top_k: Number of pairs to return, strongest (by absolute value) first
+    
+    Returns:
+    - The pairs with their value and the number of rows both columns fill,
+      and the columns left out because they have no variation
+    """
+    return NumpyJSONResponse(await analysis_service.get_correlations(dataset_id, method, top_k))
+
+@router.post("/visualization")
+async def get_visualization_data(request: VisualizationRequest) -> Dict[str, Any]:
+    """
+    Get the data of a chart, small enough to send whatever the dataset size
+    
+    Parameters:
+    - request: dataset_id, chart_type ("histogram" of x_column, "density" of
+      x_column and y_column binned together, or "line" of y_column over
+      x_column), and additional_params: bins (default 50), points (line,
+      default 500), x_range and y_range ([low, high] zoom windows)
+    
+    Returns:
+    - Histogram: bin edges and counts; density: x and y edges and a grid of
+      counts; line: x and y of the points kept by LTTB downsampling
+    """
+    return NumpyJSONResponse(await analysis_service.get_visualization_data(request))
+
 @router.get("/describe/{dataset_id}")
-async def describe_dataset(dataset_id: str) -> Dict[str, Any]:
+async def describe_dataset(
+    dataset_id: str,
+    mode: str = Query("exact", pattern="^(exact|sampled)$", description="Describe every row, or a random sample of the rows"),
+    sample_rows: int = Query(SAMPLE_ROWS, ge=1, le=1_000_000, description="Rows in the sample of a sampled description"),
+    confidence: float = Query(SAMPLE_CONFIDENCE, gt=0, lt=1, description="Confidence level of the intervals of a sampled description")
+) -> Dict[str, Any]:
     """
     Get descriptive statistics and missing value analysis for the dataset
+    
+    A sampled description answers from a random sample of the rows, kept
+    for the dataset so later sampled requests reuse it. Counts are scaled
+    to the whole dataset; `sample` describes how the rows were drawn and
+    gives confidence intervals of the number of rows, of each column's
+    missing percentage and mean, or of the share of its most common values.
     """
-    return await analysis_service.get_dataset_description(dataset_id)
+    if mode == "sampled":
+        return NumpyJSONResponse(await job_manager.run(
+            "describe", dataset_id,
+            lambda job: analysis_service.get_sampled_description(dataset_id, sample_rows, confidence),
+            params=(mode, sample_rows, confidence)
+        ))
+
+    # Identical requests in flight share one computation
+    return NumpyJSONResponse(await job_manager.run(
+        "describe", dataset_id,
+        lambda job: analysis_service.run_analysis("describe", dataset_id)
+    ))
 
 @router.get("/quality/{dataset_id}")
 async def analyze_data_quality(
-    dataset_id: str,
-    analysis_service: AnalysisService = Depends()
+    dataset_id: str
 ) -> Dict[str, Any]:
     """
     Analyze data quality issues in the dataset
@@ -67,10 +163,15 @@ async def analyze_data_quality(
         - Duplicate values count
         - Missing values count
         - Null values count
-        - Inconsistent data types
+        - Inconsistent data: numbers stored as text, mixed date formats and
+          mixed types, with the most frequent offending values
     """
     try:
-        return await analysis_service.analyze_data_quality(dataset_id)
+        # Identical requests in flight share one computation
+        return NumpyJSONResponse(await job_manager.run(
+            "quality", dataset_id,
+            lambda job: analysis_service.run_analysis("quality", dataset_id, job.report)
+        ))
     except HTTPException as e:
         raise e
     except Exception as e:
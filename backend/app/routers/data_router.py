@@ -1,18 +1,42 @@
-from fastapi import APIRouter, UploadFile, File, Depends, Query, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, UploadFile, File, Query, HTTPException
+from typing import Dict, Any, List, Optional
 import os
 
 from ..services.file_service import FileService
 from ..services.data_service import DataService
-from ..services.analysis_service import AnalysisService
+from ..utils.dataset_registry import dataset_registry
+from ..utils.executors import thread_executor, process_executor
+from ..utils.result_cache import result_cache
+from ..utils.column_store import read_store_json
+from ..utils.dtype_optimizer import OPTIMIZATION_FILE
+from ..utils.json_response import NumpyJSONResponse
+from ..utils.jobs import job_manager
+from ..config import SAMPLE_ROWS
+from ..models.data_models import FilterRequest, GroupByRequest
 
-router = APIRouter()
+router = APIRouter(default_response_class=NumpyJSONResponse)
 file_service = FileService()
+data_service = DataService()
+
+def queue_exact_profile(upload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Starts the full ingest and exact profile of a sampled upload as a
+    background job and returns the job
+    """
+    exact = dict(upload, sampled=False)
+    return job_manager.submit(
+        "upload", upload["dataset_id"],
+        lambda job: data_service.process_upload(exact, job.report),
+        params=("exact",)
+    ).to_dict()
+
 @router.post("/upload")
 async def upload_file(
     file: UploadFile = File(...),
-    data_service: DataService = Depends(),
-    analysis_service: AnalysisService = Depends()
+    ingest_mode: str = Query("auto", pattern="^(auto|memory|chunked)$", description="How to read the file: memory, chunked (bounded memory, CSV only) or auto"),
+    profile_mode: str = Query("exact", pattern="^(exact|sampled)$", description="Profile every row, or a random sample of the rows of a CSV for a quick first look"),
+    sample_rows: int = Query(SAMPLE_ROWS, ge=1, le=1_000_000, description="Rows in the sample of a sampled profile"),
+    exact_profile: bool = Query(True, description="After a sampled profile, ingest the file and profile it exactly in a background job")
 ):
     """Upload a file and analyze its columns"""
     try:
@@ -27,7 +51,10 @@ async def upload_file(
         os.makedirs("data/uploads", exist_ok=True)
 
         # Handle file upload
-        upload_result = await data_service.upload_file(file)
+        upload = await data_service.save_upload(file, ingest_mode, profile_mode, sample_rows)
+        upload_result = await data_service.process_upload(upload)
+        if upload["sampled"] and exact_profile:
+            upload_result["exact_profile_job"] = queue_exact_profile(upload)
         
         if not upload_result or "dataset_id" not in upload_result:
             raise HTTPException(
@@ -53,12 +80,12 @@ async def upload_file(
                 for col, stats in basic_stats.items()
             }
         
-        return {
+        return NumpyJSONResponse({
             "success": True,
             "message": "File uploaded and analyzed successfully",
             "dataset_info": upload_result,
             "analysis_results": analysis_results
-        }
+        })
 
     except HTTPException as e:
         raise e
@@ -68,16 +95,57 @@ async def upload_file(
             detail=f"Error during upload and analysis: {str(e)}"
         )
 
+@router.post("/append/{dataset_id}")
+async def append_rows(
+    dataset_id: str,
+    file: UploadFile = File(...)
+) -> Dict[str, Any]:
+    """
+    Append the rows of a file to an existing dataset
+
+    Parameters:
+    - dataset_id: ID of the dataset to extend
+    - file: CSV or Excel file with the dataset's columns
+
+    Returns:
+    - Number of rows appended, new shape, any widened column dtypes and the updated analysis;
+      only the new rows are profiled
+    """
+    try:
+        return NumpyJSONResponse(await data_service.append_rows(dataset_id, file))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error appending rows: {str(e)}"
+        )
+
 @router.get("/datasets")
-async def list_datasets():
+async def list_datasets(
+    search: Optional[str] = Query(default=None, description="Only datasets whose filename contains this text"),
+    file_format: Optional[str] = Query(default=None, alias="format", description="Only datasets of this file format (csv, xlsx, xls)"),
+    sort_by: str = Query(default="created", pattern="^(created|updated|filename|size|rows|columns)$", description="Field to sort by"),
+    order: str = Query(default="desc", pattern="^(asc|desc)$", description="Sort order"),
+    limit: Optional[int] = Query(default=None, ge=1, le=1000, description="Number of datasets to return (default: all)"),
+    offset: int = Query(default=0, ge=0, description="Number of datasets to skip")
+):
     """
     Get a list of all available datasets
     
+    Parameters:
+    - search, format: Filters on the filename and file format
+    - sort_by, order: Sort field (created, updated, filename, size, rows, columns) and order (asc, desc)
+    - limit, offset: Page of datasets to return; the X-Total-Count header holds the number of matching datasets
+
     Returns:
     - List of datasets with basic information
     """
     try:
-        return await file_service.list_datasets()
+        datasets, total = await file_service.list_datasets(search, file_format, sort_by, order == "desc", limit, offset)
+        return NumpyJSONResponse(datasets, headers={"X-Total-Count": str(total)})
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -103,7 +171,7 @@ async def get_dataset_head(
                 status_code=404, 
                 detail=f"Dataset '{dataset_id}' not found"
             )
-        return result
+        return NumpyJSONResponse(result)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -112,3 +180,150 @@ async def get_dataset_head(
             detail=f"Error retrieving dataset head: {str(e)}"
         )
 
+@router.get("/rows/{dataset_id}")
+async def get_dataset_rows(
+    dataset_id: str,
+    offset: int = Query(default=0, ge=0, description="Index of the first row to return"),
+    limit: int = Query(default=100, ge=1, le=10000, description="Number of rows to return"),
+    columns: Optional[List[str]] = Query(default=None, description="Columns to return (default: all)")
+) -> Dict[str, Any]:
+    """
+    Get a page of rows of a dataset
+
+    Parameters:
+    - dataset_id: ID of the dataset
+    - offset: Index of the first row (default: 0)
+    - limit: Number of rows to return (default: 100, max: 10000)
+    - columns: Columns to return, repeated once per column (default: all)
+    """
+    try:
+        return NumpyJSONResponse(await data_service.get_dataset_rows(dataset_id, offset, limit, columns))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving dataset rows: {str(e)}"
+        )
+
+@router.post("/filter/{dataset_id}")
+async def filter_rows(dataset_id: str, request: FilterRequest) -> Dict[str, Any]:
+    """
+    Get the rows of a dataset that match a filter
+
+    Parameters:
+    - dataset_id: ID of the dataset
+    - request:
+        - where: Filter such as `price >= 100 AND (region IN ('north', 'south') OR name CONTAINS 'n2')`;
+          supports =, !=, <, <=, >, >=, [NOT] IN, IS [NOT] NULL, [NOT] CONTAINS, AND, OR, NOT and parentheses.
+          Strings take single quotes, column names with spaces double quotes
+        - mode: "count" (default), "rows" for a page of matching rows, or "stats" for
+          the statistics of the matching rows
+        - columns: Columns to return or summarize (default: all)
+        - offset, limit: Page of matching rows in "rows" mode (default: first 100, max: 10000)
+
+    Returns:
+    - Number of matching rows and of row groups skipped using their statistics,
+      and the page of rows or the column statistics
+    """
+    try:
+        return NumpyJSONResponse(await data_service.filter_rows(dataset_id, request))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error filtering rows: {str(e)}"
+        )
+
+@router.post("/groupby/{dataset_id}")
+async def group_rows(dataset_id: str, request: GroupByRequest) -> Dict[str, Any]:
+    """
+    Group the rows of a dataset and aggregate columns per group
+
+    Parameters:
+    - dataset_id: ID of the dataset
+    - request:
+        - keys: Columns to group by; missing key values form a group of their own
+        - aggregations: Functions per value column, e.g. {"revenue": ["sum", "mean"]};
+          count, nunique, and for numeric columns sum, mean, min and max
+        - sort_by: Result column to sort the groups by (default: the keys)
+        - descending: Sort in descending order
+        - offset, limit: Page of groups to return (default: first 100, max: 10000)
+
+    Returns:
+    - Number of groups, and for each group of the page its keys, its number of rows
+      ("rows") and one "<column>_<function>" value per aggregation
+    """
+    try:
+        return NumpyJSONResponse(await data_service.group_rows(dataset_id, request))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error grouping rows: {str(e)}"
+        )
+
+@router.get("/duplicates/{dataset_id}")
+async def get_duplicate_rows(
+    dataset_id: str,
+    offset: int = Query(default=0, ge=0, description="Number of duplicate groups to skip"),
+    limit: int = Query(default=20, ge=1, le=1000, description="Number of duplicate groups to return")
+) -> Dict[str, Any]:
+    """
+    Get the rows that occur more than once in a dataset
+
+    Parameters:
+    - dataset_id: ID of the dataset
+    - offset, limit: Page of duplicate groups to return (default: first 20), ordered by their first row
+
+    Returns:
+    - Duplicate row and group counts, and for each group its row positions, size and values
+    """
+    try:
+        return NumpyJSONResponse(await data_service.get_duplicate_rows(dataset_id, offset, limit))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error finding duplicate rows: {str(e)}"
+        )
+
+@router.get("/optimization/{dataset_id}")
+async def get_dtype_optimization(dataset_id: str) -> Dict[str, Any]:
+    """
+    Get the dtype conversions applied to a dataset at load time and the bytes they saved
+    """
+    report = read_store_json(dataset_id, OPTIMIZATION_FILE)
+    if report is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No dtype optimization recorded for dataset '{dataset_id}'"
+        )
+    return report
+
+@router.get("/cache/stats")
+async def get_cache_stats() -> Dict[str, Any]:
+    """
+    Get memory usage and hit/miss/eviction counters of the shared dataset cache
+    """
+    return dataset_registry.stats()
+
+@router.get("/cache/results/stats")
+async def get_result_cache_stats() -> Dict[str, Any]:
+    """
+    Get size and hit/miss counters of the analysis result cache
+    """
+    return await thread_executor.run(result_cache.stats)
+
+@router.get("/workers/stats")
+async def get_worker_stats() -> Dict[str, Any]:
+    """
+    Get running and queued task counts of the worker pools
+    """
+    return {
+        "thread_pool": thread_executor.stats(),
+        "process_pool": process_executor.stats()
+    }
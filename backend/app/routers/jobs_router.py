@@ -0,0 +1,103 @@
+from fastapi import APIRouter, UploadFile, File, Query, HTTPException
+from typing import Dict, Any
+import os
+
+from ..utils.jobs import job_manager
+from ..utils.json_response import NumpyJSONResponse
+from ..config import SAMPLE_ROWS
+from .data_router import data_service, queue_exact_profile
+from .analysis_router import analysis_service
+
+router = APIRouter(default_response_class=NumpyJSONResponse)
+
+@router.post("/upload", status_code=202)
+async def start_upload_job(
+    file: UploadFile = File(...),
+    ingest_mode: str = Query("auto", pattern="^(auto|memory|chunked)$", description="How to read the file: memory, chunked (bounded memory, CSV only) or auto"),
+    profile_mode: str = Query("exact", pattern="^(exact|sampled)$", description="Profile every row, or a random sample of the rows of a CSV for a quick first look"),
+    sample_rows: int = Query(SAMPLE_ROWS, ge=1, le=1_000_000, description="Rows in the sample of a sampled profile"),
+    exact_profile: bool = Query(True, description="After a sampled profile, ingest the file and profile it exactly in a background job")
+) -> Dict[str, Any]:
+    """
+    Upload a file and profile it in the background
+    
+    The file is saved before the response is sent; parsing and profiling
+    continue as a job whose progress is available at /jobs/{job_id}.
+    A sampled profile's result names the job of the exact profile queued
+    after it, if any.
+    """
+    try:
+        # Validate file exists
+        if not file or not file.filename:
+            raise HTTPException(
+                status_code=400,
+                detail="No file provided"
+            )
+
+        # Create upload directory if it doesn't exist
+        os.makedirs("data/uploads", exist_ok=True)
+
+        upload = await data_service.save_upload(file, ingest_mode, profile_mode, sample_rows)
+
+        async def work(job):
+            result = await data_service.process_upload(upload, job.report)
+            if upload["sampled"] and exact_profile:
+                result["exact_profile_job"] = queue_exact_profile(upload)
+            return result
+
+        job = job_manager.submit("upload", upload["dataset_id"], work)
+        return job.to_dict()
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error starting upload: {str(e)}"
+        )
+
+@router.post("/{dataset_id}/{kind}", status_code=202)
+async def start_analysis_job(dataset_id: str, kind: str) -> Dict[str, Any]:
+    """
+    Start a dataset analysis in the background
+    
+    Parameters:
+    - dataset_id: ID of the dataset to analyze
+    - kind: describe, quality or columns (full analysis of every column)
+    
+    An identical job already running for the dataset is returned instead
+    of starting a new one.
+    """
+    if kind not in analysis_service.ANALYSIS_KINDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown analysis '{kind}'. Allowed analyses: {', '.join(analysis_service.ANALYSIS_KINDS)}"
+        )
+    if not (analysis_service.UPLOAD_DIR / dataset_id).exists():
+        raise HTTPException(
+            status_code=404,
+            detail=f"Dataset '{dataset_id}' not found"
+        )
+
+    job = job_manager.submit(
+        kind, dataset_id,
+        lambda job: analysis_service.run_analysis(kind, dataset_id, job.report)
+    )
+    return job.to_dict()
+
+@router.get("/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    """
+    Get the status and progress of a job
+    """
+    return job_manager.get(job_id).to_dict()
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str) -> Any:
+    """
+    Get the result of a finished job
+    
+    Returns 409 while the job is still running; a failed job returns the
+    error it failed with.
+    """
+    return NumpyJSONResponse(job_manager.result(job_manager.get(job_id)))
@@ -1,70 +1,69 @@
 import pandas as pd
-import numpy as np
 from fastapi import HTTPException
-from typing import Dict, List, Any
-from ..models.data_models import AnalysisResult
-from ..utils.file_handlers import read_dataset
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Any, Optional, Tuple
+from ..models.data_models import AnalysisResult, DataQualityAnalysis, VisualizationRequest
+from ..utils.file_handlers import read_dataset, read_dataset_columns, get_content_hash
 from pathlib import Path
 from ..services.file_service import FileService
+from ..utils.dataset_registry import dataset_registry
+from ..utils.column_profiler import get_dataset_profile
+from ..utils.sketches import build_dataset_sketches, save_dataset_sketches, load_dataset_sketches
+from ..utils.executors import thread_executor
+from ..utils.result_cache import result_cache
+from ..utils.quality_engine import analyze_quality
+from ..utils.correlation import CORRELATION_METHODS, top_correlations
+from ..utils.column_store import read_store_schema
+from ..utils.chart_data import CHART_TYPES, get_histograms, get_pair_chart, histogram, density, line
+from ..utils.row_sample import get_sample, profile_sample
 
 class AnalysisService:
+    # Dataset-wide analyses that can run as background jobs
+    ANALYSIS_KINDS = ("describe", "quality", "columns")
+
     def __init__(self):
         self.UPLOAD_DIR = Path("data/uploads")
-        self.datasets: Dict[str, pd.DataFrame] = {}
         self.file_service = FileService()
-        self.column_analyses: Dict[str, Dict[str, Any]] = {}
-
-    def _convert_to_native_types(self, value: Any) -> Any:
-        """Convert numpy types to native Python types"""
-        if isinstance(value, (np.int_, np.intc, np.intp, np.int8, np.int16, np.int32, np.int64)):
-            return int(value)
-        elif isinstance(value, (np.float_, np.float16, np.float32, np.float64)):
-            return float(value)
-        elif isinstance(value, np.bool_):
-            return bool(value)
-        elif isinstance(value, np.ndarray):
-            return self._convert_to_native_types(value.tolist())
-        elif isinstance(value, dict):
-            return {k: self._convert_to_native_types(v) for k, v in value.items()}
-        elif isinstance(value, (list, tuple)):
-            return [self._convert_to_native_types(item) for item in value]
-        return value
 
     async def get_column_names(self, dataset_id: str) -> Dict[str, Any]:
         """
         Get column names in different formats
         """
         try:
-            # Get dataset using file service
-            df = await self.file_service.get_stored_dataset(dataset_id)
+            # Names, dtypes and counts were recorded in the catalog at ingest
+            entry = await self.file_service.get_catalog_entry(dataset_id)
             
-            if df is None:
-                # If not in memory, try reading from file
-                file_path = self.UPLOAD_DIR / dataset_id
-                if not file_path.exists():
-                    raise HTTPException(
-                        status_code=404,
-                        detail=f"Dataset '{dataset_id}' not found"
-                    )
-                df = pd.read_csv(file_path) if str(file_path).endswith('.csv') else pd.read_excel(file_path)
+            if entry is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Dataset '{dataset_id}' not found"
+                )
+            
+            schema = entry["schema"]
+            if any("missing_count" not in column for column in schema):
+                # Entries catalogued without a profile
+                df = await self.file_service.get_stored_dataset(dataset_id)
+                profile = await thread_executor.run(get_dataset_profile, dataset_id, df)
+                schema = [
+                    dict(column, missing_count=profile[column["name"]]["missing"], unique_count=profile[column["name"]]["unique"])
+                    for column in schema
+                ]
             
-            columns = df.columns.tolist()
-            column_types = {col: str(df[col].dtype) for col in columns}
+            columns = [column["name"] for column in schema]
             
             return {
                 "success": True,
                 "message": "Columns retrieved successfully",
                 "data": {
                     "columns": columns,
-                    "column_types": column_types,
+                    "column_types": {column["name"]: column["type"] for column in schema},
                     "total_columns": len(columns),
                     "column_info": [
                         {
-                            "name": col,
-                            "type": str(df[col].dtype),
-                            "missing_count": int(df[col].isna().sum()),
-                            "unique_count": int(df[col].nunique())
-                        } for col in columns
+                            "name": column["name"],
+                            "type": column["type"],
+                            "missing_count": column["missing_count"],
+                            "unique_count": column["unique_count"]
+                        } for column in schema
                     ]
                 }
             }
@@ -76,82 +75,151 @@ class AnalysisService:
                 detail=f"Error retrieving columns: {str(e)}"
             )
 
+    async def _cached_result(self, dataset_id: str, endpoint: str, compute: Callable[[], Awaitable[Any]], column: str = "", analysis_type: str = "") -> Any:
+        """
+        Return a result from the shared result cache, computing and storing it
+        on a miss. Results are keyed by the content of the upload, so identical
+        files share them.
+        """
+        file_path = self.UPLOAD_DIR / dataset_id
+        if not file_path.exists():
+            # Let the computation report the missing dataset
+            return await compute()
+        
+        content_hash = await thread_executor.run(get_content_hash, file_path)
+        result = await result_cache.get_async(content_hash, endpoint, column, analysis_type)
+        if result is None:
+            result = await result_cache.put_async(content_hash, endpoint, await compute(), column, analysis_type)
+        return result
+
     async def get_dataset_description(self, dataset_id: str) -> Dict[str, Any]:
+        return await self._cached_result(dataset_id, "describe", lambda: self._compute_description(dataset_id))
+
+    async def _compute_description(self, dataset_id: str) -> Dict[str, Any]:
         try:
-            file_path = self.UPLOAD_DIR / dataset_id
-            df = read_dataset(file_path)
-            
-            # Get basic statistics using describe()
-            description = df.describe().to_dict()
-            
-            # Get missing values information
-            missing_values = df.isnull().sum().to_dict()
+            df = await self.file_service.get_stored_dataset(dataset_id)
+            if df is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Dataset '{dataset_id}' not found"
+                )
             
-            # Calculate percentage of missing values
-            missing_percentage = (df.isnull().sum() / len(df) * 100).to_dict()
+            return await thread_executor.run(self._describe_dataset, df)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error analyzing dataset: {str(e)}")
+
+    def _describe_dataset(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Compute the dataset description"""
+        # Get basic statistics using describe()
+        description = df.describe().to_dict()
+        
+        # Get missing values information
+        missing_values = df.isnull().sum().to_dict()
+        
+        # Calculate percentage of missing values
+        missing_percentage = (df.isnull().sum() / len(df) * 100).to_dict()
+        
+        return {
+            "basic_statistics": description,
+            "missing_values": {
+                "count": missing_values,
+                "percentage": missing_percentage
+            },
+            "total_rows": len(df),
+            "total_columns": len(df.columns)
+        }
+
+    async def get_sampled_description(self, dataset_id: str, sample_rows: int, confidence: float) -> Dict[str, Any]:
+        return await self._cached_result(
+            dataset_id, "describe",
+            lambda: self._compute_sampled_description(dataset_id, sample_rows, confidence),
+            analysis_type=f"sampled:{sample_rows}:{confidence}"
+        )
+
+    async def _compute_sampled_description(self, dataset_id: str, sample_rows: int, confidence: float) -> Dict[str, Any]:
+        try:
+            file_path = self.UPLOAD_DIR / dataset_id
+            if not file_path.exists():
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Dataset '{dataset_id}' not found"
+                )
             
-            return {
-                "basic_statistics": description,
-                "missing_values": {
-                    "count": missing_values,
-                    "percentage": missing_percentage
-                },
-                "total_rows": len(df),
-                "total_columns": len(df.columns)
-            }
+            # The sample kept for the dataset is reused when large enough
+            sample, info = await thread_executor.run(get_sample, dataset_id, file_path, sample_rows)
+            return await thread_executor.run(self._describe_sample, sample, info, confidence)
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error analyzing dataset: {str(e)}")
 
+    def _describe_sample(self, sample: pd.DataFrame, info: Dict[str, Any], confidence: float) -> Dict[str, Any]:
+        """
+        Compute the dataset description from a sample of its rows: counts are
+        scaled to the whole dataset and the sample's confidence intervals added
+        """
+        description = self._describe_dataset(sample)
+        profile, sample_description = profile_sample(sample, info, confidence)
+        total_rows = max(info["total_rows"], len(sample))
+        scale = total_rows / len(sample) if len(sample) else 0.0
+
+        for stats in description["basic_statistics"].values():
+            stats["count"] = float(round(stats["count"] * scale))
+        description["missing_values"]["count"] = {column: stats["missing"] for column, stats in profile.items()}
+        description["total_rows"] = total_rows
+        description["sample"] = sample_description
+        return description
+
+    async def run_analysis(self, kind: str, dataset_id: str, progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+        """
+        Run one of the dataset-wide analyses in ANALYSIS_KINDS
+        """
+        if kind == "describe":
+            return await self.get_dataset_description(dataset_id)
+        if kind == "quality":
+            return await self.analyze_data_quality(dataset_id, progress)
+        if kind == "columns":
+            return await self.analyze_all_columns(dataset_id, progress)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown analysis '{kind}'. Allowed analyses: {', '.join(self.ANALYSIS_KINDS)}"
+        )
+
     async def analyze_column(self, dataset_id: str, column_name: str, analysis_type: str) -> AnalysisResult:
+        result = await self._cached_result(
+            dataset_id, "analyze_column",
+            lambda: self._compute_column_analysis(dataset_id, column_name, analysis_type),
+            column_name, analysis_type
+        )
+        return AnalysisResult(**result)
+
+    async def _compute_column_analysis(self, dataset_id: str, column_name: str, analysis_type: str) -> AnalysisResult:
         try:
             file_path = self.UPLOAD_DIR / dataset_id
-            df = read_dataset(file_path)
-            
-            if column_name not in df.columns:
+            if not file_path.exists():
                 raise HTTPException(
                     status_code=404,
-                    detail=f"Column '{column_name}' not found in dataset"
+                    detail=f"Dataset '{dataset_id}' not found"
                 )
             
-            column_data = df[column_name]
-            result = {}
+            if analysis_type == "approximate":
+                return await self._approximate_column_analysis(dataset_id, column_name)
             
-            # Basic statistics for all types
-            result["basic_stats"] = {
-                "basic_statistics": {
-                    "count": int(len(column_data)),
-                    "unique_values": int(column_data.nunique()),
-                    "missing_values": int(column_data.isna().sum()),
-                    "missing_percentage": float(column_data.isna().sum() / len(column_data) * 100)
-                }
-            }
-            
-            # Type-specific analysis
-            if pd.api.types.is_numeric_dtype(column_data):
-                numeric_stats = {
-                    "mean": column_data.mean(),
-                    "median": column_data.median(),
-                    "std": column_data.std(),
-                    "min": column_data.min(),
-                    "max": column_data.max(),
-                    "quartiles": {
-                        "25%": column_data.quantile(0.25),
-                        "50%": column_data.quantile(0.50),
-                        "75%": column_data.quantile(0.75)
-                    },
-                    "skewness": column_data.skew(),
-                    "kurtosis": column_data.kurtosis()
-                }
-                result["numeric_stats"] = self._convert_to_native_types(numeric_stats)
+            # Uploads without a columnar copy are converted here, off the event loop
+            if column_name not in await thread_executor.run(read_dataset_columns, file_path):
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Column '{column_name}' not found in dataset"
+                )
             
-            elif pd.api.types.is_categorical_dtype(column_data) or column_data.dtype == 'object':
-                value_counts = column_data.value_counts()
-                categorical_stats = {
-                    "most_common_values": value_counts.head(5).to_dict(),
-                    "least_common_values": value_counts.tail(5).to_dict(),
-                    "value_distribution": (value_counts / len(column_data) * 100).head(5).to_dict()
-                }
-                result["categorical_stats"] = self._convert_to_native_types(categorical_stats)
+            # Use the shared copy if the dataset is loaded, otherwise read
+            # only the requested column from the columnar cache
+            df = dataset_registry.get(dataset_id)
+            if df is None:
+                df = await thread_executor.run(read_dataset, file_path, columns=[column_name])
+            result = await thread_executor.run(self._column_analysis, df[column_name])
             
             return AnalysisResult(
                 column_name=column_name,
@@ -159,40 +227,214 @@ class AnalysisService:
                 result=result
             )
             
+        except HTTPException as e:
+            raise e
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    async def analyze_all_columns(self, dataset_id: str) -> Dict[str, Any]:
-        """Analyze all columns in a dataset"""
-        try:
-            # Get dataset
+    @staticmethod
+    def _is_numeric(dtype: Any) -> bool:
+        """
+        Numbers get moments and quantiles; booleans are counted like
+        categories (NumPy cannot subtract them to compute moments)
+        """
+        return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+    @staticmethod
+    def _is_categorical(dtype: Any) -> bool:
+        """Columns analyzed by their value counts"""
+        return pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype) or dtype == 'object'
+
+    def _column_analysis(self, column_data: pd.Series) -> Dict[str, Any]:
+        """Compute the full analysis of one column"""
+        result = {}
+        
+        # Basic statistics for all types
+        result["basic_stats"] = {
+            "basic_statistics": {
+                "count": int(len(column_data)),
+                "unique_values": int(column_data.nunique()),
+                "missing_values": int(column_data.isna().sum()),
+                "missing_percentage": float(column_data.isna().sum() / len(column_data) * 100)
+            }
+        }
+        
+        # Type-specific analysis
+        if self._is_numeric(column_data.dtype):
+            numeric_stats = {
+                "mean": column_data.mean(),
+                "median": column_data.median(),
+                "std": column_data.std(),
+                "min": column_data.min(),
+                "max": column_data.max(),
+                "quartiles": {
+                    "25%": column_data.quantile(0.25),
+                    "50%": column_data.quantile(0.50),
+                    "75%": column_data.quantile(0.75)
+                },
+                "skewness": column_data.skew(),
+                "kurtosis": column_data.kurtosis()
+            }
+            result["numeric_stats"] = numeric_stats
+        
+        elif self._is_categorical(column_data.dtype):
+            value_counts = column_data.value_counts()
+            categorical_stats = {
+                "most_common_values": value_counts.head(5).to_dict(),
+                "least_common_values": value_counts.tail(5).to_dict(),
+                "value_distribution": (value_counts / len(column_data) * 100).head(5).to_dict()
+            }
+            result["categorical_stats"] = categorical_stats
+        
+        return result
+
+    async def _approximate_column_analysis(self, dataset_id: str, column_name: str) -> AnalysisResult:
+        """
+        Answer a column analysis from the sketches built at ingest.
+        Each approximate statistic is reported with its error bound.
+        """
+        sketches = await self._dataset_sketches(dataset_id)
+        if column_name not in sketches:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Column '{column_name}' not found in dataset"
+            )
+        
+        return AnalysisResult(
+            column_name=column_name,
+            analysis_type="approximate",
+            result=sketches[column_name].summary()
+        )
+
+    async def _dataset_sketches(self, dataset_id: str) -> Dict[str, Any]:
+        """Sketches of every column of a dataset"""
+        sketches = await thread_executor.run(load_dataset_sketches, dataset_id)
+        if sketches is None:
+            # Datasets uploaded before sketches existed are sketched once here
             df = await self.file_service.get_stored_dataset(dataset_id)
             if df is None:
                 raise HTTPException(
                     status_code=404,
                     detail=f"Dataset '{dataset_id}' not found"
                 )
-            
-            columns = df.columns.tolist()
-            analysis_results = {}
-            
-            for column in columns:
-                try:
-                    result = await self.analyze_column(dataset_id, column, "full")
-                    analysis_results[column] = result
-                except Exception as e:
-                    print(f"Error analyzing column {column}: {str(e)}")
-                    continue
-            
-            # Store analysis results in memory or database
-            self.column_analyses[dataset_id] = analysis_results
-            
+            sketches = await thread_executor.run(build_dataset_sketches, df)
+            await thread_executor.run(save_dataset_sketches, dataset_id, sketches)
+        return sketches
+
+    async def stream_column_analyses(
+        self,
+        dataset_id: str,
+        columns: Optional[List[str]],
+        analysis_type: str
+    ) -> Tuple[List[str], AsyncIterator[Tuple[str, Optional[AnalysisResult], Optional[str]]]]:
+        """
+        Analyze several columns (default: all) of a dataset.
+        The dataset and columns are checked here, so errors surface before the
+        first result. Returns the columns to analyze and an iterator yielding
+        (column, result, error) as each column finishes.
+        """
+        file_path = self.UPLOAD_DIR / dataset_id
+        if not file_path.exists():
+            raise HTTPException(
+                status_code=404,
+                detail=f"Dataset '{dataset_id}' not found"
+            )
+
+        all_columns = await thread_executor.run(read_dataset_columns, file_path)
+        columns = list(dict.fromkeys(columns)) if columns else all_columns
+        for column in columns:
+            if column not in all_columns:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Column '{column}' not found in dataset"
+                )
+
+        content_hash = await thread_executor.run(get_content_hash, file_path)
+        return columns, self._analyze_batch(dataset_id, content_hash, columns, analysis_type)
+
+    async def _analyze_batch(
+        self,
+        dataset_id: str,
+        content_hash: str,
+        columns: List[str],
+        analysis_type: str
+    ) -> AsyncIterator[Tuple[str, Optional[AnalysisResult], Optional[str]]]:
+        """
+        Yields cached column analyses first, then computes the others from one
+        read of the dataset, spread over the thread pool. Results are shared
+        with the single-column endpoint through the result cache.
+        """
+        pending = []
+        for column in columns:
+            cached = await result_cache.get_async(content_hash, "analyze_column", column, analysis_type)
+            if cached is not None:
+                yield column, AnalysisResult(**cached), None
+            else:
+                pending.append(column)
+        if not pending:
+            return
+
+        if analysis_type == "approximate":
+            sketches = await self._dataset_sketches(dataset_id)
+            for column in pending:
+                result = AnalysisResult(column_name=column, analysis_type=analysis_type, result=sketches[column].summary())
+                yield column, AnalysisResult(**await result_cache.put_async(content_hash, "analyze_column", result, column, analysis_type)), None
+            return
+
+        # One read for every column still to compute, unless the whole
+        # dataset is already loaded
+        df = dataset_registry.get(dataset_id)
+        if df is None:
+            df = await thread_executor.run(read_dataset, self.UPLOAD_DIR / dataset_id, columns=pending)
+
+        def analyze(column: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+            try:
+                return self._column_analysis(df[column]), None
+            except Exception as e:
+                return None, str(e)
+
+        async for column, (result, error) in thread_executor.as_completed(analyze, pending):
+            if error is not None:
+                yield column, None, error
+                continue
+            result = AnalysisResult(column_name=column, analysis_type=analysis_type, result=result)
+            yield column, AnalysisResult(**await result_cache.put_async(content_hash, "analyze_column", result, column, analysis_type)), None
+
+    async def analyze_columns(
+        self,
+        dataset_id: str,
+        columns: Optional[List[str]] = None,
+        analysis_type: str = "full",
+        progress: Optional[Callable[..., None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Analyze several columns (default: all) of a dataset in one response.
+        `progress(fraction, message)` is called after each column.
+        """
+        try:
+            columns, results = await self.stream_column_analyses(dataset_id, columns, analysis_type)
+            analyses: Dict[str, AnalysisResult] = {}
+            errors: Dict[str, str] = {}
+            done = 0
+            async for column, result, error in results:
+                if error is not None:
+                    print(f"Error analyzing column {column}: {error}")
+                    errors[column] = error
+                else:
+                    analyses[column] = result
+                done += 1
+                if progress:
+                    progress(done / len(columns), f"Analyzed {done} of {len(columns)} columns")
+
             return {
                 "success": True,
                 "dataset_id": dataset_id,
+                "analysis_type": analysis_type,
                 "total_columns": len(columns),
-                "analyzed_columns": len(analysis_results),
-                "column_analyses": analysis_results
+                "analyzed_columns": len(analyses),
+                # Listed in the order the columns were requested
+                "column_analyses": {column: analyses[column] for column in columns if column in analyses},
+                "errors": errors
             }
             
         except HTTPException as e:
@@ -203,8 +445,18 @@ class AnalysisService:
                 detail=f"Error analyzing dataset columns: {str(e)}"
             )
 
-    async def analyze_data_quality(self, dataset_id: str) -> Dict[str, Any]:
+    async def analyze_all_columns(self, dataset_id: str, progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+        """
+        Analyze all columns in a dataset.
+        `progress(fraction, message)` is called after each column.
+        """
+        return await self.analyze_columns(dataset_id, None, "full", progress)
+
+    async def analyze_data_quality(self, dataset_id: str, progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
         """Analyze data quality issues in the dataset"""
+        return await self._cached_result(dataset_id, "quality", lambda: self._compute_data_quality(dataset_id, progress))
+
+    async def _compute_data_quality(self, dataset_id: str, progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
         try:
             # Get dataset
             df = await self.file_service.get_stored_dataset(dataset_id)
@@ -214,46 +466,171 @@ class AnalysisService:
                     detail=f"Dataset '{dataset_id}' not found"
                 )
             
-            # Initialize results dictionary
-            quality_analysis = {
-                "unique_counts": {},
-                "duplicate_counts": {},
-                "missing_counts": {},
-                "null_counts": {},
-                "total_rows": len(df)
-            }
-            
-            # Analyze each column
-            for column in df.columns:
-                # Calculate unique values (excluding NaN/None/empty)
-                non_null_mask = ~(df[column].isna() | (df[column].astype(str).str.strip() == ''))
-                non_null_values = df.loc[non_null_mask, column]
-                quality_analysis["unique_counts"][column] = int(non_null_values.nunique())
-                
-                # Calculate duplicate values
-                value_counts = non_null_values.value_counts()
-                duplicates = value_counts[value_counts > 1].sum() - len(value_counts[value_counts > 1])
-                quality_analysis["duplicate_counts"][column] = int(duplicates)
-                
-                # Calculate missing values (NaN, None, empty strings)
-                missing_mask = (
-                    df[column].isna() | 
-                    (df[column].astype(str).str.strip() == '') | 
-                    (df[column].isnull())
-                )
-                quality_analysis["missing_counts"][column] = int(missing_mask.sum())
-                
-                # Calculate null values (specifically NaN and None)
-                null_mask = df[column].isnull()
-                quality_analysis["null_counts"][column] = int(null_mask.sum())
+            # Columns are checked in parallel, each in one fused pass
+            quality_analysis = await analyze_quality(df, progress)
             
             return {
                 "success": True,
-                "quality_analysis": quality_analysis
+                "quality_analysis": DataQualityAnalysis(**quality_analysis)
             }
 
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=str(e)
             )
+
+    async def get_correlations(self, dataset_id: str, method: str, top_k: int) -> Dict[str, Any]:
+        """
+        The top_k most strongly associated pairs of columns: Pearson or
+        Spearman correlation of numeric columns, Cramér's V of categorical ones
+        """
+        if method not in CORRELATION_METHODS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown correlation method '{method}'. Allowed methods: {', '.join(CORRELATION_METHODS)}"
+            )
+        return await self._cached_result(
+            dataset_id, "correlation", lambda: self._compute_correlations(dataset_id, method, top_k),
+            analysis_type=f"{method}:{top_k}"
+        )
+
+    async def _compute_correlations(self, dataset_id: str, method: str, top_k: int) -> Dict[str, Any]:
+        try:
+            file_path = self.UPLOAD_DIR / dataset_id
+            if not file_path.exists():
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Dataset '{dataset_id}' not found"
+                )
+
+            # Only the columns the method applies to are read
+            selected = self._is_categorical if method == "cramers_v" else self._is_numeric
+            df = dataset_registry.get(dataset_id)
+            if df is not None:
+                df = df[[column for column in df.columns if selected(df[column].dtype)]]
+            else:
+                await thread_executor.run(read_dataset_columns, file_path)
+                schema = await thread_executor.run(read_store_schema, dataset_id)
+                columns = [column for column, dtype in schema.items() if selected(pd.api.types.pandas_dtype(dtype))]
+                df = await thread_executor.run(read_dataset, file_path, columns=columns) if columns else pd.DataFrame()
+
+            correlations = await top_correlations(df, method, top_k)
+            return {
+                "success": True,
+                "dataset_id": dataset_id,
+                "top_k": top_k,
+                **correlations
+            }
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error computing correlations: {str(e)}"
+            )
+
+    async def get_visualization_data(self, request: VisualizationRequest) -> Dict[str, Any]:
+        """
+        Chart data for a column or column pair: a histogram of x, a binned
+        density of x and y, or a downsampled line of y over x. Everything is
+        summed from bins kept since ingest (histograms) or since the pair was
+        first charted (densities, lines), so zooming never rescans the data.
+
+        additional_params:
+        - bins: bins of a histogram, or per axis of a density (default 50)
+        - points: points of a line (default 500)
+        - x_range, y_range: [low, high] zoom window (default: whole range)
+        """
+        if request.chart_type not in CHART_TYPES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown chart type '{request.chart_type}'. Allowed chart types: {', '.join(CHART_TYPES)}"
+            )
+        file_path = self.UPLOAD_DIR / request.dataset_id
+        if not file_path.exists():
+            raise HTTPException(
+                status_code=404,
+                detail=f"Dataset '{request.dataset_id}' not found"
+            )
+
+        columns = [request.x_column]
+        if request.chart_type != "histogram":
+            if request.y_column is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"A {request.chart_type} chart needs a y_column"
+                )
+            columns.append(request.y_column)
+
+        all_columns = await thread_executor.run(read_dataset_columns, file_path)
+        histograms = await thread_executor.run(get_histograms, request.dataset_id)
+        for column in columns:
+            if column not in all_columns:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Column '{column}' not found in dataset"
+                )
+            if column not in histograms:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Column '{column}' is not numeric"
+                )
+
+        params = request.additional_params or {}
+        bins = self._chart_param(params, "bins", 50, 1, 512)
+        points = self._chart_param(params, "points", 500, 3, 5000)
+        x_window = self._chart_window(params, "x_range")
+        y_window = self._chart_window(params, "y_range")
+
+        try:
+            if request.chart_type == "histogram":
+                data = histogram(histograms, request.x_column, bins, x_window)
+            elif request.chart_type == "density":
+                grid = await thread_executor.run(get_pair_chart, request.dataset_id, "density", request.x_column, request.y_column, histograms)
+                data = density(grid, histograms[request.x_column]["range"], histograms[request.y_column]["range"], bins, x_window, y_window)
+            else:
+                reduced = await thread_executor.run(get_pair_chart, request.dataset_id, "line", request.x_column, request.y_column, histograms)
+                data = line(reduced, histograms[request.x_column]["range"], points, x_window)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error building chart data: {str(e)}"
+            )
+
+        return {
+            "success": True,
+            "dataset_id": request.dataset_id,
+            "chart_type": request.chart_type,
+            "x_column": request.x_column,
+            "y_column": request.y_column if request.chart_type != "histogram" else None,
+            **data
+        }
+
+    @staticmethod
+    def _chart_param(params: Dict[str, Any], name: str, default: int, low: int, high: int) -> int:
+        value = params.get(name, default)
+        if not isinstance(value, int) or isinstance(value, bool) or not low <= value <= high:
+            raise HTTPException(
+                status_code=400,
+                detail=f"'{name}' must be an integer between {low} and {high}"
+            )
+        return value
+
+    @staticmethod
+    def _chart_window(params: Dict[str, Any], name: str) -> Optional[Tuple[float, float]]:
+        window = params.get(name)
+        if window is None:
+            return None
+        if (
+            not isinstance(window, (list, tuple)) or len(window) != 2
+            or not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in window)
+            or not window[0] < window[1]
+        ):
+            raise HTTPException(
+                status_code=400,
+                detail=f"'{name}' must be [low, high] with low < high"
+            )
+        return float(window[0]), float(window[1])
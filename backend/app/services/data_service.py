@@ -2,8 +2,12 @@ from fastapi import HTTPException, UploadFile
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from datetime import datetime
+import asyncio
+import hashlib
+import shutil
+import os
 
 from ..models.data_models import (
     ColumnAnalysis,
@@ -12,139 +16,673 @@ from ..models.data_models import (
     DatasetMetadata,
     DataPreview,
     DatasetAnalysis,
-    MissingValueInfo
+    MissingValueInfo,
+    FilterRequest,
+    GroupByRequest
 )
+from ..utils.column_store import (
+    write_column_store,
+    delete_column_store,
+    write_store_json,
+    read_store_json,
+    read_store_rows,
+    read_store_take,
+    read_store_row_count,
+    read_store_schema,
+    read_column_store,
+    append_column_store
+)
+from ..utils.file_handlers import (
+    read_dataset,
+    read_dataset_columns,
+    stream_upload_to_disk,
+    record_content_hash,
+    get_content_hash,
+    find_dataset_by_hash,
+    sync_catalog,
+    read_workbook,
+    read_file_content,
+    sheet_dataset_id,
+    METADATA_FILE
+)
+from ..utils.dataset_registry import dataset_registry
+from ..utils.column_profiler import profile_dataset, get_dataset_profile
+from ..utils.chunked_profiler import (
+    profile_csv_in_chunks,
+    build_column_accumulators,
+    build_store_accumulators,
+    save_column_accumulators,
+    load_column_accumulators,
+    ColumnAccumulator
+)
+from ..utils.executors import thread_executor
+from ..utils.result_cache import result_cache
+from ..utils.dtype_optimizer import optimize_dtypes, OPTIMIZATION_FILE
+from ..utils.row_index import build_row_index, extend_row_index, load_row_index, read_csv_rows
+from ..utils.row_fingerprints import build_row_fingerprints, append_row_fingerprints, get_row_fingerprints, get_duplicate_groups
+from ..utils.chart_data import build_histograms, append_histograms
+from ..utils.row_filter import parse_filter, plan_row_groups, filter_positions
+from ..utils.group_index import AGGREGATIONS, NUMERIC_AGGREGATIONS, group_by
+from ..utils.row_sample import get_sample, delete_sample, profile_sample
+from ..utils.dataset_catalog import dataset_catalog
+from ..config import CHUNKED_INGEST_THRESHOLD, OPTIMIZE_DTYPES, SAMPLE_ROWS, SAMPLE_CONFIDENCE
+from .file_service import FileService
 
 class DataService:
+    # Appends to one dataset run one at a time
+    _append_locks: Dict[str, asyncio.Lock] = {}
+
     def __init__(self):
         self.UPLOAD_DIR = Path("data/uploads")
         self.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
         self.ALLOWED_EXTENSIONS = {'.csv', '.xlsx', '.xls'}
         self.MAX_PREVIEW_ROWS = 5
-        self.datasets: Dict[str, pd.DataFrame] = {}
 
-    async def upload_file(self, file: UploadFile) -> Dict[str, Any]:
-        """Handle file upload and initial processing"""
+    async def upload_file(self, file: UploadFile, ingest_mode: str = "auto", profile_mode: str = "exact", sample_rows: int = SAMPLE_ROWS) -> Dict[str, Any]:
+        """
+        Handle file upload and initial processing.
+        ingest_mode is "memory" (load the whole file), "chunked" (stream a CSV
+        in chunks with bounded memory) or "auto" (chunked for large CSV files).
+        profile_mode "sampled" profiles a random sample of sample_rows rows of
+        a CSV instead, without ingesting it.
+        """
         try:
-            # Validate file extension
-            file_extension = Path(file.filename).suffix.lower()
-            if file_extension not in self.ALLOWED_EXTENSIONS:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Unsupported file format. Allowed formats: {', '.join(self.ALLOWED_EXTENSIONS)}"
-                )
+            upload = await self.save_upload(file, ingest_mode, profile_mode, sample_rows)
+            return await self.process_upload(upload)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    async def save_upload(self, file: UploadFile, ingest_mode: str = "auto", profile_mode: str = "exact", sample_rows: int = SAMPLE_ROWS) -> Dict[str, Any]:
+        """
+        Validate an upload and stream it to disk.
+        Returns what process_upload needs to parse and profile it later.
+        """
+        # Validate file extension
+        file_extension = Path(file.filename).suffix.lower()
+        if file_extension not in self.ALLOWED_EXTENSIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported file format. Allowed formats: {', '.join(self.ALLOWED_EXTENSIONS)}"
+            )
+
+        # Create unique filename
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        safe_filename = f"{timestamp}_{file.filename}"
+        file_path = self.UPLOAD_DIR / safe_filename
 
-            # Create unique filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safe_filename = f"{timestamp}_{file.filename}"
-            file_path = self.UPLOAD_DIR / safe_filename
+        # Stream file to disk in chunks, under a temporary name so a
+        # duplicate never replaces the dataset it duplicates
+        tmp_path = self.UPLOAD_DIR / f".{safe_filename}.part"
+        file_size, content_hash = await stream_upload_to_disk(file, tmp_path)
 
-            # Save file
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
+        # Identical content maps to the dataset already holding it
+        existing_id = await thread_executor.run(find_dataset_by_hash, content_hash, self.UPLOAD_DIR)
+        if existing_id is not None:
+            tmp_path.unlink()
+            return {
+                "dataset_id": existing_id,
+                "file_path": self.UPLOAD_DIR / existing_id,
+                "filename": file.filename,
+                "file_size": file_size,
+                "content_hash": content_hash,
+                "chunked": False,
+                "sampled": False,
+                "sample_rows": sample_rows,
+                "duplicate": True
+            }
+
+        if ingest_mode == "auto":
+            use_chunks = file_extension == '.csv' and file_size > CHUNKED_INGEST_THRESHOLD
+        else:
+            use_chunks = ingest_mode == "chunked"
+
+        if use_chunks and file_extension != '.csv':
+            tmp_path.unlink()
+            raise HTTPException(
+                status_code=400,
+                detail="Chunked ingest is only supported for CSV files"
+            )
 
-            # Read and validate data
+        if profile_mode == "sampled" and file_extension != '.csv':
+            tmp_path.unlink()
+            raise HTTPException(
+                status_code=400,
+                detail="Sampled profiles are only supported for CSV files"
+            )
+
+        tmp_path.replace(file_path)
+        record_content_hash(safe_filename, content_hash)
+
+        return {
+            "dataset_id": safe_filename,
+            "file_path": file_path,
+            "filename": file.filename,
+            "file_size": file_size,
+            "content_hash": content_hash,
+            "chunked": use_chunks,
+            "sampled": profile_mode == "sampled",
+            "sample_rows": sample_rows,
+            "duplicate": False
+        }
+
+    async def process_upload(self, upload: Dict[str, Any], progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+        """
+        Parse, store and profile a file saved by save_upload.
+        `progress(fraction, message)` is called as the work advances.
+        """
+        report = progress or (lambda *args: None)
+
+        if upload["duplicate"]:
+            return await self._reuse_dataset(upload)
+
+        if upload["sampled"]:
+            # Nothing is ingested yet, so the analysis is not cached for
+            # later uploads of the same content
+            return await self._profile_sample(upload, report)
+
+        if upload["chunked"]:
+            result = await self._ingest_in_chunks(upload, report)
+        else:
+            result = await self._ingest_in_memory(upload, report)
+
+        # Later uploads of the same content reuse this dataset and its analysis
+        await result_cache.put_async(upload["content_hash"], "upload", result["analysis"])
+        await thread_executor.run(
+            dataset_catalog.record,
+            upload["dataset_id"],
+            filename=upload["filename"],
+            size=upload["file_size"],
+            content_hash=upload["content_hash"],
+            profile=dataset_registry.get(upload["dataset_id"], "profile"),
+            sheet_name=result["sheets"][0]["sheet_name"] if result["sheets"] else None
+        )
+        return result
+
+    async def _reuse_dataset(self, upload: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer a duplicate upload from the dataset that already holds its content"""
+        dataset_id = upload["dataset_id"]
+        cached = await result_cache.get_async(upload["content_hash"], "upload")
+        if cached is not None:
+            analysis = DatasetAnalysis(**cached)
+        else:
+            analysis = await self.analyze_dataset(await self.get_dataset(dataset_id), dataset_id=dataset_id)
+
+        return {
+            "success": True,
+            "dataset_id": dataset_id,
+            "filename": upload["filename"],
+            "file_size": upload["file_size"],
+            "content_hash": upload["content_hash"],
+            "ingest_mode": "deduplicated",
+            "rows": analysis.total_rows,
+            "columns": analysis.total_columns,
+            "sheets": (read_store_json(dataset_id, METADATA_FILE) or {}).get("sheets"),
+            "memory_optimization": read_store_json(dataset_id, OPTIMIZATION_FILE),
+            "analysis": analysis
+        }
+
+    async def _profile_sample(self, upload: Dict[str, Any], report: Callable[..., None]) -> Dict[str, Any]:
+        """
+        Profile a random sample of a CSV's rows for a first look. The sample
+        is kept so later sampled analyses reuse it; the full ingest can run
+        afterwards with the upload marked as not sampled.
+        """
+        file_path = upload["file_path"]
+        dataset_id = upload["dataset_id"]
+        report(0.0, "Sampling rows")
+        try:
+            sample, info = await thread_executor.run(get_sample, dataset_id, file_path, upload["sample_rows"], progress=lambda fraction: report(0.9 * fraction))
+        except Exception as e:
+            file_path.unlink()  # Delete file if reading fails
+            delete_column_store(dataset_id)
+            raise HTTPException(
+                status_code=400,
+                detail=f"Error reading file: {str(e)}"
+            )
+
+        report(0.9, "Profiling sample")
+        profile, description = await thread_executor.run(profile_sample, sample, info, SAMPLE_CONFIDENCE)
+        total_rows = max(info["total_rows"], len(sample))
+        analysis = self._build_analysis(profile, total_rows)
+        analysis.sample = description
+
+        # Catalogued with the sample's shape until the exact profile replaces
+        # it; the original name is kept for uploads catalogued from the store
+        metadata = read_store_json(dataset_id, METADATA_FILE) or {}
+        write_store_json(dataset_id, METADATA_FILE, dict(metadata, filename=upload["filename"]))
+        await thread_executor.run(
+            dataset_catalog.record,
+            dataset_id,
+            filename=upload["filename"],
+            size=upload["file_size"],
+            content_hash=upload["content_hash"],
+            profile=profile,
+            dtypes={column: str(dtype) for column, dtype in sample.dtypes.items()},
+            row_count=total_rows
+        )
+
+        return {
+            "success": True,
+            "dataset_id": dataset_id,
+            "filename": upload["filename"],
+            "file_size": upload["file_size"],
+            "content_hash": upload["content_hash"],
+            "ingest_mode": "sampled",
+            "rows": total_rows,
+            "columns": len(sample.columns),
+            "sheets": None,
+            "memory_optimization": None,
+            "analysis": analysis
+        }
+
+    async def _ingest_in_memory(self, upload: Dict[str, Any], report: Callable[..., None]) -> Dict[str, Any]:
+        """Load the whole file, then store and profile it. Every sheet of a workbook becomes a dataset of its own."""
+        file_path = upload["file_path"]
+        dataset_id = upload["dataset_id"]
+
+        # Read and validate data; Excel parsing is pure Python so the
+        # sheets are parsed in parallel worker processes
+        report(0.0, "Parsing file")
+        try:
+            if file_path.suffix.lower() == '.csv':
+                sheets = {None: await thread_executor.run(pd.read_csv, file_path)}
+            else:
+                sheets = await read_workbook(file_path, progress=lambda fraction, message: report(0.3 * fraction, message))
+                # Empty sheets are skipped unless the workbook has nothing else
+                sheets = {name: df for name, df in sheets.items() if len(df.columns)} or dict(list(sheets.items())[:1])
+        except Exception as e:
+            file_path.unlink()  # Delete file if reading fails
+            delete_column_store(dataset_id)
+            raise HTTPException(
+                status_code=400,
+                detail=f"Error reading file: {str(e)}"
+            )
+
+        sheet_name, df = next(iter(sheets.items()))
+        df, optimization, analysis = await self._store_dataset(dataset_id, file_path, df, report)
+
+        sheet_datasets = None
+        if sheet_name is not None:
+            sheet_datasets = [{"sheet_name": sheet_name, "dataset_id": dataset_id, "rows": len(df), "columns": len(df.columns)}]
+            further = list(sheets.items())[1:]
+            for position, (name, sheet) in enumerate(further):
+                report(0.9 + 0.1 * position / len(further), f"Storing sheet '{name}'")
+                sheet_datasets.append(await self._ingest_sheet(upload, name, sheet))
+            # Duplicate uploads of the workbook list its sheets from here
+            write_store_json(dataset_id, METADATA_FILE, {
+                "content_hash": upload["content_hash"],
+                "sheet_name": sheet_name,
+                "sheets": sheet_datasets
+            })
+
+        return {
+            "success": True,
+            "dataset_id": dataset_id,
+            "filename": upload["filename"],
+            "file_size": upload["file_size"],
+            "content_hash": upload["content_hash"],
+            "ingest_mode": "memory",
+            "rows": len(df),
+            "columns": len(df.columns),
+            "sheets": sheet_datasets,
+            "memory_optimization": optimization,
+            "analysis": analysis
+        }
+
+    async def _ingest_sheet(self, upload: Dict[str, Any], sheet_name: str, df: pd.DataFrame) -> Dict[str, Any]:
+        """Store a further sheet of a workbook as a dataset of its own"""
+        dataset_id = sheet_dataset_id(upload["dataset_id"], sheet_name)
+        file_path = self.UPLOAD_DIR / dataset_id
+
+        # The sheet's dataset shares the workbook file; its metadata names
+        # the sheet and gives it a content hash of its own
+        content_hash = hashlib.sha256(f"{upload['content_hash']}:{sheet_name}".encode()).hexdigest()
+        write_store_json(dataset_id, METADATA_FILE, {"content_hash": content_hash, "sheet_name": sheet_name})
+        try:
+            os.link(upload["file_path"], file_path)
+        except OSError:
+            shutil.copyfile(upload["file_path"], file_path)
+
+        df, _, analysis = await self._store_dataset(dataset_id, file_path, df, lambda *args: None)
+        await result_cache.put_async(content_hash, "upload", analysis)
+        await thread_executor.run(
+            dataset_catalog.record,
+            dataset_id,
+            filename=upload["filename"],
+            size=upload["file_size"],
+            content_hash=content_hash,
+            profile=dataset_registry.get(dataset_id, "profile"),
+            sheet_name=sheet_name
+        )
+        return {"sheet_name": sheet_name, "dataset_id": dataset_id, "rows": len(df), "columns": len(df.columns)}
+
+    async def _store_dataset(self, dataset_id: str, file_path: Path, df: pd.DataFrame, report: Callable[..., None]) -> Tuple[pd.DataFrame, Optional[Dict[str, Any]], DatasetAnalysis]:
+        """Convert a parsed dataset to the columnar store, then cache and profile it"""
+        # Shrink dtypes before the frame is stored and cached
+        optimization = None
+        if OPTIMIZE_DTYPES:
+            report(0.3, "Optimizing dtypes")
+            df, optimization = await thread_executor.run(optimize_dtypes, df)
+            write_store_json(dataset_id, OPTIMIZATION_FILE, optimization)
+
+        # Convert once to the columnar cache so later reads skip parsing
+        report(0.4, "Writing columnar store")
+        df = await thread_executor.run(write_column_store, dataset_id, df)
+
+        # Row offsets let pages of rows be read straight from the file
+        if file_path.suffix.lower() == '.csv':
+            report(0.5, "Indexing rows")
+            await thread_executor.run(build_row_index, file_path, dataset_id, expected_rows=len(df))
+
+        # One hash per row answers every duplicate-row question later
+        fingerprints = await thread_executor.run(build_row_fingerprints, dataset_id, df)
+        dataset_registry.put(dataset_id, fingerprints, "fingerprints")
+
+        # Histogram pyramids answer chart requests without rescanning columns
+        histograms = await thread_executor.run(build_histograms, dataset_id, df)
+        dataset_registry.put(dataset_id, histograms, "histograms")
+
+        # Store dataset in the shared registry
+        dataset_registry.put(dataset_id, df)
+
+        # Generate initial analysis
+        report(0.6, "Profiling columns")
+        analysis = await self.analyze_dataset(df, dataset_id=dataset_id)
+
+        # Sketches let approximate analyses answer without touching the data;
+        # the mergeable statistics they are part of let appended rows be
+        # profiled on their own
+        report(0.9, "Building sketches")
+        accumulators = await thread_executor.run(build_column_accumulators, df)
+        await thread_executor.run(save_column_accumulators, dataset_id, accumulators)
+
+        return df, optimization, analysis
+
+    async def _ingest_in_chunks(self, upload: Dict[str, Any], report: Callable[..., None]) -> Dict[str, Any]:
+        """Profile a CSV chunk by chunk so files larger than memory can be analyzed"""
+        file_path = upload["file_path"]
+        dataset_id = upload["dataset_id"]
+        report(0.0, "Profiling file in chunks")
+        try:
+            profile, total_rows = await thread_executor.run(profile_csv_in_chunks, file_path, dataset_id, progress=report)
+        except Exception as e:
+            file_path.unlink()  # Delete file if reading fails
+            delete_column_store(dataset_id)
+            raise HTTPException(
+                status_code=400,
+                detail=f"Error reading file: {str(e)}"
+            )
+
+        # The profile is shared with the other endpoints; the frame itself
+        # is not loaded
+        dataset_registry.put(dataset_id, profile, "profile")
+
+        report(0.95, "Indexing rows")
+        await thread_executor.run(build_row_index, file_path, dataset_id, expected_rows=total_rows)
+        fingerprints = await thread_executor.run(build_row_fingerprints, dataset_id)
+        dataset_registry.put(dataset_id, fingerprints, "fingerprints")
+        histograms = await thread_executor.run(build_histograms, dataset_id)
+        dataset_registry.put(dataset_id, histograms, "histograms")
+
+        return {
+            "success": True,
+            "dataset_id": dataset_id,
+            "filename": upload["filename"],
+            "file_size": upload["file_size"],
+            "content_hash": upload["content_hash"],
+            "ingest_mode": "chunked",
+            "rows": total_rows,
+            "columns": len(profile),
+            "sheets": None,
+            "memory_optimization": None,
+            "analysis": self._build_analysis(profile, total_rows)
+        }
+
+    async def append_rows(self, dataset_id: str, file: UploadFile) -> Dict[str, Any]:
+        """
+        Append the rows of an uploaded file to an existing dataset.
+        Only the new rows are parsed, hashed and profiled; their statistics
+        are merged into the ones kept for the dataset, giving the profile a
+        full recompute would. Columns with more than MAX_TRACKED_VALUES
+        distinct values, whose merged medians and distinct counts would only
+        be estimates, are profiled again from the store.
+        """
+        file_path = self.UPLOAD_DIR / dataset_id
+        if not file_path.exists():
+            raise HTTPException(
+                status_code=404,
+                detail=f"Dataset '{dataset_id}' not found"
+            )
+
+        file_extension = Path(file.filename or "").suffix.lower()
+        if file_extension not in self.ALLOWED_EXTENSIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported file format. Allowed formats: {', '.join(self.ALLOWED_EXTENSIONS)}"
+            )
+
+        async with self._append_locks.setdefault(dataset_id, asyncio.Lock()):
+            # Parse the new rows from a temporary file
+            tmp_path = self.UPLOAD_DIR / f".{dataset_id}.append.part"
             try:
-                if file_extension == '.csv':
-                    df = pd.read_csv(file_path)
-                else:
-                    df = pd.read_excel(file_path)
+                _, appended_hash = await stream_upload_to_disk(file, tmp_path)
+                new_rows = await read_file_content(tmp_path, file_extension)
+            except HTTPException:
+                raise
             except Exception as e:
-                file_path.unlink()  # Delete file if reading fails
                 raise HTTPException(
                     status_code=400,
                     detail=f"Error reading file: {str(e)}"
                 )
+            finally:
+                tmp_path.unlink(missing_ok=True)
 
-            # Store dataset in memory
-            self.datasets[safe_filename] = df
+            columns = await thread_executor.run(read_dataset_columns, file_path)
+            new_rows.columns = [str(column) for column in new_rows.columns]
+            if sorted(new_rows.columns) != sorted(columns):
+                missing = [column for column in columns if column not in new_rows.columns]
+                unexpected = [column for column in new_rows.columns if column not in columns]
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"New rows must have the dataset's columns. Missing: {missing}; unexpected: {unexpected}"
+                )
+            if new_rows.empty:
+                raise HTTPException(
+                    status_code=400,
+                    detail="No rows to append"
+                )
+            new_rows = new_rows[columns]
 
-            # Generate initial analysis
-            analysis = await self.analyze_dataset(df)
+            # Statistics of the stored rows, merged with the new ones below
+            accumulators = await thread_executor.run(load_column_accumulators, dataset_id)
+            if accumulators is None:
+                # Kept since ingest for newer datasets; built once for older ones
+                accumulators = await thread_executor.run(build_store_accumulators, dataset_id)
 
-            return {
-                "success": True,
-                "dataset_id": safe_filename,
-                "filename": file.filename,
-                "rows": len(df),
-                "columns": len(df.columns),
-                "analysis": analysis
-            }
+            dtypes_before = await thread_executor.run(read_store_schema, dataset_id)
+            try:
+                appended = await thread_executor.run(append_column_store, dataset_id, new_rows)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            dataset_registry.remove(dataset_id)
+            FileService.summaries.pop(dataset_id, None)
+            await thread_executor.run(delete_sample, dataset_id)
 
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            # The new rows with the dtypes the whole dataset now reads back with
+            dtypes = await thread_executor.run(read_store_schema, dataset_id)
+            appended = appended.astype(dtypes)
+            accumulators = await thread_executor.run(self._merge_statistics, dataset_id, accumulators, appended, dtypes)
+            await thread_executor.run(save_column_accumulators, dataset_id, accumulators)
+            profile = {column: accumulators[column].to_profile() for column in columns}
+            overflowed = [column for column in columns if accumulators[column].truncated]
+            if overflowed:
+                profile.update(await thread_executor.run(self._profile_stored_columns, dataset_id, overflowed))
+            profile = dataset_registry.put(dataset_id, profile, "profile")
+            total_rows = profile[columns[0]]["count"] if columns else 0
+
+            # Stored fingerprints stay valid unless a column was widened,
+            # which changes how its values hash
+            if dtypes == dtypes_before:
+                fingerprints = await thread_executor.run(append_row_fingerprints, dataset_id, appended)
+            else:
+                fingerprints = await thread_executor.run(build_row_fingerprints, dataset_id)
+            dataset_registry.put(dataset_id, fingerprints, "fingerprints")
+            histograms = await thread_executor.run(append_histograms, dataset_id, appended)
+            dataset_registry.put(dataset_id, histograms, "histograms")
+
+            if file_path.suffix.lower() == '.csv':
+                await thread_executor.run(self._append_csv_rows, file_path, dataset_id, new_rows, total_rows)
+
+            # The dataset no longer has the content it was uploaded with
+            metadata = read_store_json(dataset_id, METADATA_FILE) or {}
+            previous_hash = metadata.get("content_hash") or await thread_executor.run(get_content_hash, file_path)
+            content_hash = hashlib.sha256(f"{previous_hash}:{appended_hash}".encode()).hexdigest()
+            write_store_json(dataset_id, METADATA_FILE, dict(metadata, content_hash=content_hash))
+            await result_cache.invalidate_async(previous_hash)
+
+            entry = await thread_executor.run(dataset_catalog.get, dataset_id) or {}
+            await thread_executor.run(
+                dataset_catalog.record,
+                dataset_id,
+                filename=entry.get("filename", dataset_id),
+                size=file_path.stat().st_size,
+                content_hash=content_hash,
+                profile=profile,
+                created_at=datetime.fromisoformat(entry["created"]) if entry else None,
+                sheet_name=entry.get("sheet_name")
+            )
+
+        return {
+            "success": True,
+            "dataset_id": dataset_id,
+            "appended_rows": len(appended),
+            "rows": total_rows,
+            "columns": len(columns),
+            "content_hash": content_hash,
+            "dtype_changes": {
+                column: {"from": dtypes_before[column], "to": dtypes[column]}
+                for column in columns if dtypes_before[column] != dtypes[column]
+            },
+            "analysis": self._build_analysis(profile, total_rows)
+        }
+
+    def _merge_statistics(self, dataset_id: str, accumulators: Dict[str, ColumnAccumulator], appended: pd.DataFrame, dtypes: Dict[str, str]) -> Dict[str, ColumnAccumulator]:
+        """Merge the statistics of appended rows into those of the stored rows"""
+        for column, partial in build_column_accumulators(appended).items():
+            accumulator = accumulators[column]
+            if accumulator.numeric != partial.numeric:
+                if accumulator.non_null:
+                    # A column that changed kind is profiled again as a whole
+                    return build_store_accumulators(dataset_id)
+                # A column with no values so far takes the kind of the new ones
+                accumulator = ColumnAccumulator.missing_only(accumulator.count, dtypes[column], partial.numeric)
+            accumulators[column] = accumulator.merge(partial)
+            accumulator.dtype = dtypes[column]
+        return accumulators
+
+    def _profile_stored_columns(self, dataset_id: str, columns: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Profile columns exactly from the store; numeric ones are read memory-mapped"""
+        return profile_dataset(read_column_store(dataset_id, columns=columns))
+
+    def _append_csv_rows(self, file_path: Path, dataset_id: str, new_rows: pd.DataFrame, total_rows: int):
+        """Append rows to an uploaded CSV file and extend its row index over them"""
+        with open(file_path, "rb+") as f:
+            # The new rows start on a line of their own
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+            start = f.tell()
+            f.write(new_rows.to_csv(header=False, index=False).encode())
+
+        # Uploads indexed before or never indexed get a full index
+        if extend_row_index(file_path, dataset_id, start, expected_rows=total_rows) is None:
+            build_row_index(file_path, dataset_id, expected_rows=total_rows)
 
-    async def analyze_dataset(self, df: pd.DataFrame) -> DatasetAnalysis:
+    async def analyze_dataset(self, df: pd.DataFrame, dataset_id: Optional[str] = None) -> DatasetAnalysis:
         """Generate basic analysis of the dataset"""
         try:
-            # Calculate basic statistics for numeric columns
-            numeric_cols = df.select_dtypes(include=[np.number]).columns
-            basic_stats = {}
-            for col in numeric_cols:
+            # All statistics come from one profiling pass, shared with the
+            # other endpoints when the dataset id is known
+            if dataset_id:
+                profile = await thread_executor.run(get_dataset_profile, dataset_id, df)
+            else:
+                profile = await thread_executor.run(profile_dataset, df)
+            return self._build_analysis(profile, len(df))
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    def _build_analysis(self, profile: Dict[str, Dict[str, Any]], total_rows: int) -> DatasetAnalysis:
+        """Build the dataset analysis from a column profile"""
+        summary_stats = ("mean", "median", "std", "min", "max")
+
+        # Calculate basic statistics for numeric columns
+        basic_stats = {}
+        for col, col_profile in profile.items():
+            if col_profile["is_numeric"] and not pd.api.types.is_bool_dtype(col_profile["dtype"]):
                 basic_stats[col] = {
-                    "mean": float(df[col].mean()),
-                    "median": float(df[col].median()),
-                    "std": float(df[col].std()),
-                    "min": float(df[col].min()),
-                    "max": float(df[col].max())
+                    stat: col_profile[stat]
+                    for stat in summary_stats if stat in col_profile
                 }
 
-            # Calculate missing values for all columns
-            missing_values = {}
-            for col in df.columns:
-                missing_count = int(df[col].isna().sum())
-                missing_values[col] = MissingValueInfo(
-                    count=missing_count,
-                    percentage=float(missing_count / len(df) * 100)
-                )
+        # Calculate missing values for all columns
+        missing_values = {}
+        for col, col_profile in profile.items():
+            missing_values[col] = MissingValueInfo(
+                count=col_profile["missing"],
+                percentage=col_profile["missing_percentage"]
+            )
 
-            # Get column analyses
-            column_analyses = {}
-            for col in df.columns:
-                try:
-                    basic_stats_col = {
-                        "count": int(len(df[col])),
-                        "unique_values": int(df[col].nunique()),
-                        "missing_values": int(df[col].isna().sum()),
-                        "missing_percentage": float(df[col].isna().sum() / len(df[col]) * 100)
+        # Get column analyses
+        column_analyses = {}
+        for col, col_profile in profile.items():
+            try:
+                basic_stats_col = {
+                    "count": col_profile["count"],
+                    "unique_values": col_profile["unique"],
+                    "missing_values": col_profile["missing"],
+                    "missing_percentage": col_profile["missing_percentage"]
+                }
+                if not col_profile.get("unique_exact", True):
+                    basic_stats_col["unique_values_exact"] = False
+                
+                analysis_dict = {"basic_stats": basic_stats_col}
+                
+                if col_profile["is_numeric"]:
+                    analysis_dict["numeric_stats"] = {
+                        stat: col_profile[stat]
+                        for stat in summary_stats if stat in col_profile
                     }
-                    
-                    analysis_dict = {"basic_stats": basic_stats_col}
-                    
-                    if pd.api.types.is_numeric_dtype(df[col]):
-                        analysis_dict["numeric_stats"] = {
-                            "mean": float(df[col].mean()),
-                            "median": float(df[col].median()),
-                            "std": float(df[col].std()),
-                            "min": float(df[col].min()),
-                            "max": float(df[col].max())
-                        }
-                    else:
-                        analysis_dict["categorical_stats"] = {
-                            "most_common": df[col].value_counts().head(5).to_dict(),
-                            "least_common": df[col].value_counts().tail(5).to_dict()
-                        }
-                    
-                    column_analyses[col] = ColumnAnalysis(**analysis_dict)
-                except Exception as e:
-                    print(f"Error analyzing column {col}: {str(e)}")
-                    continue
-
-            return DatasetAnalysis(
-                basic_statistics=basic_stats,
-                missing_values=missing_values,
-                total_rows=len(df),
-                total_columns=len(df.columns),
-                column_analyses=column_analyses
-            )
+                    if not col_profile.get("median_exact", True):
+                        analysis_dict["numeric_stats"]["median_exact"] = False
+                else:
+                    analysis_dict["categorical_stats"] = {
+                        "most_common": col_profile["most_common"],
+                        "least_common": col_profile["least_common"]
+                    }
+                
+                column_analyses[col] = ColumnAnalysis(**analysis_dict)
+            except Exception as e:
+                print(f"Error analyzing column {col}: {str(e)}")
+                continue
 
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+        return DatasetAnalysis(
+            basic_statistics=basic_stats,
+            missing_values=missing_values,
+            total_rows=total_rows,
+            total_columns=len(profile),
+            column_analyses=column_analyses
+        )
 
     async def get_dataset(self, dataset_id: str) -> pd.DataFrame:
         """Retrieve dataset by ID"""
-        if dataset_id not in self.datasets:
+        df = dataset_registry.get(dataset_id)
+        if df is None:
             file_path = self.UPLOAD_DIR / dataset_id
             if not file_path.exists():
                 raise HTTPException(
@@ -154,18 +692,14 @@ class DataService:
             
             # Load dataset from file
             try:
-                if str(file_path).endswith('.csv'):
-                    df = pd.read_csv(file_path)
-                else:
-                    df = pd.read_excel(file_path)
-                self.datasets[dataset_id] = df
+                df = dataset_registry.put(dataset_id, await thread_executor.run(read_dataset, file_path))
             except Exception as e:
                 raise HTTPException(
                     status_code=500,
                     detail=f"Error loading dataset: {str(e)}"
                 )
 
-        return self.datasets[dataset_id]
+        return df
 
     async def get_dataset_preview(self, dataset_id: str, rows: int = 5) -> Dict[str, Any]:
         """Get preview of dataset"""
@@ -178,6 +712,263 @@ class DataService:
             "total_rows": len(df)
         }
 
+    async def get_dataset_rows(self, dataset_id: str, offset: int, limit: int, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get a page of rows without loading the rest of the dataset"""
+        file_path = self.UPLOAD_DIR / dataset_id
+        if not file_path.exists():
+            raise HTTPException(
+                status_code=404,
+                detail=f"Dataset '{dataset_id}' not found"
+            )
+
+        all_columns = await thread_executor.run(read_dataset_columns, file_path)
+        for column in columns or []:
+            if column not in all_columns:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Column '{column}' not found"
+                )
+
+        # CSV files are parsed from the indexed row before the page; other
+        # files are sliced from the columnar copy
+        index = await self._get_row_index(file_path)
+        if index:
+            df = await thread_executor.run(read_csv_rows, file_path, dataset_id, index, offset, limit, columns)
+            total_rows = index["rows"]
+        else:
+            df = await thread_executor.run(read_store_rows, dataset_id, offset, limit, columns)
+            total_rows = read_store_row_count(dataset_id)
+
+        return {
+            "dataset_id": dataset_id,
+            "offset": offset,
+            "limit": limit,
+            "total_rows": total_rows,
+            "columns": list(df.columns),
+            "rows": df.to_dict(orient="records")
+        }
+
+    async def _get_row_index(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """Row index of a CSV upload, built on first use for older uploads"""
+        dataset_id = file_path.name
+        index = dataset_registry.get(dataset_id, "row_index")
+        if index is not None or file_path.suffix.lower() != '.csv':
+            return index
+
+        index = await thread_executor.run(load_row_index, dataset_id)
+        if index is None:
+            rows = await thread_executor.run(
+                build_row_index, file_path, dataset_id, expected_rows=read_store_row_count(dataset_id)
+            )
+            index = await thread_executor.run(load_row_index, dataset_id) if rows is not None else None
+
+        # False marks files whose rows could not be indexed (the columnar copy is used instead)
+        return dataset_registry.put(dataset_id, index if index is not None else False, "row_index")
+
+    async def get_duplicate_rows(self, dataset_id: str, offset: int, limit: int) -> Dict[str, Any]:
+        """Get a page of groups of identical rows, found from the stored row fingerprints"""
+        file_path = self.UPLOAD_DIR / dataset_id
+        if not file_path.exists():
+            raise HTTPException(
+                status_code=404,
+                detail=f"Dataset '{dataset_id}' not found"
+            )
+
+        # Makes sure the columnar copy exists for uploads older than it
+        await thread_executor.run(read_dataset_columns, file_path)
+        fingerprints = await thread_executor.run(get_row_fingerprints, dataset_id)
+        rows, starts, sizes = await thread_executor.run(get_duplicate_groups, dataset_id, fingerprints)
+        page = range(offset, min(offset + limit, len(sizes)))
+
+        # The rows of a group are identical, so only the first one is read
+        df = dataset_registry.get(dataset_id)
+        first_rows = rows[starts[page.start:page.stop]].astype(np.int64)
+        if df is not None:
+            values = df.iloc[first_rows]
+        else:
+            values = await thread_executor.run(read_store_take, dataset_id, first_rows)
+
+        return {
+            "dataset_id": dataset_id,
+            "offset": offset,
+            "limit": limit,
+            "total_rows": len(fingerprints),
+            "duplicate_rows": int(sizes.sum() - len(sizes)),
+            "duplicate_groups": len(sizes),
+            "columns": list(values.columns),
+            "groups": [
+                {"rows": rows[starts[group]:starts[group] + sizes[group]].tolist(), "count": int(sizes[group]), "values": row}
+                for group, row in zip(page, values.to_dict(orient="records"))
+            ]
+        }
+
+    FILTER_MODES = ("count", "rows", "stats")
+
+    async def filter_rows(self, dataset_id: str, request: FilterRequest) -> Dict[str, Any]:
+        """
+        Count, page or summarize the rows matching a filter.
+        Row groups whose min/max statistics rule out a match are skipped, and
+        only the columns the filter references are read from the others.
+        Matching positions are cached, so paging through them is cheap.
+        """
+        if request.mode not in self.FILTER_MODES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown mode '{request.mode}'. Allowed modes: {', '.join(self.FILTER_MODES)}"
+            )
+        if request.offset < 0 or not 1 <= request.limit <= 10000:
+            raise HTTPException(
+                status_code=400,
+                detail="offset must be at least 0 and limit between 1 and 10000"
+            )
+
+        file_path = self.UPLOAD_DIR / dataset_id
+        if not file_path.exists():
+            raise HTTPException(
+                status_code=404,
+                detail=f"Dataset '{dataset_id}' not found"
+            )
+
+        all_columns = await thread_executor.run(read_dataset_columns, file_path)
+        for column in request.columns or []:
+            if column not in all_columns:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Column '{column}' not found"
+                )
+        columns = request.columns or all_columns
+
+        # The frame is used when it is loaded; otherwise the stored dtypes
+        # are the ones its row groups read back with
+        df = dataset_registry.get(dataset_id)
+        if df is not None:
+            dtypes = dict(df.dtypes)
+        else:
+            schema = await thread_executor.run(read_store_schema, dataset_id)
+            dtypes = {column: pd.api.types.pandas_dtype(dtype) for column, dtype in schema.items()}
+
+        try:
+            predicate = parse_filter(request.where, dtypes)
+            blocks, total_row_groups = await thread_executor.run(plan_row_groups, dataset_id, predicate)
+            key = f"filter:{predicate}"
+            positions = dataset_registry.get(dataset_id, key)
+            if positions is None:
+                positions = await thread_executor.run(filter_positions, dataset_id, predicate, blocks, df)
+                positions = dataset_registry.put(dataset_id, positions, key)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid filter: {str(e)}")
+
+        result = {
+            "dataset_id": dataset_id,
+            "where": str(predicate),
+            "mode": request.mode,
+            "total_rows": read_store_row_count(dataset_id),
+            "matched_rows": len(positions),
+            "row_groups": {"total": total_row_groups, "skipped": total_row_groups - len(blocks)}
+        }
+        if request.mode == "count":
+            return result
+
+        selected = positions[request.offset:request.offset + request.limit] if request.mode == "rows" else positions
+        if df is not None:
+            values = df[columns].iloc[selected]
+        else:
+            values = await thread_executor.run(read_store_take, dataset_id, selected, columns)
+
+        if request.mode == "rows":
+            result.update({
+                "offset": request.offset,
+                "limit": request.limit,
+                "columns": list(values.columns),
+                "positions": selected.tolist(),
+                "rows": values.to_dict(orient="records")
+            })
+        else:
+            result["columns"] = await thread_executor.run(
+                lambda: {column: self._column_stats(values[column]) for column in columns}
+            )
+        return result
+
+    async def group_rows(self, dataset_id: str, request: GroupByRequest) -> Dict[str, Any]:
+        """
+        Group a dataset by key columns and aggregate value columns, one page
+        of groups at a time. The group ids of every key column set are
+        cached, so later aggregations over the same keys only read the
+        value columns, once each.
+        """
+        if not request.keys or len(set(request.keys)) != len(request.keys):
+            raise HTTPException(
+                status_code=400,
+                detail="keys must name one or more different columns"
+            )
+        if request.offset < 0 or not 1 <= request.limit <= 10000:
+            raise HTTPException(
+                status_code=400,
+                detail="offset must be at least 0 and limit between 1 and 10000"
+            )
+
+        file_path = self.UPLOAD_DIR / dataset_id
+        if not file_path.exists():
+            raise HTTPException(
+                status_code=404,
+                detail=f"Dataset '{dataset_id}' not found"
+            )
+
+        all_columns = await thread_executor.run(read_dataset_columns, file_path)
+        for column in [*request.keys, *request.aggregations]:
+            if column not in all_columns:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Column '{column}' not found"
+                )
+
+        # Columns are taken from the loaded frame when there is one
+        df = dataset_registry.get(dataset_id)
+        if df is not None:
+            dtypes = dict(df.dtypes)
+            load = lambda columns: df[columns]
+        else:
+            schema = await thread_executor.run(read_store_schema, dataset_id)
+            dtypes = {column: pd.api.types.pandas_dtype(dtype) for column, dtype in schema.items()}
+            load = lambda columns: read_dataset(file_path, columns=columns)
+
+        for column, functions in request.aggregations.items():
+            for function in functions:
+                if function not in AGGREGATIONS:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Unknown aggregation '{function}'. Allowed aggregations: {', '.join(AGGREGATIONS)}"
+                    )
+                if function in NUMERIC_AGGREGATIONS and not pd.api.types.is_numeric_dtype(dtypes[column]):
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Cannot compute the {function} of column '{column}': it is not numeric"
+                    )
+        aggregations = {column: list(dict.fromkeys(functions)) for column, functions in request.aggregations.items()}
+
+        groups, total_rows = await thread_executor.run(group_by, dataset_id, request.keys, aggregations, load)
+        if request.sort_by is not None:
+            if request.sort_by not in groups.columns:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Cannot sort by '{request.sort_by}'. Allowed columns: {', '.join(map(str, groups.columns))}"
+                )
+            groups = groups.sort_values(request.sort_by, ascending=not request.descending, na_position="last", kind="stable")
+        elif request.descending:
+            groups = groups.iloc[::-1]
+        page = groups.iloc[request.offset:request.offset + request.limit]
+
+        return {
+            "dataset_id": dataset_id,
+            "keys": request.keys,
+            "total_rows": total_rows,
+            "total_groups": len(groups),
+            "offset": request.offset,
+            "limit": request.limit,
+            "columns": list(page.columns),
+            "groups": page.to_dict(orient="records")
+        }
+
     async def get_column_stats(self, dataset_id: str, column_name: str) -> Dict[str, Any]:
         """Get detailed statistics for a specific column"""
         df = await self.get_dataset(dataset_id)
@@ -188,13 +979,19 @@ class DataService:
                 detail=f"Column '{column_name}' not found"
             )
 
-        series = df[column_name]
+        return await thread_executor.run(self._column_stats, df[column_name])
+
+    def _column_stats(self, series: pd.Series) -> Dict[str, Any]:
+        """Compute the statistics of one column"""
         stats = {
             "missing_count": int(series.isna().sum()),
             "unique_count": int(series.nunique())
         }
 
-        if pd.api.types.is_numeric_dtype(series):
+        # Booleans are counted like categories (NumPy cannot subtract them
+        # to compute quantiles)
+        is_bool = pd.api.types.is_bool_dtype(series)
+        if pd.api.types.is_numeric_dtype(series) and not is_bool:
             stats.update({
                 "mean": float(series.mean()),
                 "median": float(series.median()),
@@ -207,7 +1004,7 @@ class DataService:
                     "75": float(series.quantile(0.75))
                 }
             })
-        elif pd.api.types.is_categorical_dtype(series) or series.dtype == 'object':
+        elif is_bool or isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == 'object':
             value_counts = series.value_counts()
             stats.update({
                 "most_common": value_counts.head(5).to_dict(),
@@ -220,13 +1017,16 @@ class DataService:
         """Delete dataset and associated files"""
         try:
             # Remove from memory
-            if dataset_id in self.datasets:
-                del self.datasets[dataset_id]
+            dataset_registry.remove(dataset_id)
 
-            # Remove file
+            # Remove file and the analysis results cached for its content
             file_path = self.UPLOAD_DIR / dataset_id
             if file_path.exists():
+                content_hash = await thread_executor.run(get_content_hash, file_path)
+                await result_cache.invalidate_async(content_hash)
+                await thread_executor.run(dataset_catalog.remove, dataset_id)
                 file_path.unlink()
+            delete_column_store(dataset_id)
 
             return {
                 "success": True,
@@ -241,17 +1041,8 @@ class DataService:
     async def list_datasets(self) -> List[Dict[str, Any]]:
         """List all available datasets"""
         try:
-            datasets = []
-            for file_path in self.UPLOAD_DIR.glob('*'):
-                if file_path.suffix.lower() in self.ALLOWED_EXTENSIONS:
-                    stats = file_path.stat()
-                    datasets.append({
-                        "id": file_path.name,
-                        "filename": file_path.name,
-                        "size": stats.st_size,
-                        "created": datetime.fromtimestamp(stats.st_ctime).isoformat(),
-                        "modified": datetime.fromtimestamp(stats.st_mtime).isoformat()
-                    })
+            await thread_executor.run(sync_catalog, self.UPLOAD_DIR, self.ALLOWED_EXTENSIONS)
+            datasets, _ = await thread_executor.run(dataset_catalog.list)
             return datasets
         except Exception as e:
             raise HTTPException(
@@ -2,7 +2,7 @@ import pandas as pd
 import numpy as np
 from fastapi import UploadFile, HTTPException
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import json
 import asyncio
 from datetime import datetime
@@ -13,16 +13,30 @@ from ..models.data_models import (
     DatasetMetadata,
     DataPreview
 )
-from ..utils.file_handlers import save_uploaded_file, read_file_content
+from ..utils.file_handlers import save_uploaded_file, read_file_content, read_dataset, get_content_hash, catalog_upload, sync_catalog
+from ..utils.column_store import write_column_store, delete_column_store, write_store_json
+from ..utils.dataset_registry import dataset_registry
+from ..utils.column_profiler import get_dataset_profile
+from ..utils.sketches import build_dataset_sketches, save_dataset_sketches
+from ..utils.row_index import build_row_index
+from ..utils.row_fingerprints import build_row_fingerprints, count_duplicate_rows
+from ..utils.dataset_catalog import dataset_catalog
 from ..utils.data_validation import validate_dataset
+from ..utils.executors import thread_executor
+from ..utils.result_cache import result_cache
+from ..utils.dtype_optimizer import optimize_dtypes, is_low_cardinality, OPTIMIZATION_FILE
+from ..config import OPTIMIZE_DTYPES
 
 class FileService:
+    # Summaries are small, so they are kept for every processed upload;
+    # DataFrames live in the shared dataset registry
+    summaries: Dict[str, DatasetSummary] = {}
+
     def __init__(self):
         self.UPLOAD_DIR = Path("data/uploads")
         self.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
         self.ALLOWED_EXTENSIONS = {'.csv', '.xlsx', '.xls'}
         self.MAX_PREVIEW_ROWS = 5
-        self.datasets_info = {}  # Store dataset information
         
     async def process_file(self, file: UploadFile) -> DatasetSummary:
         """
@@ -43,11 +57,28 @@ class FileService:
             # Read file content
             df = await read_file_content(file_path, file_extension)
             
+            # Shrink dtypes before the frame is stored and cached
+            dataset_id = Path(file_path).name
+            if OPTIMIZE_DTYPES:
+                df, optimization = await thread_executor.run(optimize_dtypes, df)
+                write_store_json(dataset_id, OPTIMIZATION_FILE, optimization)
+            
+            # Convert once to the columnar cache so later reads skip parsing
+            df = await thread_executor.run(write_column_store, dataset_id, df)
+            if file_path.suffix.lower() == '.csv':
+                await thread_executor.run(build_row_index, file_path, dataset_id, expected_rows=len(df))
+            fingerprints = dataset_registry.put(
+                dataset_id, await thread_executor.run(build_row_fingerprints, dataset_id, df), "fingerprints"
+            )
+            profile = await thread_executor.run(get_dataset_profile, dataset_id, df)
+            sketches = await thread_executor.run(build_dataset_sketches, df)
+            await thread_executor.run(save_dataset_sketches, dataset_id, sketches)
+            
             # Generate dataset metadata
-            metadata = await self._generate_metadata(df, file.filename)
+            metadata = await self._generate_metadata(df, file.filename, Path(file_path).stat().st_size, profile, fingerprints)
             
             # Generate column information
-            columns = await self._analyze_columns(df)
+            columns = await self._analyze_columns(df, profile)
             
             # Generate data preview
             preview = await self._generate_preview(df)
@@ -59,58 +90,64 @@ class FileService:
             )
             
             # Store dataset information
-            dataset_id = Path(file_path).name
-            self.datasets_info[dataset_id] = {
-                'summary': summary,
-                'file_path': file_path,
-                'dataframe': df  # Store the DataFrame for future use
-            }
+            self.summaries[dataset_id] = summary
+            dataset_registry.put(dataset_id, df)  # Store the DataFrame for future use
+            await thread_executor.run(
+                dataset_catalog.record,
+                dataset_id,
+                filename=file.filename,
+                size=metadata.file_size,
+                content_hash=await thread_executor.run(get_content_hash, file_path),
+                profile=profile
+            )
             
             return summary
             
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    async def _generate_metadata(self, df: pd.DataFrame, filename: str) -> DatasetMetadata:
+    async def _generate_metadata(self, df: pd.DataFrame, filename: str, file_size: int, profile: Dict[str, Dict[str, Any]], fingerprints: np.ndarray) -> DatasetMetadata:
         """
         Generate metadata for the dataset
         """
+        duplicate_rows = await thread_executor.run(count_duplicate_rows, fingerprints)
+
         return DatasetMetadata(
             filename=filename,
             row_count=len(df),
             column_count=len(df.columns),
-            file_size=0,  # You can add actual file size calculation if needed
+            file_size=file_size,
             creation_date=datetime.now().isoformat(),
-            missing_cells=df.isna().sum().sum(),
-            duplicate_rows=len(df) - len(df.drop_duplicates())
+            missing_cells=sum(stats["missing"] for stats in profile.values()),
+            duplicate_rows=duplicate_rows
         )
 
-    async def _analyze_columns(self, df: pd.DataFrame) -> List[ColumnInfo]:
+    async def _analyze_columns(self, df: pd.DataFrame, profile: Dict[str, Dict[str, Any]]) -> List[ColumnInfo]:
         """
         Analyze columns and generate column information
         """
         columns = []
         for column in df.columns:
             series = df[column]
-            col_type = self._determine_column_type(series)
+            col_profile = profile[column]
+            col_type = self._determine_column_type(series, col_profile["unique"])
             
             stats = {
-                "unique_count": int(series.nunique()),
-                "missing_count": int(series.isna().sum()),
-                "missing_percentage": float(series.isna().sum() / len(series) * 100)
+                "unique_count": col_profile["unique"],
+                "missing_count": col_profile["missing"],
+                "missing_percentage": col_profile["missing_percentage"]
             }
             
             if col_type == "numeric":
                 stats.update({
-                    "mean": float(series.mean()),
-                    "std": float(series.std()),
-                    "min": float(series.min()),
-                    "max": float(series.max())
+                    stat: col_profile[stat]
+                    for stat in ("mean", "std", "min", "max")
                 })
             elif col_type in ["categorical", "text"]:
-                value_counts = series.value_counts()
                 stats.update({
-                    "most_common": value_counts.head(5).to_dict()
+                    "most_common": col_profile["most_common"]
                 })
             
             columns.append(ColumnInfo(
@@ -121,7 +158,7 @@ class FileService:
         
         return columns
 
-    def _determine_column_type(self, series: pd.Series) -> str:
+    def _determine_column_type(self, series: pd.Series, unique_count: Optional[int] = None) -> str:
         """
         Determine the type of a column
         """
@@ -129,7 +166,11 @@ class FileService:
             return "numeric"
         elif pd.api.types.is_datetime64_any_dtype(series):
             return "datetime"
-        elif series.nunique() / len(series) < 0.5:  # If less than 50% unique values
+        
+        if unique_count is None:
+            unique_count = series.nunique()
+        
+        if is_low_cardinality(unique_count, len(series)):  # If less than 50% unique values
             return "categorical"
         else:
             return "text"
@@ -151,23 +192,16 @@ class FileService:
         Retrieve stored dataset DataFrame
         """
         try:
-            if dataset_id in self.datasets_info:
-                return self.datasets_info[dataset_id]['dataframe']
+            df = dataset_registry.get(dataset_id)
+            if df is not None:
+                return df
             
             file_path = self.UPLOAD_DIR / dataset_id
             if not file_path.exists():
                 return None
             
-            # Read the file based on extension
-            df = pd.read_csv(file_path) if str(file_path).endswith('.csv') else pd.read_excel(file_path)
-            
             # Store in memory for future use
-            self.datasets_info[dataset_id] = {
-                'dataframe': df,
-                'file_path': file_path
-            }
-            
-            return df
+            return dataset_registry.put(dataset_id, await thread_executor.run(read_dataset, file_path))
         except Exception as e:
             print(f"Error reading dataset: {str(e)}")
             return None
@@ -176,95 +210,96 @@ class FileService:
         """
         Retrieve stored dataset summary
         """
-        if dataset_id in self.datasets_info:
-            return self.datasets_info[dataset_id]['summary']
-        return None
+        return self.summaries.get(dataset_id)
 
     async def delete_dataset(self, dataset_id: str) -> bool:
         """
         Delete dataset and its stored information
         """
         try:
-            if dataset_id in self.datasets_info:
+            file_path = self.UPLOAD_DIR / dataset_id
+            if file_path.exists():
+                # Drop analysis results cached for the file's content
+                content_hash = await thread_executor.run(get_content_hash, file_path)
+                await result_cache.invalidate_async(content_hash)
+                await thread_executor.run(dataset_catalog.remove, dataset_id)
                 # Delete file
-                file_path = self.datasets_info[dataset_id]['file_path']
-                if file_path.exists():
-                    file_path.unlink()
+                file_path.unlink()
+                delete_column_store(dataset_id)
                 # Remove from storage
-                del self.datasets_info[dataset_id]
+                dataset_registry.remove(dataset_id)
+                self.summaries.pop(dataset_id, None)
                 return True
             return False
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    async def list_datasets(self) -> List[Dict[str, Any]]:
+    async def list_datasets(
+        self,
+        search: Optional[str] = None,
+        file_format: Optional[str] = None,
+        sort_by: str = "created",
+        descending: bool = True,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> Tuple[List[Dict[str, Any]], int]:
         """
-        List all available datasets with their basic information
+        List one page of available datasets with their basic information,
+        and the number of datasets matching the filters
         """
         try:
-            datasets = []
-            for file_path in self.UPLOAD_DIR.glob('*'):
-                if file_path.suffix.lower() in self.ALLOWED_EXTENSIONS:
-                    try:
-                        # Read basic info without loading entire dataset
-                        df = pd.read_csv(file_path, nrows=1) if file_path.suffix == '.csv' else pd.read_excel(file_path, nrows=1)
-                        
-                        datasets.append({
-                            "id": file_path.name,
-                            "filename": file_path.name,
-                            "size": file_path.stat().st_size,
-                            "created": datetime.fromtimestamp(file_path.stat().st_ctime).isoformat(),
-                            "columns": len(df.columns),
-                            "format": file_path.suffix[1:].upper()  # Remove dot and capitalize
-                        })
-                    except Exception as e:
-                        continue  # Skip files that can't be read
-                        
-            return sorted(datasets, key=lambda x: x['created'], reverse=True)
+            await thread_executor.run(sync_catalog, self.UPLOAD_DIR, self.ALLOWED_EXTENSIONS)
+            return await thread_executor.run(dataset_catalog.list, search, file_format, sort_by, descending, limit, offset)
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error listing datasets: {str(e)}")
 
+    async def get_catalog_entry(self, dataset_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the catalog entry of a dataset (shape, schema, content hash),
+        cataloguing uploads that predate the catalog on first use
+        """
+        entry = await thread_executor.run(dataset_catalog.get, dataset_id)
+        if entry is None:
+            file_path = self.UPLOAD_DIR / dataset_id
+            if not file_path.exists():
+                return None
+            await thread_executor.run(catalog_upload, file_path)
+            entry = await thread_executor.run(dataset_catalog.get, dataset_id)
+        return entry
+
     async def get_dataset_head(self, dataset_id: str, n_rows: int = 10) -> Dict[str, Any]:
         """
         Get the first n rows of a dataset
         """
         try:
-            # First try to get from memory
             df = await self.get_stored_dataset(dataset_id)
-            
             if df is None:
-                # If not in memory, try reading from file
-                file_path = self.UPLOAD_DIR / dataset_id
-                if not file_path.exists():
-                    return None
-                    
-                # Read the file based on extension
-                df = pd.read_csv(file_path) if str(file_path).endswith('.csv') else pd.read_excel(file_path)
-                
-                # Store in memory for future use
-                self.datasets_info[dataset_id] = {
-                    'dataframe': df,
-                    'file_path': file_path
-                }
+                return None
             
             head_data = df.head(n_rows)
+            columns = list(head_data.columns)
+            rows = head_data.values.tolist()
+            profile = await thread_executor.run(get_dataset_profile, dataset_id, df)
             
             # Convert data to dictionary format for each column
             basic_statistics = {}
             for column in df.columns:
                 basic_statistics[column] = {
-                    "count": int(df[column].count()),
-                    "unique_values": int(df[column].nunique()),
-                    "missing_values": int(df[column].isna().sum()),
-                    "missing_percentage": float(df[column].isna().sum() / len(df) * 100)
+                    "count": profile[column]["non_null"],
+                    "unique_values": profile[column]["unique"],
+                    "missing_values": profile[column]["missing"],
+                    "missing_percentage": profile[column]["missing_percentage"]
                 }
             
             return {
                 "success": True,
-                "columns": list(head_data.columns),
-                "data": head_data.values.tolist(),
+                "columns": columns,
+                "data": rows,
                 "total_rows": len(df),
-                "preview": head_data.to_dict(orient='records'),
+                # Same rows keyed by column, built from the list above
+                "preview": [dict(zip(columns, row)) for row in rows],
                 "basic_statistics": basic_statistics
             }
             
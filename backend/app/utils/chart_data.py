@@ -0,0 +1,369 @@
+import pandas as pd
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import json
+import shutil
+
+from .column_store import get_store_path, read_store_json, read_store_schema, write_store_json, open_column_store
+from .dataset_registry import dataset_registry
+from ..config import VISUALIZATION_HISTOGRAM_BINS, VISUALIZATION_DENSITY_BINS, VISUALIZATION_LINE_BUCKETS
+
+CHART_TYPES = ("histogram", "density", "line")
+
+# Finest histogram of every numeric column, built at ingest: counts in one
+# .npy (a row per column) and each column's range in JSON
+HISTOGRAMS_FILE = "histograms"
+
+# Density grids and line reductions of column pairs, built on first request
+CHARTS_DIR = "charts"
+
+# Rows binned at once when a loaded frame is binned
+CHUNK_ROWS = 1_000_000
+
+def _power_of_two(value: int) -> int:
+    return 1 << max(int(value) - 1, 0).bit_length()
+
+HISTOGRAM_BINS = _power_of_two(VISUALIZATION_HISTOGRAM_BINS)
+DENSITY_BINS = _power_of_two(VISUALIZATION_DENSITY_BINS)
+
+def _is_numeric(dtype: Any) -> bool:
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+def _values(series: pd.Series) -> np.ndarray:
+    return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+def _chunks(dataset_id: str, columns: List[str], df: Optional[pd.DataFrame] = None) -> Iterator[pd.DataFrame]:
+    """
+    Yields the given columns a slice at a time: of the loaded frame when
+    there is one, otherwise of the store one row group at a time
+    """
+    if df is not None:
+        for start in range(0, len(df), CHUNK_ROWS):
+            yield df[columns].iloc[start:start + CHUNK_ROWS]
+        return
+    parquet_file = open_column_store(dataset_id)
+    for group in range(parquet_file.metadata.num_row_groups):
+        yield parquet_file.read_row_group(group, columns=columns).to_pandas()
+
+def _bin_positions(values: np.ndarray, low: float, high: float, bins: int) -> np.ndarray:
+    """
+    Maps values within [low, high] to one of `bins` equal-width bins; the
+    top edge belongs to the last bin
+    """
+    positions = np.floor((values - low) * (bins / (high - low))).astype(np.int64)
+    return np.clip(positions, 0, bins - 1)
+
+def _range(low: float, high: float) -> Tuple[float, float]:
+    # A column holding one value gets a unit-wide range around it
+    return (low - 0.5, high + 0.5) if low == high else (low, high)
+
+def _histogram_levels(columns: List[str], ranges: List[Tuple[float, float]], counts: np.ndarray, missing: List[int]) -> Dict[str, Dict[str, Any]]:
+    return {
+        column: {"range": column_range, "missing": missing_count, "levels": _pyramid(column_counts)}
+        for column, column_range, column_counts, missing_count in zip(columns, ranges, counts, missing)
+    }
+
+def _save_histograms(dataset_id: str, columns: List[str], ranges: List[Tuple[float, float]], counts: np.ndarray, missing: List[int]) -> Dict[str, Dict[str, Any]]:
+    store_path = get_store_path(dataset_id)
+    tmp_path = store_path / f"{HISTOGRAMS_FILE}.npy.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, counts)
+    tmp_path.replace(store_path / f"{HISTOGRAMS_FILE}.npy")
+    # The JSON is written last so readers never pair it with stale counts
+    write_store_json(dataset_id, HISTOGRAMS_FILE, {
+        "bins": counts.shape[1],
+        "columns": [
+            {"name": column, "range": list(column_range), "missing": missing_count}
+            for column, column_range, missing_count in zip(columns, ranges, missing)
+        ]
+    })
+    return _histogram_levels(columns, ranges, counts, missing)
+
+def _finite(series: pd.Series) -> np.ndarray:
+    values = _values(series)
+    return values[np.isfinite(values)]
+
+def build_histograms(dataset_id: str, df: Optional[pd.DataFrame] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Bins every numeric column of a dataset into HISTOGRAM_BINS equal-width
+    bins over its range and saves the counts next to the columnar copy.
+    They are the finest level of a pyramid: each coarser level sums pairs
+    of bins, so any zoom is answered from the counts alone.
+    The loaded frame is read when given, otherwise the store one row group
+    at a time: once for the ranges, once for the counts.
+    Nulls and infinite values are counted as missing.
+    """
+    if df is not None:
+        columns = [column for column in df.columns if _is_numeric(df[column].dtype)]
+    else:
+        schema = read_store_schema(dataset_id)
+        columns = [column for column, dtype in schema.items() if _is_numeric(pd.api.types.pandas_dtype(dtype))]
+
+    lows, highs = np.full(len(columns), np.inf), np.full(len(columns), -np.inf)
+    if columns:
+        for chunk in _chunks(dataset_id, columns, df):
+            for position, column in enumerate(columns):
+                values = _finite(chunk[column])
+                if len(values):
+                    lows[position] = min(lows[position], values.min())
+                    highs[position] = max(highs[position], values.max())
+    # Columns without values get a placeholder range and zero counts
+    ranges = [_range(low, high) if low <= high else (0.0, 1.0) for low, high in zip(lows.tolist(), highs.tolist())]
+
+    counts = np.zeros((len(columns), HISTOGRAM_BINS), dtype=np.int64)
+    missing = [0] * len(columns)
+    if columns:
+        for chunk in _chunks(dataset_id, columns, df):
+            for position, (column, (low, high)) in enumerate(zip(columns, ranges)):
+                values = _finite(chunk[column])
+                missing[position] += len(chunk) - len(values)
+                counts[position] += np.bincount(_bin_positions(values, low, high, HISTOGRAM_BINS), minlength=HISTOGRAM_BINS)
+
+    return _save_histograms(dataset_id, columns, ranges, counts, missing)
+
+def _read_histograms(dataset_id: str) -> Optional[Tuple[List[str], List[Tuple[float, float]], np.ndarray, List[int]]]:
+    stored = read_store_json(dataset_id, HISTOGRAMS_FILE)
+    path = get_store_path(dataset_id) / f"{HISTOGRAMS_FILE}.npy"
+    if stored is None or not path.exists() or stored["bins"] != HISTOGRAM_BINS:
+        return None
+    return (
+        [column["name"] for column in stored["columns"]],
+        [tuple(column["range"]) for column in stored["columns"]],
+        np.load(path),
+        [column["missing"] for column in stored["columns"]]
+    )
+
+def append_histograms(dataset_id: str, df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    Adds rows appended to a dataset to its histograms, binning only those
+    rows. Charts of column pairs are dropped and rebuilt on request; the
+    histograms are rebuilt from the store when a new value falls outside a
+    column's range or the numeric columns changed.
+    """
+    shutil.rmtree(get_store_path(dataset_id) / CHARTS_DIR, ignore_errors=True)
+    stored = _read_histograms(dataset_id)
+    numeric = [column for column in df.columns if _is_numeric(df[column].dtype)]
+    if stored is None or stored[0] != numeric:
+        return build_histograms(dataset_id)
+
+    columns, ranges, counts, missing = stored
+    for position, (column, (low, high)) in enumerate(zip(columns, ranges)):
+        values = _finite(df[column])
+        if len(values) and (values.min() < low or values.max() > high):
+            return build_histograms(dataset_id)
+        missing[position] += len(df) - len(values)
+        counts[position] += np.bincount(_bin_positions(values, low, high, HISTOGRAM_BINS), minlength=HISTOGRAM_BINS)
+
+    return _save_histograms(dataset_id, columns, ranges, counts, missing)
+
+def get_histograms(dataset_id: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Returns the cached histograms of a dataset with every level of their
+    pyramid, finest first; datasets ingested before histograms existed are
+    binned on first use
+    """
+    histograms = dataset_registry.get(dataset_id, "histograms")
+    if histograms is None:
+        stored = _read_histograms(dataset_id)
+        histograms = _histogram_levels(*stored) if stored is not None else build_histograms(dataset_id)
+        histograms = dataset_registry.put(dataset_id, histograms, "histograms")
+    return histograms
+
+def _pyramid(counts: np.ndarray) -> List[np.ndarray]:
+    """
+    Levels of a bin pyramid, finest first: each level sums adjacent pairs
+    of the one before, down to a single bin
+    """
+    levels = [counts]
+    while len(levels[-1]) > 1:
+        levels.append(levels[-1].reshape(-1, 2).sum(axis=1))
+    return levels
+
+def _zoom(low: float, high: float, finest: int, window: Optional[Tuple[float, float]], bins: int) -> Tuple[int, int, int]:
+    """
+    Picks the pyramid level for a zoom window: the coarsest one with at
+    least `bins` bins inside the window, or the finest when even that has
+    fewer. Returns the level and its first and last (exclusive) bins
+    covering the window.
+    """
+    width = (high - low) / finest
+    first, last = 0, finest
+    if window is not None:
+        first = int(np.clip(np.floor((window[0] - low) / width), 0, finest - 1))
+        last = int(np.clip(np.ceil((window[1] - low) / width), first + 1, finest))
+    level = max(int(np.floor(np.log2((last - first) / bins))), 0) if last - first >= bins else 0
+    factor = 1 << level
+    return level, first // factor, -(-last // factor)
+
+def histogram(histograms: Dict[str, Dict[str, Any]], column: str, bins: int, window: Optional[Tuple[float, float]] = None) -> Dict[str, Any]:
+    """
+    Histogram of a column with about `bins` bins (between bins and
+    2 * bins - 1, aligned to the pyramid) over a zoom window, default the
+    whole range. Deep zooms stop at the finest level.
+    """
+    stored = histograms[column]
+    low, high = stored["range"]
+    level, first, last = _zoom(low, high, HISTOGRAM_BINS, window, bins)
+    width = (high - low) / HISTOGRAM_BINS * (1 << level)
+    counts = stored["levels"][level][first:last]
+    return {
+        "edges": (low + np.arange(first, last + 1) * width).tolist(),
+        "counts": counts.tolist(),
+        "count": int(counts.sum()),
+        "total": int(stored["levels"][-1][0]),
+        "missing": stored["missing"],
+        "resolution": width
+    }
+
+def _pair_key(kind: str, x_column: str, y_column: str) -> str:
+    digest = hashlib.sha1(json.dumps([x_column, y_column]).encode()).hexdigest()[:16]
+    return f"{kind}_{digest}"
+
+def _pair_values(chunk: pd.DataFrame, x_column: str, y_column: str) -> Tuple[np.ndarray, np.ndarray]:
+    # Only rows where both columns are filled can be plotted
+    x, y = _values(chunk[x_column]), _values(chunk[y_column])
+    present = np.isfinite(x) & np.isfinite(y)
+    return x[present], y[present]
+
+def build_density(dataset_id: str, x_column: str, y_column: str, histograms: Dict[str, Dict[str, Any]]) -> np.ndarray:
+    """
+    Bins the rows of a column pair into a DENSITY_BINS x DENSITY_BINS grid
+    over the columns' ranges, the finest level of a 2D pyramid
+    """
+    x_low, x_high = histograms[x_column]["range"]
+    y_low, y_high = histograms[y_column]["range"]
+    grid = np.zeros(DENSITY_BINS * DENSITY_BINS, dtype=np.int64)
+    for chunk in _chunks(dataset_id, list(dict.fromkeys([x_column, y_column])), dataset_registry.get(dataset_id)):
+        x, y = _pair_values(chunk, x_column, y_column)
+        cells = _bin_positions(x, x_low, x_high, DENSITY_BINS) * DENSITY_BINS + _bin_positions(y, y_low, y_high, DENSITY_BINS)
+        grid += np.bincount(cells, minlength=DENSITY_BINS * DENSITY_BINS)
+    return grid.reshape(DENSITY_BINS, DENSITY_BINS)
+
+def _m4(x: np.ndarray, y: np.ndarray, low: float, high: float, buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Keeps the first, last, lowest and highest point of every x bucket:
+    a line drawn through them looks the same as one through all points
+    """
+    if not len(x):
+        return x, y
+    frame = pd.DataFrame({"bucket": _bin_positions(x, low, high, buckets), "x": x, "y": y})
+    groups = frame.groupby("bucket", sort=False)
+    keep = np.unique(np.concatenate([
+        groups["x"].idxmin().to_numpy(), groups["x"].idxmax().to_numpy(),
+        groups["y"].idxmin().to_numpy(), groups["y"].idxmax().to_numpy()
+    ]))
+    return x[keep], y[keep]
+
+def build_line(dataset_id: str, x_column: str, y_column: str, histograms: Dict[str, Dict[str, Any]]) -> np.ndarray:
+    """
+    Reduces the rows of a column pair to at most four points per x bucket
+    (VISUALIZATION_LINE_BUCKETS buckets over x's range), a chunk at a time,
+    and returns them sorted by x as a 2 x n array
+    """
+    low, high = histograms[x_column]["range"]
+    xs, ys = [], []
+    for chunk in _chunks(dataset_id, list(dict.fromkeys([x_column, y_column])), dataset_registry.get(dataset_id)):
+        x, y = _m4(*_pair_values(chunk, x_column, y_column), low, high, VISUALIZATION_LINE_BUCKETS)
+        xs.append(x)
+        ys.append(y)
+    # The extremes of every chunk's extremes are the extremes of all rows
+    x, y = _m4(np.concatenate(xs or [np.empty(0)]), np.concatenate(ys or [np.empty(0)]), low, high, VISUALIZATION_LINE_BUCKETS)
+    order = np.lexsort((y, x))
+    return np.vstack([x[order], y[order]])
+
+def get_pair_chart(dataset_id: str, kind: str, x_column: str, y_column: str, histograms: Dict[str, Dict[str, Any]]) -> np.ndarray:
+    """
+    Returns the cached density grid or line reduction of a column pair,
+    building and saving it on first use
+    """
+    key = _pair_key(kind, x_column, y_column)
+    chart = dataset_registry.get(dataset_id, key)
+    if chart is None:
+        path = get_store_path(dataset_id) / CHARTS_DIR / f"{key}.npy"
+        if path.exists():
+            chart = np.load(path)
+        else:
+            build = build_density if kind == "density" else build_line
+            chart = build(dataset_id, x_column, y_column, histograms)
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_suffix(".npy.tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, chart)
+            tmp_path.replace(path)
+        chart = dataset_registry.put(dataset_id, chart, key)
+    return chart
+
+def density(
+    grid: np.ndarray,
+    x_range: Tuple[float, float],
+    y_range: Tuple[float, float],
+    bins: int,
+    x_window: Optional[Tuple[float, float]] = None,
+    y_window: Optional[Tuple[float, float]] = None
+) -> Dict[str, Any]:
+    """
+    Binned 2D density of a column pair with about `bins` bins per axis over
+    a zoom window, summed from the finest grid like a 1D histogram
+    """
+    x_level, x_first, x_last = _zoom(*x_range, DENSITY_BINS, x_window, bins)
+    y_level, y_first, y_last = _zoom(*y_range, DENSITY_BINS, y_window, bins)
+    x_factor, y_factor = 1 << x_level, 1 << y_level
+    counts = grid.reshape(DENSITY_BINS // x_factor, x_factor, DENSITY_BINS // y_factor, y_factor).sum(axis=(1, 3))
+    counts = counts[x_first:x_last, y_first:y_last]
+    x_width = (x_range[1] - x_range[0]) / DENSITY_BINS * x_factor
+    y_width = (y_range[1] - y_range[0]) / DENSITY_BINS * y_factor
+    return {
+        "x_edges": (x_range[0] + np.arange(x_first, x_last + 1) * x_width).tolist(),
+        "y_edges": (y_range[0] + np.arange(y_first, y_last + 1) * y_width).tolist(),
+        # counts[i][j] is the number of rows in x bin i and y bin j
+        "counts": counts.tolist(),
+        "count": int(counts.sum()),
+        "total": int(grid.sum())
+    }
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: picks `points` of a line sorted by x,
+    always the first and last, and from every bucket between them the
+    point forming the largest triangle with the point kept before it and
+    the average of the next bucket. Returns the positions kept.
+    """
+    if points >= len(x) or points < 3:
+        return np.arange(len(x)) if points >= len(x) else np.array([0, len(x) - 1][:points])
+
+    edges = np.linspace(1, len(x) - 1, points - 1).astype(np.int64)
+    kept = np.empty(points, dtype=np.int64)
+    kept[0], kept[-1] = 0, len(x) - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        following = slice(stop, edges[bucket + 2]) if bucket + 2 < len(edges) else slice(len(x) - 1, len(x))
+        next_x, next_y = x[following].mean(), y[following].mean()
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return kept
+
+def line(reduced: np.ndarray, x_range: Tuple[float, float], points: int, x_window: Optional[Tuple[float, float]] = None) -> Dict[str, Any]:
+    """
+    Line series of a column pair with at most `points` points over a zoom
+    window of x, downsampled with LTTB from the reduction kept per bucket.
+    Deep zooms show the kept points, at most four per bucket.
+    """
+    x, y = reduced
+    resolution = (x_range[1] - x_range[0]) / VISUALIZATION_LINE_BUCKETS
+    if x_window is not None:
+        start, stop = np.searchsorted(x, x_window[0], side="left"), np.searchsorted(x, x_window[1], side="right")
+        x, y = x[start:stop], y[start:stop]
+    kept = lttb(x, y, points)
+    return {
+        "x": x[kept].tolist(),
+        "y": y[kept].tolist(),
+        "count": len(kept),
+        "reduced_points": len(x),
+        "resolution": resolution
+    }
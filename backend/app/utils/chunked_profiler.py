@@ -0,0 +1,371 @@
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from typing import Callable, Dict, Any, Optional, Tuple, Union
+
+from .column_store import (
+    ColumnStoreWriter,
+    write_column_store,
+    write_store_json,
+    read_store_json,
+    read_store_schema,
+    open_column_store
+)
+from .column_profiler import TOP_VALUES
+from .sketches import (
+    ColumnSketch,
+    save_dataset_sketches,
+    load_dataset_sketches,
+    _encode_array,
+    _decode_array,
+    _to_json_value
+)
+from ..config import CSV_CHUNK_ROWS
+
+# Distinct values counted exactly per column; beyond this only the most
+# frequent values are kept and distinct counts become lower bounds
+MAX_TRACKED_VALUES = 100_000
+
+# Per-dataset JSON document holding the accumulators, so appended rows can
+# be merged into the statistics without revisiting the stored ones
+COLUMN_STATS_FILE = "column_stats"
+
+class ColumnAccumulator:
+    """
+    Mergeable partial statistics of one column: row and null counts, sum,
+    sum of squared deviations from the mean, min/max and value counts, plus
+    the column's sketches for quantiles and distinct counts.
+    Accumulators built from separate chunks combine into the statistics of
+    the whole column without revisiting any rows.
+    """
+    def __init__(self, dtype: str, numeric: bool):
+        self.dtype = dtype
+        self.numeric = numeric
+        self.count = 0
+        self.non_null = 0
+        self.total = 0.0
+        self.m2 = 0.0
+        self.min = np.nan
+        self.max = np.nan
+        self.value_counts = pd.Series(dtype=np.int64)
+        self.truncated = False
+        self.sketch = ColumnSketch(numeric)
+
+    @classmethod
+    def from_series(cls, series: pd.Series, dtype: str, numeric: bool) -> "ColumnAccumulator":
+        """
+        Builds the partial statistics of one chunk of a column
+        """
+        accumulator = cls(dtype, numeric)
+        accumulator.count = len(series)
+        accumulator.sketch.update(series)
+
+        if numeric:
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            values = values[~np.isnan(values)]
+            accumulator.value_counts = pd.Series(values).value_counts().astype(np.int64)
+            if len(values):
+                accumulator.total = float(values.sum())
+                accumulator.m2 = float(((values - values.mean()) ** 2).sum())
+                accumulator.min = float(values.min())
+                accumulator.max = float(values.max())
+        else:
+            # Counted in order of first appearance, as column_profiler does,
+            # so ties between equally common values are broken the same way
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            accumulator.value_counts = pd.Series(counts, index=pd.Index(np.asarray(uniques, dtype=object)), dtype=np.int64)
+        accumulator.non_null = int(accumulator.value_counts.sum())
+
+        accumulator._truncate()
+        return accumulator
+
+    @classmethod
+    def missing_only(cls, count: int, dtype: str, numeric: bool) -> "ColumnAccumulator":
+        """
+        Statistics of `count` rows that are all missing
+        """
+        accumulator = cls(dtype, numeric)
+        accumulator.count = accumulator.sketch.count = accumulator.sketch.nulls = count
+        return accumulator
+
+    def merge(self, other: "ColumnAccumulator") -> "ColumnAccumulator":
+        """
+        Combines another accumulator of the same column into this one
+        """
+        if self.numeric and other.non_null:
+            if self.non_null:
+                # Parallel variance combination (Chan et al.)
+                delta = other.total / other.non_null - self.total / self.non_null
+                combined = self.non_null + other.non_null
+                self.m2 += other.m2 + delta ** 2 * self.non_null * other.non_null / combined
+            else:
+                self.m2 = other.m2
+            self.min = float(np.fmin(self.min, other.min))
+            self.max = float(np.fmax(self.max, other.max))
+
+        self.count += other.count
+        self.non_null += other.non_null
+        self.total += other.total
+        # Values already counted keep their place; new ones follow in their own order
+        index = self.value_counts.index.append(other.value_counts.index.difference(self.value_counts.index, sort=False))
+        self.value_counts = (
+            self.value_counts.reindex(index, fill_value=0) + other.value_counts.reindex(index, fill_value=0)
+        ).astype(np.int64)
+        self.truncated = self.truncated or other.truncated
+        self.sketch.merge(other.sketch)
+        self._truncate()
+        return self
+
+    def _truncate(self):
+        if len(self.value_counts) > MAX_TRACKED_VALUES:
+            self.value_counts = self.value_counts.nlargest(MAX_TRACKED_VALUES)
+            self.truncated = True
+
+    def _quantile(self, q: float) -> float:
+        """
+        Linear-interpolated quantile from the exact value counts, as
+        column_profiler computes it from the sorted values
+        """
+        values = self.value_counts.index.to_numpy(dtype=np.float64)
+        order = np.argsort(values, kind="stable")
+        values = values[order]
+        cumulative = np.cumsum(self.value_counts.to_numpy()[order])
+
+        position = q * (self.non_null - 1)
+        lower, upper = np.searchsorted(cumulative, [np.floor(position), np.ceil(position)], side="right")
+        return float(values[lower] + (values[upper] - values[lower]) * (position - np.floor(position)))
+
+    def to_profile(self) -> Dict[str, Any]:
+        """
+        Returns the statistics in the same layout as column_profiler.profile_dataset.
+        Medians and quartiles are exact while every distinct value is
+        counted; beyond that they come from the KLL sketch and distinct
+        counts fall back to HyperLogLog.
+        """
+        missing = self.count - self.non_null
+        profile = {
+            "dtype": self.dtype,
+            "is_numeric": self.numeric,
+            "count": self.count,
+            "missing_percentage": float(missing / self.count * 100) if self.count else 0.0,
+            "non_null": self.non_null,
+            "missing": missing,
+            "unique": len(self.value_counts),
+            "unique_exact": not self.truncated
+        }
+        if self.truncated:
+            profile["unique"] = int(round(min(self.sketch.distinct.estimate(), self.non_null)))
+
+        if self.numeric:
+            if not self.non_null:
+                quantile = lambda q: float("nan")
+            elif self.truncated:
+                quantile = self.sketch.quantiles.quantile
+            else:
+                quantile = self._quantile
+            profile.update({
+                "mean": self.total / self.non_null if self.non_null else float("nan"),
+                "median": quantile(0.5),
+                "median_exact": not self.truncated,
+                "quartiles": {
+                    "25%": quantile(0.25),
+                    "50%": quantile(0.50),
+                    "75%": quantile(0.75)
+                },
+                "std": float(np.sqrt(self.m2 / (self.non_null - 1))) if self.non_null > 1 else float("nan"),
+                "min": self.min,
+                "max": self.max
+            })
+        else:
+            ordered = self.value_counts.sort_values(ascending=False, kind="stable")
+            profile.update({
+                "most_common": ordered.head(TOP_VALUES).to_dict(),
+                "least_common": ordered.tail(TOP_VALUES).to_dict()
+            })
+        return profile
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serializes everything but the sketch, which is saved with the dataset's sketches
+        """
+        return {
+            "dtype": self.dtype,
+            "numeric": self.numeric,
+            "count": self.count,
+            "non_null": self.non_null,
+            "total": self.total,
+            "m2": self.m2,
+            "min": self.min,
+            "max": self.max,
+            "truncated": self.truncated,
+            "values": (
+                _encode_array(self.value_counts.index.to_numpy(dtype=np.float64)) if self.numeric
+                else [_to_json_value(value) for value in self.value_counts.index]
+            ),
+            "counts": _encode_array(self.value_counts.to_numpy(dtype=np.int64))
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], sketch: ColumnSketch) -> "ColumnAccumulator":
+        accumulator = cls(data["dtype"], data["numeric"])
+        for key in ("count", "non_null", "total", "m2", "min", "max", "truncated"):
+            setattr(accumulator, key, data[key])
+        if accumulator.numeric:
+            index = pd.Index(_decode_array(data["values"], np.float64))
+        elif data["dtype"].startswith("datetime64"):
+            # Timestamps were stored as text
+            index = pd.Index(pd.to_datetime(data["values"]), dtype=object)
+        else:
+            index = pd.Index(data["values"], dtype=object)
+        accumulator.value_counts = pd.Series(_decode_array(data["counts"], np.int64), index=index)
+        accumulator.sketch = sketch
+        return accumulator
+
+def build_column_accumulators(df: pd.DataFrame) -> Dict[str, ColumnAccumulator]:
+    """
+    Builds the mergeable statistics of every column of a DataFrame
+    """
+    return {
+        column: ColumnAccumulator.from_series(df[column], str(df[column].dtype), pd.api.types.is_numeric_dtype(df[column]))
+        for column in df.columns
+    }
+
+def build_store_accumulators(dataset_id: str) -> Dict[str, ColumnAccumulator]:
+    """
+    Builds the mergeable statistics of a stored dataset one row group at a
+    time, for datasets ingested before they were kept
+    """
+    parquet_file = open_column_store(dataset_id)
+    schema = read_store_schema(dataset_id)
+    accumulators: Dict[str, ColumnAccumulator] = {}
+    for group in range(parquet_file.metadata.num_row_groups):
+        chunk = parquet_file.read_row_group(group).to_pandas().astype(schema)
+        for column, partial in build_column_accumulators(chunk).items():
+            if column in accumulators:
+                accumulators[column].merge(partial)
+            else:
+                accumulators[column] = partial
+    if not accumulators:
+        empty = parquet_file.schema_arrow.empty_table().to_pandas().astype(schema)
+        accumulators = build_column_accumulators(empty)
+    return accumulators
+
+def save_column_accumulators(dataset_id: str, accumulators: Dict[str, ColumnAccumulator]):
+    """
+    Persists the mergeable statistics of a dataset together with its sketches
+    """
+    write_store_json(dataset_id, COLUMN_STATS_FILE, {column: accumulator.to_dict() for column, accumulator in accumulators.items()})
+    save_dataset_sketches(dataset_id, {column: accumulator.sketch for column, accumulator in accumulators.items()})
+
+def load_column_accumulators(dataset_id: str) -> Optional[Dict[str, ColumnAccumulator]]:
+    """
+    Returns the mergeable statistics of a dataset, or None if they were never kept
+    """
+    data = read_store_json(dataset_id, COLUMN_STATS_FILE)
+    sketches = load_dataset_sketches(dataset_id)
+    if data is None or sketches is None or set(data) != set(sketches):
+        return None
+    return {column: ColumnAccumulator.from_dict(stats, sketches[column]) for column, stats in data.items()}
+
+def _target_dtype(series: pd.Series) -> str:
+    """
+    Chooses the dtype a column keeps across all chunks, based on the first chunk.
+    Integers and booleans use nullable dtypes so later chunks with gaps still fit.
+    """
+    if pd.api.types.is_bool_dtype(series):
+        return "boolean"
+    if pd.api.types.is_integer_dtype(series):
+        return "Int64"
+    if pd.api.types.is_float_dtype(series):
+        return "float64"
+    return "object"
+
+def _fits(series: pd.Series, target: str) -> bool:
+    """
+    Checks whether a later chunk of a column can be stored with the target dtype
+    """
+    if series.isna().all():
+        return True
+    if target == "object":
+        return series.dtype == object
+    if target == "boolean":
+        return pd.api.types.is_bool_dtype(series) or (
+            series.dtype == object and series.dropna().isin([True, False]).all()
+        )
+    if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+        return False
+    if target == "Int64":
+        return pd.api.types.is_integer_dtype(series) or bool((series.dropna() % 1 == 0).all())
+    return True
+
+def _widen(series: pd.Series, target: str) -> str:
+    """
+    Returns the dtype that fits both the earlier chunks and a misfitting chunk
+    """
+    if target == "Int64" and pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return "float64"
+    return "object"
+
+def _ingest_pass(file_path: Path, dataset_id: str, chunk_rows: int, overrides: Dict[str, str], progress: Optional[Callable[[float], None]]) -> Optional[Tuple[Dict[str, Dict[str, Any]], int]]:
+    """
+    Streams the CSV once, writing the columnar store and accumulating statistics.
+    Returns None (after widening `overrides`) when a chunk does not fit the
+    dtypes chosen so far, so the caller can start over.
+    """
+    read_dtypes = {col: (str if dtype == "object" else dtype) for col, dtype in overrides.items()}
+    writer = ColumnStoreWriter(dataset_id)
+    targets: Dict[str, str] = {}
+    accumulators: Dict[str, ColumnAccumulator] = {}
+
+    file_size = file_path.stat().st_size or 1
+
+    try:
+        with open(file_path, "rb") as handle:
+            for chunk in pd.read_csv(handle, chunksize=chunk_rows, dtype=read_dtypes):
+                if not targets:
+                    targets = {col: overrides.get(col) or _target_dtype(chunk[col]) for col in chunk.columns}
+
+                for col, target in targets.items():
+                    if not _fits(chunk[col], target):
+                        overrides[col] = _widen(chunk[col], target)
+                        writer.abort()
+                        return None
+                chunk = chunk.astype(targets)
+
+                writer.write(chunk)
+                for col, target in targets.items():
+                    partial = ColumnAccumulator.from_series(chunk[col], target, numeric=target != "object")
+                    if col in accumulators:
+                        accumulators[col].merge(partial)
+                    else:
+                        accumulators[col] = partial
+                if progress:
+                    # Bytes consumed by the parser, so slightly ahead of the rows processed
+                    progress(handle.tell() / file_size)
+    except BaseException:
+        writer.abort()
+        raise
+
+    writer.close()
+    if not accumulators:
+        # Header-only file: no chunks were produced
+        write_column_store(dataset_id, pd.read_csv(file_path, nrows=0))
+        return {}, 0
+
+    profile = {col: accumulator.to_profile() for col, accumulator in accumulators.items()}
+    save_column_accumulators(dataset_id, accumulators)
+    return profile, next(iter(accumulators.values())).count
+
+def profile_csv_in_chunks(file_path: Union[str, Path], dataset_id: str, chunk_rows: int = CSV_CHUNK_ROWS, progress: Optional[Callable[[float], None]] = None) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """
+    Profiles a CSV file and writes its columnar store without ever holding
+    more than one chunk in memory.
+    `progress` is called after each chunk with the fraction of the file read.
+    Returns the dataset profile and the number of rows.
+    """
+    overrides: Dict[str, str] = {}
+    while True:
+        result = _ingest_pass(Path(file_path), dataset_id, chunk_rows, overrides, progress)
+        if result is not None:
+            return result
@@ -0,0 +1,146 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Any, Optional
+
+from .dataset_registry import dataset_registry
+
+# Number of values reported in the most/least common lists
+TOP_VALUES = 5
+
+# Float64 bytes of numeric columns converted and sorted at a time; one
+# buffer of this size (at least one column) is reused for every batch
+PROFILE_BATCH_BYTES = 64 * 1024 ** 2
+
+# Larger integers are not all exact in float64
+FLOAT_EXACT_INTEGERS = 2 ** 53
+
+def _sorted_quantile(values: np.ndarray, q: float) -> float:
+    """
+    Linear-interpolated quantile of sorted values without missing ones
+    """
+    position = q * (len(values) - 1)
+    lower, upper = int(np.floor(position)), int(np.ceil(position))
+    return float(values[lower] + (values[upper] - values[lower]) * (position - lower))
+
+def _distinct_sorted(values: np.ndarray) -> int:
+    """Distinct values of a sorted array"""
+    return int(np.count_nonzero(values[1:] != values[:-1])) + (len(values) > 0)
+
+def _exact_integers(series: pd.Series) -> Optional[np.ndarray]:
+    """
+    The sorted values of a 64-bit integer column that holds values float64
+    cannot tell apart, so distinct counts and extremes use them instead
+    """
+    if not pd.api.types.is_integer_dtype(series.dtype) or series.dtype.itemsize < 8:
+        return None
+    low, high = series.min(), series.max()
+    if pd.isna(low) or (-FLOAT_EXACT_INTEGERS <= low and high <= FLOAT_EXACT_INTEGERS):
+        return None
+    return np.sort(series.dropna().to_numpy(dtype=np.uint64 if series.dtype.kind == "u" else np.int64))
+
+def _profile_numeric(df: pd.DataFrame, columns: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Profiles numeric columns a batch at a time. Each batch is converted to
+    float64 in one reused buffer with a contiguous column each, and every
+    column is sorted in place: its values then come first, missing ones
+    last, and min/max, quantiles and distinct counts are read from that slice.
+    """
+    n_rows = len(df)
+    batch_columns = max(1, min(len(columns), PROFILE_BATCH_BYTES // (8 * max(n_rows, 1))))
+    buffer = np.empty((n_rows, batch_columns), dtype=np.float64, order="F")
+
+    profiles = {}
+    for column_number, column in enumerate(columns):
+        values = buffer[:, column_number % batch_columns]
+        values[:] = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        values.sort()
+        # NaN sorts last, so the column's values are its first `count` rows
+        count = n_rows - int(np.count_nonzero(np.isnan(values)))
+        present = values[:count]
+
+        mean = std = minimum = maximum = float("nan")
+        quartiles = {"25%": float("nan"), "50%": float("nan"), "75%": float("nan")}
+        if count:
+            mean = float(present.sum() / count)
+            if count > 1:
+                centered = present - mean
+                std = float(np.sqrt(np.dot(centered, centered) / (count - 1)))
+            minimum, maximum = float(present[0]), float(present[-1])
+            quartiles = {label: _sorted_quantile(present, q) for label, q in (("25%", 0.25), ("50%", 0.50), ("75%", 0.75))}
+
+        unique = _distinct_sorted(present)
+        integers = _exact_integers(df[column])
+        if integers is not None:
+            unique = _distinct_sorted(integers)
+            minimum, maximum = int(integers[0]), int(integers[-1])
+
+        profiles[column] = {
+            "non_null": count,
+            "missing": n_rows - count,
+            "unique": unique,
+            "mean": mean,
+            "median": quartiles["50%"],
+            "std": std,
+            "min": minimum,
+            "max": maximum,
+            "quartiles": quartiles
+        }
+    return profiles
+
+def _profile_other(df: pd.DataFrame, columns: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Profiles non-numeric columns with a single hash pass (factorize) per column.
+    Missing, distinct and most/least common values all come from the codes.
+    """
+    n_rows = len(df)
+    profiles = {}
+    for column in columns:
+        codes, uniques = pd.factorize(df[column], use_na_sentinel=True)
+        present = codes[codes >= 0]
+        value_counts = np.bincount(present, minlength=len(uniques))
+        order = np.argsort(-value_counts, kind="stable")
+
+        profiles[column] = {
+            "non_null": int(len(present)),
+            "missing": int(n_rows - len(present)),
+            "unique": int(len(uniques)),
+            "most_common": {uniques[i]: int(value_counts[i]) for i in order[:TOP_VALUES]},
+            "least_common": {uniques[i]: int(value_counts[i]) for i in order[-TOP_VALUES:]}
+        }
+    return profiles
+
+def profile_dataset(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    Computes per-column statistics for a whole DataFrame.
+    Returns a dictionary keyed by column name, in column order.
+    """
+    n_rows = len(df)
+    numeric_columns = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+    numeric_set = set(numeric_columns)
+    other_columns = [col for col in df.columns if col not in numeric_set]
+
+    partial = {}
+    if numeric_columns:
+        partial.update(_profile_numeric(df, numeric_columns))
+    partial.update(_profile_other(df, other_columns))
+
+    profile = {}
+    for column in df.columns:
+        stats = partial[column]
+        profile[column] = {
+            "dtype": str(df[column].dtype),
+            "is_numeric": "mean" in stats,
+            "count": n_rows,
+            "missing_percentage": float(stats["missing"] / n_rows * 100) if n_rows else 0.0,
+            **stats
+        }
+    return profile
+
+def get_dataset_profile(dataset_id: str, df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    Returns the cached profile of a dataset, computing it on first use
+    """
+    profile = dataset_registry.get(dataset_id, "profile")
+    if profile is None:
+        profile = dataset_registry.put(dataset_id, profile_dataset(df), "profile")
+    return profile
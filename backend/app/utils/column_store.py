@@ -0,0 +1,592 @@
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+import shutil
+import json
+import io
+
+from ..config import MEMORY_MAP_COLUMNS, STORE_ROW_GROUP_ROWS
+
+# Columnar copies of uploaded datasets live next to the raw uploads so the
+# existing cleanup of data/uploads also removes them
+STORE_DIR = Path("data/uploads/.store")
+DATA_FILE = "data.parquet"
+
+# Numeric columns are also kept as .npy files that readers memory-map, so
+# every worker process shares one copy through the OS page cache
+MAPPED_DIR = "columns"
+MAPPED_MANIFEST = "mapped_columns"
+
+# Rows appended after ingest are written as further Parquet parts with the
+# schema of DATA_FILE; this manifest lists them in row order
+PARTS_MANIFEST = "data_parts"
+
+def get_store_path(dataset_id: str) -> Path:
+    """
+    Returns the directory holding the columnar copy of a dataset
+    """
+    return STORE_DIR / dataset_id
+
+def has_column_store(dataset_id: str) -> bool:
+    """
+    Checks whether a dataset has already been converted to the columnar format
+    """
+    return (get_store_path(dataset_id) / DATA_FILE).exists()
+
+def _store_files(dataset_id: str) -> List[Path]:
+    store_path = get_store_path(dataset_id)
+    return [store_path / DATA_FILE] + [store_path / part for part in read_store_json(dataset_id, PARTS_MANIFEST) or []]
+
+class ColumnStoreMetadata:
+    """
+    Row counts and row group statistics of every part of a stored dataset,
+    with row groups numbered across the parts in row order
+    """
+    def __init__(self, row_groups: List[pq.RowGroupMetaData], num_columns: int):
+        self._row_groups = row_groups
+        self.num_row_groups = len(row_groups)
+        self.num_rows = sum(row_group.num_rows for row_group in row_groups)
+        self.num_columns = num_columns
+
+    def row_group(self, group: int) -> pq.RowGroupMetaData:
+        return self._row_groups[group]
+
+class ColumnStoreFile:
+    """
+    Reads the Parquet parts of a stored dataset as if they were one file,
+    with the subset of the pyarrow.parquet.ParquetFile interface the
+    readers use
+    """
+    def __init__(self, dataset_id: str):
+        self._files = [pq.ParquetFile(path) for path in _store_files(dataset_id)]
+        self.schema_arrow = self._files[0].schema_arrow
+        # (file, row group within it) of every row group in row order
+        self._groups = [
+            (parquet_file, group)
+            for parquet_file in self._files
+            for group in range(parquet_file.metadata.num_row_groups)
+        ]
+        self.metadata = ColumnStoreMetadata(
+            [parquet_file.metadata.row_group(group) for parquet_file, group in self._groups],
+            self._files[0].metadata.num_columns
+        )
+
+    def read_row_group(self, group: int, columns: Optional[List[str]] = None) -> pa.Table:
+        parquet_file, index = self._groups[group]
+        return parquet_file.read_row_group(index, columns=columns)
+
+    def read_row_groups(self, groups: List[int], columns: Optional[List[str]] = None) -> pa.Table:
+        tables = [self.read_row_group(group, columns=columns) for group in groups]
+        return pa.concat_tables(tables) if tables else self._empty(columns)
+
+    def read(self, columns: Optional[List[str]] = None) -> pa.Table:
+        return pa.concat_tables([parquet_file.read(columns=columns) for parquet_file in self._files])
+
+    def _empty(self, columns: Optional[List[str]]) -> pa.Table:
+        return self.schema_arrow.empty_table().select(columns if columns is not None else self.schema_arrow.names)
+
+def open_column_store(dataset_id: str) -> ColumnStoreFile:
+    """
+    Opens the columnar copy of a dataset, ingested rows and appended ones alike
+    """
+    return ColumnStoreFile(dataset_id)
+
+def _replace_data_file(dataset_id: str, tmp_path: Path):
+    """
+    Makes a newly written file the whole columnar copy, dropping the parts
+    appended to the one it replaces
+    """
+    store_path = get_store_path(dataset_id)
+    parts = read_store_json(dataset_id, PARTS_MANIFEST) or []
+    (store_path / f"{PARTS_MANIFEST}.json").unlink(missing_ok=True)
+    tmp_path.replace(store_path / DATA_FILE)
+    for part in parts:
+        (store_path / part).unlink(missing_ok=True)
+
+def _prepare_for_store(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalizes a DataFrame so it can be written to Parquet.
+    Column names become strings and object columns holding mixed Python
+    types (common in Excel sheets) are stored as strings.
+    """
+    df = df.reset_index(drop=True)
+    df.columns = [str(col) for col in df.columns]
+
+    for column in df.columns:
+        series = df[column]
+        if series.dtype == 'object':
+            types = series.dropna().map(type).unique()
+            if len(types) > 1:
+                df[column] = series.where(series.isna(), series.astype(str))
+
+    return df
+
+def write_column_store(dataset_id: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Writes the columnar copy of a dataset
+    Returns the DataFrame exactly as it was stored
+    """
+    df = _prepare_for_store(df)
+
+    store_path = get_store_path(dataset_id)
+    store_path.mkdir(parents=True, exist_ok=True)
+
+    # Write to a temporary file first so readers never see a partial file
+    tmp_path = store_path / f"{DATA_FILE}.tmp"
+    df.to_parquet(tmp_path, index=False, row_group_size=STORE_ROW_GROUP_ROWS)
+    _replace_data_file(dataset_id, tmp_path)
+    _write_mapped_columns(dataset_id)
+
+    # Hand back the mapped columns so callers cache them instead of private copies
+    manifest = read_store_json(dataset_id, MAPPED_MANIFEST) if MEMORY_MAP_COLUMNS else None
+    if manifest:
+        df = _assemble_frame(dataset_id, list(df.columns), manifest, df)
+    return df
+
+def _mapped_dtype(pandas_dtype: Any, null_count: int) -> Optional[np.dtype]:
+    """
+    Returns the NumPy dtype pandas reads a Parquet column as, when it is a
+    plain numeric array that can be memory-mapped
+    """
+    if isinstance(pandas_dtype, pd.api.extensions.ExtensionDtype) or pandas_dtype.kind not in "iufb":
+        return None
+    if null_count:
+        if pandas_dtype.kind == "b":
+            return None  # booleans with gaps are read as objects
+        if pandas_dtype.kind in "iu":
+            return np.dtype(np.float64)  # integers with gaps are read as floats
+    return np.dtype(pandas_dtype)
+
+def _null_counts(metadata: ColumnStoreMetadata) -> List[int]:
+    """
+    Returns the number of nulls of every column from the Parquet statistics
+    """
+    counts = [0] * metadata.num_columns
+    for group in range(metadata.num_row_groups):
+        row_group = metadata.row_group(group)
+        # Stores are flat tables, so Parquet column chunks line up with fields
+        for position in range(metadata.num_columns):
+            statistics = row_group.column(position).statistics
+            counts[position] += statistics.null_count if statistics is not None and statistics.has_null_count else 0
+    return counts
+
+def _mapped_dtypes(store: ColumnStoreFile) -> Dict[str, Optional[np.dtype]]:
+    """
+    Returns the dtype every column is memory-mapped with, or None for
+    columns that are not
+    """
+    # An empty table converted to pandas shows the dtypes read_parquet produces
+    dtypes = store.schema_arrow.empty_table().to_pandas().dtypes
+    return {
+        name: _mapped_dtype(dtypes[name], null_count)
+        for name, null_count in zip(store.schema_arrow.names, _null_counts(store.metadata))
+    }
+
+def _mapped_values(column: pa.ChunkedArray, dtype: np.dtype) -> np.ndarray:
+    return column.cast(pa.from_numpy_dtype(dtype)).to_numpy(zero_copy_only=False)
+
+def _write_mapped_column(store: ColumnStoreFile, name: str, dtype: np.dtype, path: Path):
+    """
+    Copies one column of the store to a .npy file one row group at a time,
+    so the copy never needs the whole column in memory
+    """
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    array = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=(store.metadata.num_rows,))
+    offset = 0
+    for group in range(store.metadata.num_row_groups):
+        values = _mapped_values(store.read_row_group(group, columns=[name]).column(0), dtype)
+        array[offset:offset + len(values)] = values
+        offset += len(values)
+    array.flush()
+    del array
+    tmp_path.replace(path)
+
+def _write_mapped_columns(dataset_id: str):
+    """
+    Copies the numeric columns of the store to .npy files
+    """
+    if not MEMORY_MAP_COLUMNS:
+        return
+
+    store = open_column_store(dataset_id)
+    mapped_dir = get_store_path(dataset_id) / MAPPED_DIR
+    mapped_dir.mkdir(exist_ok=True)
+    manifest = {}
+    for position, (name, dtype) in enumerate(_mapped_dtypes(store).items()):
+        if dtype is None:
+            continue
+        file_name = f"{position}.npy"
+        _write_mapped_column(store, name, dtype, mapped_dir / file_name)
+        manifest[name] = file_name
+
+    # The manifest is written last so readers only see complete files
+    write_store_json(dataset_id, MAPPED_MANIFEST, manifest)
+
+def _extend_mapped_column(path: Path, dtype: np.dtype, values: np.ndarray) -> bool:
+    """
+    Appends values to a .npy file in place: they are written after the
+    stored ones and only the header is rewritten, with the new length.
+    Returns False, leaving the file as it was, when it holds another dtype
+    or its header has no room for the new length.
+    """
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, stored_dtype = read_header(f)
+        data_offset = f.tell()
+        if stored_dtype != dtype or len(shape) != 1:
+            return False
+
+        header = io.BytesIO()
+        write_header = np.lib.format.write_array_header_1_0 if version == (1, 0) else np.lib.format.write_array_header_2_0
+        write_header(header, {
+            "descr": np.lib.format.dtype_to_descr(dtype),
+            "fortran_order": fortran_order,
+            "shape": (shape[0] + len(values),)
+        })
+        # NumPy pads headers so the length can grow without moving the data
+        if header.tell() != data_offset:
+            return False
+
+        # Anything past the stored values is left over from an interrupted append
+        f.seek(data_offset + shape[0] * dtype.itemsize)
+        f.truncate()
+        f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        f.flush()
+        f.seek(0)
+        f.write(header.getvalue())
+    return True
+
+def _append_mapped_columns(dataset_id: str, new_rows: pa.Table):
+    """
+    Extends the .npy copies of the numeric columns by appended rows. A
+    column whose mapped dtype changes (integers gaining gaps read as
+    floats) is copied again; one that can no longer be mapped is dropped.
+    """
+    if not MEMORY_MAP_COLUMNS:
+        return
+    manifest = read_store_json(dataset_id, MAPPED_MANIFEST)
+    if manifest is None:
+        _write_mapped_columns(dataset_id)
+        return
+
+    store = open_column_store(dataset_id)
+    mapped_dir = get_store_path(dataset_id) / MAPPED_DIR
+    mapped_dir.mkdir(exist_ok=True)
+    dropped = []
+    for position, (name, dtype) in enumerate(_mapped_dtypes(store).items()):
+        if dtype is None:
+            if name in manifest:
+                dropped.append(manifest.pop(name))
+            continue
+        if name in manifest and _extend_mapped_column(mapped_dir / manifest[name], dtype, _mapped_values(new_rows.column(name), dtype)):
+            continue
+        file_name = f"{position}.npy"
+        _write_mapped_column(store, name, dtype, mapped_dir / file_name)
+        manifest[name] = file_name
+
+    write_store_json(dataset_id, MAPPED_MANIFEST, manifest)
+    for file_name in dropped:
+        (mapped_dir / file_name).unlink(missing_ok=True)
+
+class ColumnStoreWriter:
+    """
+    Writes the columnar copy of a dataset one chunk at a time, for files
+    that are too large to hold in memory. Every chunk must have the same
+    columns and dtypes; each one becomes a Parquet row group.
+    """
+    def __init__(self, dataset_id: str):
+        self.store_path = get_store_path(dataset_id)
+        self.store_path.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.store_path / f"{DATA_FILE}.tmp"
+        self._writer: Optional[pq.ParquetWriter] = None
+
+    def write(self, df: pd.DataFrame):
+        """
+        Appends a chunk to the store
+        """
+        if self._writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            # Columns that are empty in the first chunk are stored as strings.
+            # The pandas metadata is dropped so nullable chunk dtypes read back
+            # the way read_csv would produce them (int with gaps -> float).
+            schema = pa.schema(
+                [field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema]
+            )
+            table = table.cast(schema)
+            self._writer = pq.ParquetWriter(self.tmp_path, schema)
+        else:
+            # Reuse the first chunk's schema so all-null chunks keep their types
+            table = pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def close(self):
+        """
+        Finishes the file and makes it visible to readers
+        """
+        if self._writer is not None:
+            self._writer.close()
+            _replace_data_file(self.store_path.name, self.tmp_path)
+            _write_mapped_columns(self.store_path.name)
+
+    def abort(self):
+        """
+        Discards a partially written file
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self.tmp_path.unlink(missing_ok=True)
+
+def _append_type(name: str, stored: pa.DataType, series: pd.Series) -> Tuple[pa.DataType, pd.Series]:
+    """
+    Chooses the Parquet type a stored column keeps once new values are
+    appended to it, widening it when they do not fit (int8 -> int16,
+    int -> float64, ...). Returns the type and the new values, converted
+    where pandas parsed them differently (text to timestamps, ...).
+    Raises ValueError when the new values are of another kind.
+    """
+    present = series.dropna()
+    if not len(present):
+        return stored, series
+    if pa.types.is_null(stored):
+        # Nothing stored so far: the new values decide
+        return pa.array(series, from_pandas=True).type, series
+
+    is_bool = pd.api.types.is_bool_dtype(series)
+    is_number = pd.api.types.is_numeric_dtype(series) and not is_bool
+    if pa.types.is_integer(stored) and is_number:
+        # Floats holding only whole numbers are integers with gaps, which
+        # pandas parses as floats
+        if pd.api.types.is_integer_dtype(series) or bool((present % 1 == 0).all()):
+            fitted = pd.to_numeric(present.astype(np.int64), downcast="integer").dtype
+            return pa.from_numpy_dtype(np.promote_types(stored.to_pandas_dtype(), fitted)), series
+        return pa.float64(), series
+    if pa.types.is_floating(stored) and is_number:
+        values = present.to_numpy(dtype=np.float64)
+        if stored == pa.float32() and np.array_equal(values.astype(np.float32).astype(np.float64), values):
+            return pa.float32(), series
+        return pa.float64(), series
+    if pa.types.is_boolean(stored) and (is_bool or bool(present.isin([True, False]).all())):
+        return pa.bool_(), series
+    if pa.types.is_timestamp(stored):
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return stored, series
+        if series.dtype == object:
+            return stored, pd.to_datetime(series)
+    text_values = stored.value_type if pa.types.is_dictionary(stored) else stored
+    if pa.types.is_string(text_values) or pa.types.is_large_string(text_values):
+        # Text columns take any values as text, as mixed columns are stored
+        if not (series.dtype == object and pd.api.types.infer_dtype(present) == "string") and not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.where(series.isna(), series.astype(str))
+        if pa.types.is_dictionary(stored):
+            # Every row group keeps a dictionary of its own, so the stored
+            # index width holds as long as the new rows' categories fit in it;
+            # otherwise it grows wide enough for any number of them
+            if present.nunique() <= np.iinfo(stored.index_type.to_pandas_dtype()).max:
+                return stored, series
+            return pa.dictionary(pa.int32(), stored.value_type), series
+        return stored, series
+    raise ValueError(f"Column '{name}' holds {stored} values but the new rows hold {series.dtype} values")
+
+def append_column_store(dataset_id: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds rows to the columnar copy of a dataset. When they fit the stored
+    columns they become a further Parquet part and extend the memory-mapped
+    columns in place, so only the new rows are written. Stored columns are
+    widened where the new values need it, which rewrites the store one row
+    group at a time, so memory use does not grow with the dataset.
+    Returns the new rows as they read back from the store.
+    """
+    df = _prepare_for_store(df)
+    store_path = get_store_path(dataset_id)
+    store = open_column_store(dataset_id)
+
+    fields = []
+    columns = {}
+    for field in store.schema_arrow:
+        target, values = _append_type(field.name, field.type, df[field.name])
+        fields.append(pa.field(field.name, target))
+        columns[field.name] = values
+    schema = pa.schema(fields)
+    if schema.equals(store.schema_arrow):
+        # Keep the stored schema, metadata included, so the parts read back alike
+        schema = store.schema_arrow
+    try:
+        new_rows = pa.Table.from_pandas(pd.DataFrame(columns), preserve_index=False)
+        new_rows = pa.Table.from_arrays([new_rows.column(field.name).cast(field.type) for field in schema], schema=schema)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+        raise ValueError(f"New rows do not fit the stored columns: {e}")
+
+    if schema is store.schema_arrow:
+        parts = read_store_json(dataset_id, PARTS_MANIFEST) or []
+        part = f"data.{len(parts) + 1}.parquet"
+        tmp_path = store_path / f"{part}.tmp"
+        try:
+            pq.write_table(new_rows, tmp_path, row_group_size=STORE_ROW_GROUP_ROWS)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        tmp_path.replace(store_path / part)
+        write_store_json(dataset_id, PARTS_MANIFEST, parts + [part])
+        _append_mapped_columns(dataset_id, new_rows)
+        return new_rows.to_pandas()
+
+    # Write to a temporary file first so readers never see a partial file
+    tmp_path = store_path / f"{DATA_FILE}.tmp"
+    try:
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            for group in range(store.metadata.num_row_groups):
+                writer.write_table(store.read_row_group(group).cast(schema))
+            writer.write_table(new_rows, row_group_size=STORE_ROW_GROUP_ROWS)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    _replace_data_file(dataset_id, tmp_path)
+    _write_mapped_columns(dataset_id)
+    return new_rows.to_pandas()
+
+def read_column_store(dataset_id: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Reads a dataset (or only the requested columns) from its columnar copy.
+    Numeric columns are zero-copy views of memory-mapped files; they are
+    read-only, so callers must not modify them in place.
+    """
+    manifest = read_store_json(dataset_id, MAPPED_MANIFEST) if MEMORY_MAP_COLUMNS else None
+    if not manifest:
+        return open_column_store(dataset_id).read(columns=columns).to_pandas()
+
+    names = columns if columns is not None else read_store_columns(dataset_id)
+    mapped = [name for name in names if name in manifest]
+    if not mapped:
+        return open_column_store(dataset_id).read(columns=names).to_pandas()
+
+    others = [name for name in names if name not in manifest]
+    parsed = open_column_store(dataset_id).read(columns=others).to_pandas() if others else None
+    return _assemble_frame(dataset_id, names, manifest, parsed)
+
+def _assemble_frame(dataset_id: str, names: List[str], manifest: Dict[str, str], others: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Builds a DataFrame from memory-mapped columns and already loaded ones
+    without copying either
+    """
+    mapped_dir = get_store_path(dataset_id) / MAPPED_DIR
+    data: Dict[str, Any] = {}
+    for name in names:
+        if name in manifest:
+            data[name] = np.load(mapped_dir / manifest[name], mmap_mode="r")
+        else:
+            data[name] = others[name]
+    return pd.DataFrame(data, columns=names, copy=False)
+
+def read_store_rows(dataset_id: str, offset: int, limit: int, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Reads rows [offset, offset + limit) from the columnar copy, decoding only
+    the row groups that hold them
+    """
+    parquet = open_column_store(dataset_id)
+    groups = []
+    first = None
+    start = 0
+    for group in range(parquet.metadata.num_row_groups):
+        end = start + parquet.metadata.row_group(group).num_rows
+        if end > offset and start < offset + limit:
+            groups.append(group)
+            first = start if first is None else first
+        start = end
+
+    if not groups:
+        return parquet.schema_arrow.empty_table().select(columns or parquet.schema_arrow.names).to_pandas()
+    table = parquet.read_row_groups(groups, columns=columns)
+    return table.slice(offset - first, limit).to_pandas()
+
+def read_store_take(dataset_id: str, positions: np.ndarray, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Reads the rows at the given positions from the columnar copy, decoding
+    only the row groups that hold them. Rows come back in the order given.
+    """
+    parquet = open_column_store(dataset_id)
+    positions = np.asarray(positions, dtype=np.int64)
+    sizes = [parquet.metadata.row_group(group).num_rows for group in range(parquet.metadata.num_row_groups)]
+    starts = np.concatenate(([0], np.cumsum(sizes)))
+    row_groups = np.searchsorted(starts, positions, side="right") - 1
+    groups = np.unique(row_groups)
+    if not len(groups):
+        return parquet.schema_arrow.empty_table().select(columns or parquet.schema_arrow.names).to_pandas()
+
+    table = parquet.read_row_groups(groups.tolist(), columns=columns)
+    # Position of each requested row within the concatenated groups
+    group_offsets = np.concatenate(([0], np.cumsum([sizes[group] for group in groups])))
+    local = positions - starts[row_groups] + group_offsets[np.searchsorted(groups, row_groups)]
+    return table.take(pa.array(local)).to_pandas()
+
+def read_store_row_count(dataset_id: str) -> int:
+    """
+    Returns the number of rows of a stored dataset without reading any data
+    """
+    return sum(pq.read_metadata(path).num_rows for path in _store_files(dataset_id))
+
+def read_store_schema(dataset_id: str) -> Dict[str, str]:
+    """
+    Returns the pandas dtype of every column of a stored dataset without reading any data
+    """
+    parquet_file = open_column_store(dataset_id)
+    dtypes = parquet_file.schema_arrow.empty_table().to_pandas().dtypes
+    schema = {}
+    for name, null_count in zip(parquet_file.schema_arrow.names, _null_counts(parquet_file.metadata)):
+        dtype = dtypes[name]
+        if null_count and not isinstance(dtype, pd.api.extensions.ExtensionDtype) and dtype.kind in "iub":
+            # Gaps turn integers into floats and booleans into objects on read
+            dtype = np.dtype(np.float64) if dtype.kind in "iu" else np.dtype(object)
+        schema[name] = str(dtype)
+    return schema
+
+def read_store_text_columns(dataset_id: str) -> List[str]:
+    """
+    Returns the columns of a stored dataset that hold text, plain or
+    dictionary-encoded, without reading any data
+    """
+    schema = pq.read_schema(get_store_path(dataset_id) / DATA_FILE)
+    text = lambda type_: pa.types.is_string(type_) or pa.types.is_large_string(type_)
+    return [
+        field.name for field in schema
+        if text(field.type) or (pa.types.is_dictionary(field.type) and text(field.type.value_type))
+    ]
+
+def read_store_columns(dataset_id: str) -> List[str]:
+    """
+    Returns the column names of a stored dataset without reading any data
+    """
+    return pq.read_schema(get_store_path(dataset_id) / DATA_FILE).names
+
+def write_store_json(dataset_id: str, name: str, data: Any):
+    """
+    Saves a JSON document (sketches, metadata, ...) next to a dataset's columnar copy
+    """
+    store_path = get_store_path(dataset_id)
+    store_path.mkdir(parents=True, exist_ok=True)
+    tmp_path = store_path / f"{name}.json.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    tmp_path.replace(store_path / f"{name}.json")
+
+def read_store_json(dataset_id: str, name: str) -> Optional[Any]:
+    """
+    Loads a JSON document saved with write_store_json, or None if it does not exist
+    """
+    path = get_store_path(dataset_id) / f"{name}.json"
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def delete_column_store(dataset_id: str):
+    """
+    Removes the columnar copy of a dataset
+    """
+    store_path = get_store_path(dataset_id)
+    if store_path.exists():
+        shutil.rmtree(store_path)
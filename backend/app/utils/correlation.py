@@ -0,0 +1,217 @@
+import pandas as pd
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+from .executors import thread_executor
+from ..config import CORRELATION_BLOCK_COLUMNS, CORRELATION_MAX_CATEGORIES
+
+CORRELATION_METHODS = ("pearson", "spearman", "cramers_v")
+
+# Memory (bytes) for the one-hot rows multiplied at once for Cramér's V
+ONE_HOT_CHUNK_BYTES = 64 * 1024 ** 2
+
+# Candidate pairs of one block: values, first and second column positions, observations
+Candidates = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+def _standardize(df: pd.DataFrame, rank: bool) -> Tuple[np.ndarray, Optional[np.ndarray], np.ndarray, List[str], List[str]]:
+    """
+    Centers every column on its mean and scales it to unit length, with
+    missing cells set to 0, so the product of two columns is their Pearson
+    correlation. Spearman ranks the values first; each column is ranked
+    once over all its values, where pandas re-ranks the rows two columns
+    share, so with gaps the two differ slightly.
+    Returns the columns as a Fortran-ordered matrix (each column contiguous),
+    the 0/1 matrix of present cells if any are missing, which columns have
+    gaps, and the names of the columns kept and skipped. Columns with fewer
+    than two values or a single distinct value have no correlation.
+    """
+    kept, skipped, standardized, masks = [], [], [], []
+    for column in df.columns:
+        values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        if rank:
+            values = pd.Series(values).rank(method="average").to_numpy()
+        present = ~np.isnan(values)
+        if present.sum() < 2:
+            skipped.append(column)
+            continue
+        centered = np.where(present, values - values[present].mean(), 0.0)
+        norm = np.sqrt(np.dot(centered, centered))
+        if not norm:
+            skipped.append(column)
+            continue
+        kept.append(column)
+        standardized.append(centered / norm)
+        masks.append(present)
+
+    rows = len(df)
+    matrix = np.empty((rows, len(kept)), dtype=np.float64, order="F")
+    for position, values in enumerate(standardized):
+        matrix[:, position] = values
+    gaps = np.array([not present.all() for present in masks], dtype=bool)
+    mask = None
+    if gaps.any():
+        mask = np.empty((rows, len(kept)), dtype=np.float64, order="F")
+        for position, present in enumerate(masks):
+            mask[:, position] = present
+    return matrix, mask, gaps, kept, skipped
+
+def _top_candidates(values: np.ndarray, observations: np.ndarray, first: int, second: int, top_k: int) -> Candidates:
+    """
+    Keeps the top_k strongest pairs of a block of pair values, by absolute
+    value. A block compared with itself only counts each pair once.
+    """
+    rows, cols = np.indices(values.shape)
+    keep = ~np.isnan(values)
+    if first == second:
+        keep &= rows < cols
+    values, observations, rows, cols = values[keep], observations[keep], rows[keep], cols[keep]
+    if len(values) > top_k:
+        strongest = np.argpartition(-np.abs(values), top_k - 1)[:top_k]
+        values, observations, rows, cols = values[strongest], observations[strongest], rows[strongest], cols[strongest]
+    return values, rows + first, cols + second, observations
+
+def _correlation_block(matrix: np.ndarray, mask: Optional[np.ndarray], gaps: np.ndarray, first: slice, second: slice, top_k: int) -> Candidates:
+    """
+    Correlates one block of standardized columns with another using matrix
+    products. Pairs with missing cells use the rows where both columns are
+    present, as pandas does.
+    """
+    a, b = matrix[:, first], matrix[:, second]
+    products = a.T @ b
+    if mask is None or not (gaps[first].any() or gaps[second].any()):
+        correlations = products
+        observations = np.full(products.shape, len(matrix))
+    else:
+        # Sums over the rows both columns share, each as one product
+        mask_a, mask_b = mask[:, first], mask[:, second]
+        observations = mask_a.T @ mask_b
+        sum_a = a.T @ mask_b
+        sum_b = mask_a.T @ b
+        sum_aa = (a * a).T @ mask_b
+        sum_bb = mask_a.T @ (b * b)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            covariance = products - sum_a * sum_b / observations
+            variance = (sum_aa - sum_a ** 2 / observations) * (sum_bb - sum_b ** 2 / observations)
+            correlations = covariance / np.sqrt(variance)
+        correlations[(observations < 2) | ~(variance > 0)] = np.nan
+        observations = np.rint(observations).astype(np.int64)
+    return _top_candidates(np.clip(correlations, -1.0, 1.0), observations, first.start, second.start, top_k)
+
+def _encode_categories(df: pd.DataFrame, max_categories: int) -> Tuple[List[np.ndarray], List[int], List[str], List[str]]:
+    """
+    Factorizes every column, keeping those with 2 to max_categories distinct
+    values. Returns the codes (-1 for missing) and category counts of the
+    kept columns, and the names of the columns kept and skipped.
+    """
+    codes, sizes, kept, skipped = [], [], [], []
+    for column in df.columns:
+        column_codes, uniques = pd.factorize(df[column], use_na_sentinel=True)
+        if not 2 <= len(uniques) <= max_categories:
+            skipped.append(column)
+            continue
+        codes.append(column_codes)
+        sizes.append(len(uniques))
+        kept.append(column)
+    return codes, sizes, kept, skipped
+
+def _one_hot(codes: List[np.ndarray], sizes: List[int], start: int, stop: int) -> np.ndarray:
+    """
+    One-hot encodes rows start:stop of several columns side by side; a
+    missing cell has no 1 in its column
+    """
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    encoded = np.zeros((stop - start, int(sum(sizes))), dtype=np.float64)
+    rows = np.arange(stop - start)
+    for offset, column_codes in zip(offsets, codes):
+        chunk = column_codes[start:stop]
+        present = chunk >= 0
+        encoded[rows[present], offset + chunk[present]] = 1.0
+    return encoded
+
+def _cramers_v_block(codes: List[np.ndarray], sizes: List[int], first: slice, second: slice, top_k: int) -> Candidates:
+    """
+    Computes Cramér's V between one block of categorical columns and
+    another. The contingency tables of all pairs come from one product of
+    the blocks' one-hot encodings, taken over chunks of rows.
+    """
+    codes_a, sizes_a = codes[first], sizes[first]
+    codes_b, sizes_b = codes[second], sizes[second]
+    rows = len(codes[0])
+    chunk_rows = max(1, ONE_HOT_CHUNK_BYTES // (8 * (sum(sizes_a) + sum(sizes_b))))
+    tables = np.zeros((sum(sizes_a), sum(sizes_b)), dtype=np.float64)
+    for start in range(0, rows, chunk_rows):
+        stop = min(start + chunk_rows, rows)
+        tables += _one_hot(codes_a, sizes_a, start, stop).T @ _one_hot(codes_b, sizes_b, start, stop)
+
+    bounds_a = np.concatenate(([0], np.cumsum(sizes_a)))
+    bounds_b = np.concatenate(([0], np.cumsum(sizes_b)))
+    values = np.full((len(sizes_a), len(sizes_b)), np.nan)
+    observations = np.zeros(values.shape, dtype=np.int64)
+    for i in range(len(sizes_a)):
+        for j in range(len(sizes_b)):
+            if first.start == second.start and i >= j:
+                continue
+            table = tables[bounds_a[i]:bounds_a[i + 1], bounds_b[j]:bounds_b[j + 1]]
+            row_totals, column_totals = table.sum(axis=1), table.sum(axis=0)
+            # Categories that never occur alongside the other column do not count
+            table = table[np.ix_(row_totals > 0, column_totals > 0)]
+            row_totals, column_totals = row_totals[row_totals > 0], column_totals[column_totals > 0]
+            observations[i, j] = int(round(table.sum()))
+            smaller = min(len(row_totals), len(column_totals)) - 1
+            if smaller < 1:
+                continue
+            # chi-square / n = sum(observed^2 / (row total * column total)) - 1
+            phi_squared = (table ** 2 / np.outer(row_totals, column_totals)).sum() - 1.0
+            values[i, j] = np.sqrt(max(phi_squared, 0.0) / smaller)
+    return _top_candidates(np.clip(values, 0.0, 1.0), observations, first.start, second.start, top_k)
+
+async def top_correlations(
+    df: pd.DataFrame,
+    method: str,
+    top_k: int,
+    block_columns: int = CORRELATION_BLOCK_COLUMNS,
+    max_categories: int = CORRELATION_MAX_CATEGORIES
+) -> Dict[str, Any]:
+    """
+    Finds the top_k most strongly associated pairs of columns without
+    building the full pair matrix: pearson and spearman correlate numeric
+    columns, cramers_v categorical ones. The columns are split into blocks
+    and every pair of blocks is computed on the thread pool, keeping only
+    its strongest pairs; the survivors of all blocks are merged at the end.
+    """
+    if method == "cramers_v":
+        codes, sizes, kept, skipped = await thread_executor.run(_encode_categories, df, max_categories)
+        compute = lambda pair: _cramers_v_block(codes, sizes, *pair, top_k)
+    else:
+        matrix, mask, gaps, kept, skipped = await thread_executor.run(_standardize, df, method == "spearman")
+        compute = lambda pair: _correlation_block(matrix, mask, gaps, *pair, top_k)
+
+    blocks = [slice(start, min(start + block_columns, len(kept))) for start in range(0, len(kept), block_columns)]
+    candidates = await thread_executor.map(compute, [
+        (first, second)
+        for index, first in enumerate(blocks)
+        for second in blocks[index:]
+    ])
+
+    values = np.concatenate([block[0] for block in candidates] or [np.empty(0)])
+    firsts = np.concatenate([block[1] for block in candidates] or [np.empty(0, dtype=np.int64)])
+    seconds = np.concatenate([block[2] for block in candidates] or [np.empty(0, dtype=np.int64)])
+    observations = np.concatenate([block[3] for block in candidates] or [np.empty(0, dtype=np.int64)])
+    # Strongest first; ties in column order
+    order = np.lexsort((seconds, firsts, -np.abs(values)))[:top_k]
+
+    return {
+        "method": method,
+        "analyzed_columns": len(kept),
+        "skipped_columns": skipped,
+        "total_pairs": len(kept) * (len(kept) - 1) // 2,
+        "pairs": [
+            {
+                "column_a": kept[firsts[position]],
+                "column_b": kept[seconds[position]],
+                "value": float(values[position]),
+                "observations": int(observations[position])
+            }
+            for position in order
+        ]
+    }
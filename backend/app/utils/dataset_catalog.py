@@ -0,0 +1,195 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import sqlite3
+import threading
+
+from .column_store import read_store_schema, read_store_row_count
+from ..config import DATASET_CATALOG_PATH
+
+# Columns the dataset list can be sorted by, mapped to catalog columns
+SORT_COLUMNS = {
+    "created": "created_at",
+    "updated": "updated_at",
+    "filename": "filename",
+    "size": "size",
+    "rows": "row_count",
+    "columns": "column_count"
+}
+
+class DatasetCatalog:
+    """
+    SQLite catalog of ingested datasets: original filename (and sheet, for
+    workbooks), size, shape, schema and content hash, recorded once at ingest. Listing datasets and
+    looking up their columns or content reads only the catalog, never the
+    files themselves.
+    """
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use so importing the app does not touch the disk
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS datasets ("
+                " id TEXT PRIMARY KEY, filename TEXT NOT NULL, format TEXT NOT NULL,"
+                " size INTEGER NOT NULL, row_count INTEGER NOT NULL, column_count INTEGER NOT NULL,"
+                " schema TEXT NOT NULL, content_hash TEXT NOT NULL,"
+                " created_at TEXT NOT NULL, updated_at TEXT NOT NULL)"
+            )
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(datasets)")}
+            if "sheet_name" not in columns:
+                # Catalogs written before workbook sheets became datasets
+                self._conn.execute("ALTER TABLE datasets ADD COLUMN sheet_name TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS datasets_content_hash ON datasets (content_hash)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS datasets_created_at ON datasets (created_at)")
+            self._conn.commit()
+        return self._conn
+
+    def record(
+        self,
+        dataset_id: str,
+        filename: str,
+        size: int,
+        content_hash: str,
+        profile: Optional[Dict[str, Dict[str, Any]]] = None,
+        created_at: Optional[datetime] = None,
+        sheet_name: Optional[str] = None,
+        dtypes: Optional[Dict[str, str]] = None,
+        row_count: Optional[int] = None
+    ):
+        """
+        Adds or replaces the entry of a dataset whose columnar copy has been written.
+        Shape and dtypes are read from the store; missing and unique counts
+        are taken from the profile when one is given. Datasets profiled from
+        a sample before they are stored pass their dtypes and (estimated)
+        row count instead.
+        """
+        if dtypes is None:
+            dtypes = read_store_schema(dataset_id)
+        schema = []
+        for name, dtype in dtypes.items():
+            column = {"name": name, "type": dtype}
+            if profile is not None and name in profile:
+                column["missing_count"] = profile[name]["missing"]
+                column["unique_count"] = profile[name]["unique"]
+            schema.append(column)
+
+        now = datetime.now().isoformat()
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                "INSERT OR REPLACE INTO datasets"
+                " (id, filename, format, size, row_count, column_count, schema, content_hash, created_at, updated_at, sheet_name)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    dataset_id,
+                    filename,
+                    Path(filename).suffix[1:].upper(),
+                    size,
+                    read_store_row_count(dataset_id) if row_count is None else row_count,
+                    len(schema),
+                    json.dumps(schema),
+                    content_hash,
+                    created_at.isoformat() if created_at else now,
+                    now,
+                    sheet_name
+                )
+            )
+            conn.commit()
+
+    def get(self, dataset_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the entry of a dataset, or None if it is not catalogued
+        """
+        with self._lock:
+            row = self._db().execute("SELECT * FROM datasets WHERE id = ?", (dataset_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def find_by_hash(self, content_hash: str) -> Optional[str]:
+        """
+        Returns the id of the oldest dataset with the given content, if any
+        """
+        with self._lock:
+            row = self._db().execute(
+                "SELECT id FROM datasets WHERE content_hash = ? ORDER BY created_at LIMIT 1",
+                (content_hash,)
+            ).fetchone()
+        return row["id"] if row is not None else None
+
+    def list(
+        self,
+        search: Optional[str] = None,
+        file_format: Optional[str] = None,
+        sort_by: str = "created",
+        descending: bool = True,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Returns one page of catalogued datasets (without their schema) and
+        the number of datasets matching the filters
+        """
+        conditions = []
+        params: List[Any] = []
+        if search:
+            escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append("filename LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if file_format:
+            conditions.append("format = ?")
+            params.append(file_format.upper())
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = f" ORDER BY {SORT_COLUMNS[sort_by]} {'DESC' if descending else 'ASC'}, id"
+
+        with self._lock:
+            conn = self._db()
+            total = conn.execute(f"SELECT COUNT(*) FROM datasets{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM datasets{where}{order} LIMIT ? OFFSET ?",
+                params + [limit if limit is not None else -1, offset]
+            ).fetchall()
+        datasets = [self._to_dict(row) for row in rows]
+        for dataset in datasets:
+            del dataset["schema"]
+        return datasets, total
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return [row["id"] for row in self._db().execute("SELECT id FROM datasets")]
+
+    def remove(self, dataset_id: str):
+        with self._lock:
+            conn = self._db()
+            conn.execute("DELETE FROM datasets WHERE id = ?", (dataset_id,))
+            conn.commit()
+
+    def _to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "filename": row["filename"],
+            "sheet_name": row["sheet_name"],
+            "format": row["format"],
+            "size": row["size"],
+            "rows": row["row_count"],
+            "columns": row["column_count"],
+            "schema": json.loads(row["schema"]),
+            "content_hash": row["content_hash"],
+            "created": row["created_at"],
+            "updated": row["updated_at"]
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# Shared by all services so every upload path fills the same catalog
+dataset_catalog = DatasetCatalog(DATASET_CATALOG_PATH)
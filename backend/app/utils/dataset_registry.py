@@ -0,0 +1,146 @@
+import pandas as pd
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Set, Tuple
+import threading
+import mmap
+import sys
+
+from ..config import DATASET_CACHE_MAX_BYTES
+
+def _is_memory_mapped(array: Any) -> bool:
+    """
+    Checks whether an array is a view of a memory-mapped file
+    """
+    while isinstance(array, np.ndarray):
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return isinstance(array, mmap.mmap)
+
+def _estimate_size(value: Any, seen: Optional[Set[int]] = None) -> int:
+    """
+    Estimates the memory footprint of a cached value in bytes.
+    Containers and objects (profiles, sketches, ...) are measured with
+    everything they hold; an object reachable more than once counts once.
+    Memory-mapped data lives in the shared page cache and is not counted.
+    """
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, pd.DataFrame):
+        usage = value.memory_usage(index=True, deep=True)
+        mapped = [
+            col for col, dtype in value.dtypes.items()
+            if isinstance(dtype, np.dtype) and _is_memory_mapped(value[col].to_numpy(copy=False))
+        ]
+        return int(usage.sum() - usage[mapped].sum())
+    if isinstance(value, pd.Series):
+        if isinstance(value.dtype, np.dtype) and _is_memory_mapped(value.to_numpy(copy=False)):
+            return int(value.index.memory_usage(deep=True))
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        if _is_memory_mapped(value):
+            return 0
+        if value.dtype == object:
+            return int(value.nbytes) + sum(_estimate_size(item, seen) for item in value.ravel())
+        return int(value.nbytes)
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        children = [*value.keys(), *value.values()]
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        children = value
+    elif hasattr(value, "__dict__"):
+        children = [vars(value)]
+    else:
+        children = ()
+    return size + sum(_estimate_size(child, seen) for child in children)
+
+class DatasetRegistry:
+    """
+    Process-wide cache of parsed datasets and values derived from them
+    (profiles, indexes, ...), stored under a kind such as "frame" or "profile".
+    Entries are evicted least-recently-used first once the memory budget is exceeded.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._sizes: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.RLock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, dataset_id: str, kind: str = "frame") -> Optional[Any]:
+        """
+        Returns a cached value and marks it as recently used
+        """
+        key = (dataset_id, kind)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, dataset_id: str, value: Any, kind: str = "frame") -> Any:
+        """
+        Adds a value to the cache, evicting old entries to stay within budget.
+        Values larger than the whole budget are returned without being cached.
+        """
+        key = (dataset_id, kind)
+        size = _estimate_size(value)
+
+        with self._lock:
+            self._discard(key)
+            if size > self.max_bytes:
+                return value
+
+            while self._entries and self.current_bytes + size > self.max_bytes:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self.current_bytes -= self._sizes.pop(evicted_key)
+                self.evictions += 1
+
+            self._entries[key] = value
+            self._sizes[key] = size
+            self.current_bytes += size
+            return value
+
+    def _discard(self, key: Tuple[str, str]):
+        if key in self._entries:
+            del self._entries[key]
+            self.current_bytes -= self._sizes.pop(key)
+
+    def remove(self, dataset_id: str):
+        """
+        Drops a dataset and everything derived from it from the cache
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == dataset_id]:
+                self._discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns cache usage and hit/miss/eviction counters
+        """
+        with self._lock:
+            return {
+                "datasets": len({dataset_id for dataset_id, _ in self._entries}),
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+# Shared by every service instance in the process
+dataset_registry = DatasetRegistry(max_bytes=DATASET_CACHE_MAX_BYTES)
@@ -0,0 +1,72 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+
+# A text column is treated as categorical when fewer than this share of its
+# values are distinct
+CATEGORICAL_UNIQUE_RATIO = 0.5
+
+# Name of the per-dataset JSON document holding the optimization report
+OPTIMIZATION_FILE = "dtype_optimization"
+
+def is_low_cardinality(unique_count: int, length: int) -> bool:
+    """
+    Checks whether a column has few enough distinct values to be categorical
+    """
+    return length > 0 and unique_count / length < CATEGORICAL_UNIQUE_RATIO
+
+def _optimize_series(series: pd.Series) -> Optional[pd.Series]:
+    """
+    Returns a more compact copy of a column holding exactly the same values,
+    or None if the column is already as small as it safely gets
+    """
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return None
+
+    if pd.api.types.is_integer_dtype(dtype):
+        downcast = pd.to_numeric(series, downcast="integer")
+        return downcast if downcast.dtype != dtype else None
+
+    if dtype == np.float64:
+        # Only when every value survives the round trip, e.g. integers with gaps
+        downcast = series.astype(np.float32)
+        if np.array_equal(downcast.to_numpy(dtype=np.float64), series.to_numpy(), equal_nan=True):
+            return downcast
+        return None
+
+    if dtype == object and pd.api.types.infer_dtype(series, skipna=True) == "string":
+        if is_low_cardinality(series.nunique(), len(series)):
+            return series.astype("category")
+
+    return None
+
+def optimize_dtypes(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Shrinks a freshly loaded DataFrame without changing any value: integers
+    are downcast to the smallest width that holds them, floats to float32 when
+    that is lossless, and low-cardinality string columns become categoricals.
+    Returns the optimized DataFrame and a report of the conversions and bytes saved.
+    """
+    bytes_before = int(df.memory_usage(index=True, deep=True).sum())
+
+    optimized = {}
+    conversions = {}
+    for column in df.columns:
+        series = _optimize_series(df[column])
+        if series is not None:
+            optimized[column] = series
+            conversions[str(column)] = {"from": str(df[column].dtype), "to": str(series.dtype)}
+
+    if optimized:
+        df = df.copy(deep=False)
+        for column, series in optimized.items():
+            df[column] = series
+
+    bytes_after = int(df.memory_usage(index=True, deep=True).sum())
+    return df, {
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "bytes_saved": bytes_before - bytes_after,
+        "conversions": conversions
+    }
@@ -0,0 +1,101 @@
+from fastapi import HTTPException
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+
+from ..config import THREAD_POOL_WORKERS, PROCESS_POOL_WORKERS, EXECUTOR_MAX_QUEUE
+
+class WorkExecutor:
+    """
+    Runs blocking work off the event loop on a worker pool.
+    At most `max_workers` tasks run at once and at most `max_queue` more may
+    wait; beyond that new work is rejected with 503 instead of piling up.
+    Fan-outs (`map`, `as_completed`) from every caller share `max_workers`
+    slots, so together they never submit more than one pool's worth of tasks
+    and the queue stays free for other requests.
+    """
+    def __init__(self, name: str, pool_factory: Callable[[int], Executor], max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool_factory = pool_factory
+        self._pool: Optional[Executor] = None
+        self._pending = 0
+        self._fan_out_slots: Optional[asyncio.Semaphore] = None
+        self._fan_out_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_pool(self) -> Executor:
+        # Pools are created on first use so importing the app does not spawn workers
+        if self._pool is None:
+            self._pool = self._pool_factory(self.max_workers)
+        return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Runs fn(*args, **kwargs) on the pool and waits for its result
+        """
+        if self._pending >= self.max_workers + self.max_queue:
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please retry shortly"
+            )
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), partial(fn, *args, **kwargs))
+        finally:
+            self._pending -= 1
+
+    def _slots(self) -> asyncio.Semaphore:
+        # A semaphore is bound to one event loop, so a new loop gets new slots
+        loop = asyncio.get_running_loop()
+        if self._fan_out_loop is not loop:
+            self._fan_out_slots = asyncio.Semaphore(self.max_workers)
+            self._fan_out_loop = loop
+        return self._fan_out_slots
+
+    async def _run_in_slot(self, fn: Callable[[Any], Any], item: Any) -> Tuple[Any, Any]:
+        async with self._slots():
+            return item, await self.run(fn, item)
+
+    async def map(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        """
+        Runs fn(item) on the pool for every item and returns the results in
+        the order of `items`
+        """
+        return [result for _, result in await asyncio.gather(*[self._run_in_slot(fn, item) for item in items])]
+
+    async def as_completed(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> AsyncIterator[Tuple[Any, Any]]:
+        """
+        Runs fn(item) on the pool for every item and yields (item, result)
+        pairs as they finish. Work not yet finished is cancelled if the
+        caller stops early.
+        """
+        tasks = [asyncio.ensure_future(self._run_in_slot(fn, item)) for item in items]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": min(self._pending, self.max_workers),
+            "queued": max(self._pending - self.max_workers, 0)
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+# GIL-releasing pandas/NumPy work (parsing, reductions, Parquet I/O)
+thread_executor = WorkExecutor("thread", lambda workers: ThreadPoolExecutor(max_workers=workers), THREAD_POOL_WORKERS, EXECUTOR_MAX_QUEUE)
+
+# Pure-Python work such as Excel parsing; arguments and results must be picklable
+process_executor = WorkExecutor("process", lambda workers: ProcessPoolExecutor(max_workers=workers), PROCESS_POOL_WORKERS, EXECUTOR_MAX_QUEUE)
@@ -1,18 +1,69 @@
 import pandas as pd
-from fastapi import UploadFile
+from fastapi import UploadFile, HTTPException
 from pathlib import Path
-from typing import Union, Dict
+from typing import Callable, Union, Dict, List, Optional, Set, Tuple
 import aiofiles
+import hashlib
 import uuid
 import os
 import atexit
 from datetime import datetime, timedelta
 import asyncio
 import shutil
+from functools import partial
+
+from .column_store import (
+    has_column_store,
+    write_column_store,
+    read_column_store,
+    read_store_columns,
+    read_store_json,
+    write_store_json
+)
+from .dtype_optimizer import optimize_dtypes, OPTIMIZATION_FILE
+from .dataset_catalog import dataset_catalog
+from ..config import MAX_FILE_SIZE, UPLOAD_CHUNK_SIZE, OPTIMIZE_DTYPES
+from .executors import thread_executor, process_executor
 
 # Store file metadata for cleanup
 temp_files: Dict[str, datetime] = {}
 
+# Per-dataset document recording facts about the upload itself
+METADATA_FILE = "metadata"
+
+async def stream_upload_to_disk(file: UploadFile, file_path: Path, max_bytes: int = MAX_FILE_SIZE) -> Tuple[int, str]:
+    """
+    Streams an uploaded file to disk in fixed-size chunks so memory use does
+    not grow with the file size. The size limit is enforced while streaming.
+    Returns the number of bytes written and the SHA-256 hex digest of the content
+    """
+    # Reject early when the multipart parser already knows the size
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size is {max_bytes} bytes"
+        )
+
+    digest = hashlib.sha256()
+    bytes_written = 0
+    try:
+        async with aiofiles.open(file_path, 'wb') as out_file:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                bytes_written += len(chunk)
+                if bytes_written > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large. Maximum size is {max_bytes} bytes"
+                    )
+                digest.update(chunk)
+                await out_file.write(chunk)
+    except BaseException:
+        # Never leave a partial upload behind
+        file_path.unlink(missing_ok=True)
+        raise
+
+    return bytes_written, digest.hexdigest()
+
 async def save_uploaded_file(file: UploadFile, upload_dir: Path) -> Path:
     """
     Saves an uploaded file to the specified directory with a unique filename
@@ -28,15 +79,107 @@ async def save_uploaded_file(file: UploadFile, upload_dir: Path) -> Path:
     file_path = upload_dir / new_filename
     
     # Save file
-    async with aiofiles.open(file_path, 'wb') as out_file:
-        content = await file.read()
-        await out_file.write(content)
+    _, content_hash = await stream_upload_to_disk(file, file_path)
+    record_content_hash(new_filename, content_hash)
     
     # Store file metadata for cleanup
     temp_files[str(file_path)] = datetime.now()
     
     return file_path
 
+def record_content_hash(dataset_id: str, content_hash: str):
+    """
+    Remembers the SHA-256 of an uploaded file next to its columnar copy
+    """
+    write_store_json(dataset_id, METADATA_FILE, {"content_hash": content_hash})
+
+def hash_file(file_path: Union[str, Path]) -> str:
+    """
+    Returns the SHA-256 hex digest of a file, read in chunks
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_content_hash(file_path: Union[str, Path]) -> str:
+    """
+    Returns the content hash of an uploaded dataset.
+    Files uploaded before hashes were recorded are hashed once here.
+    """
+    file_path = Path(file_path)
+    dataset_id = file_path.name
+    
+    metadata = read_store_json(dataset_id, METADATA_FILE)
+    if metadata is None or "content_hash" not in metadata:
+        metadata = {"content_hash": hash_file(file_path)}
+        record_content_hash(dataset_id, metadata["content_hash"])
+    
+    return metadata["content_hash"]
+
+def find_dataset_by_hash(content_hash: str, upload_dir: Path) -> Optional[str]:
+    """
+    Returns the id of an existing dataset with the given content, if any.
+    Catalog entries whose dataset has been removed are dropped.
+    """
+    dataset_id = dataset_catalog.find_by_hash(content_hash)
+    if dataset_id is None:
+        return None
+
+    if not (upload_dir / dataset_id).exists():
+        dataset_catalog.remove(dataset_id)
+        return None
+    if not has_column_store(dataset_id):
+        # Profiled from a sample and not ingested (yet)
+        return None
+    return dataset_id
+
+def catalog_upload(file_path: Union[str, Path]):
+    """
+    Adds an upload that predates the catalog to it, converting it to the
+    columnar format first if needed
+    """
+    file_path = Path(file_path)
+    dataset_id = file_path.name
+
+    if not has_column_store(dataset_id):
+        _backfill_column_store(file_path)
+    stats = file_path.stat()
+    metadata = read_store_json(dataset_id, METADATA_FILE) or {}
+    dataset_catalog.record(
+        dataset_id,
+        filename=metadata.get("filename", dataset_id),
+        size=stats.st_size,
+        content_hash=get_content_hash(file_path),
+        created_at=datetime.fromtimestamp(stats.st_ctime),
+        sheet_name=metadata.get("sheet_name")
+    )
+
+def sync_catalog(upload_dir: Path, extensions: Set[str]):
+    """
+    Makes the catalog match the upload directory: entries of deleted files
+    are dropped and uploads that predate the catalog are added.
+    Uploads whose hash is recorded but whose columnar copy is missing are
+    still being ingested and are left to the ingest.
+    """
+    uploads = {
+        file_path.name: file_path for file_path in upload_dir.glob('*')
+        if file_path.suffix.lower() in extensions
+    }
+    catalogued = set(dataset_catalog.ids())
+
+    for dataset_id in catalogued - uploads.keys():
+        dataset_catalog.remove(dataset_id)
+
+    for dataset_id in uploads.keys() - catalogued:
+        if read_store_json(dataset_id, METADATA_FILE) is not None and not has_column_store(dataset_id):
+            continue
+        try:
+            catalog_upload(uploads[dataset_id])
+        except Exception:
+            continue  # Skip files that can't be read
+
 async def cleanup_old_files(max_age_minutes: int = 30):
     """
     Removes files older than max_age_minutes
@@ -48,6 +191,7 @@ async def cleanup_old_files(max_age_minutes: int = 30):
         if current_time - creation_time > timedelta(minutes=max_age_minutes):
             try:
                 os.remove(file_path)
+                dataset_catalog.remove(Path(file_path).name)
                 files_to_remove.append(file_path)
             except OSError:
                 pass
@@ -84,21 +228,91 @@ async def read_file_content(file_path: Union[str, Path], file_extension: str) ->
     file_path = Path(file_path)
     
     if file_extension.lower() == '.csv':
-        return pd.read_csv(file_path)
+        return await thread_executor.run(pd.read_csv, file_path)
     elif file_extension.lower() in ['.xlsx', '.xls']:
-        return pd.read_excel(file_path)
+        # Excel parsing is pure Python, so it runs in a worker process
+        return await process_executor.run(pd.read_excel, file_path)
     else:
         raise ValueError(f"Unsupported file format: {file_extension}")
 
-def read_dataset(file_path: Union[str, Path]) -> pd.DataFrame:
+def read_sheet_names(file_path: Union[str, Path]) -> List[str]:
     """
-    Reads a dataset from various file formats
+    Returns the sheet names of a workbook in workbook order
+    """
+    with pd.ExcelFile(file_path) as workbook:
+        return [str(name) for name in workbook.sheet_names]
+
+async def read_workbook(file_path: Union[str, Path], progress: Optional[Callable[..., None]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Parses every sheet of a workbook, one sheet per worker process at a time.
+    `progress(fraction, message)` is called as sheets finish.
+    Returns the sheets in workbook order.
+    """
+    sheet_names = await process_executor.run(read_sheet_names, file_path)
+
+    sheets = {}
+    # pd.read_excel(file_path, sheet_name); a partial so it pickles to the worker
+    parse = partial(pd.read_excel, file_path)
+    async for sheet_name, df in process_executor.as_completed(parse, sheet_names):
+        sheets[sheet_name] = df
+        done = len(sheets)
+        if progress is not None:
+            progress(done / len(sheet_names), f"Parsed sheet '{sheet_name}' ({done}/{len(sheet_names)})")
+    return {name: sheets[name] for name in sheet_names}
+
+def sheet_dataset_id(dataset_id: str, sheet_name: str) -> str:
+    """
+    Returns the id of the dataset holding a further sheet of an uploaded workbook
+    """
+    path = Path(dataset_id)
+    return f"{path.stem}__{sheet_name}{path.suffix}"
+
+def parse_dataset_file(file_path: Union[str, Path]) -> pd.DataFrame:
+    """
+    Parses a raw CSV or Excel upload.
+    Excel datasets read the sheet recorded for them (the first by default).
     """
     file_path = Path(file_path)
     
-    if file_path.suffix == '.csv':
+    if file_path.suffix.lower() == '.csv':
         return pd.read_csv(file_path)
-    elif file_path.suffix in ['.xlsx', '.xls']:
-        return pd.read_excel(file_path)
+    elif file_path.suffix.lower() in ['.xlsx', '.xls']:
+        metadata = read_store_json(file_path.name, METADATA_FILE) or {}
+        return pd.read_excel(file_path, sheet_name=metadata.get("sheet_name", 0))
     else:
         raise ValueError(f"Unsupported file format: {file_path.suffix}")
+
+def _backfill_column_store(file_path: Path):
+    """
+    Converts an upload that predates the columnar cache
+    """
+    df = parse_dataset_file(file_path)
+    if OPTIMIZE_DTYPES:
+        df, optimization = optimize_dtypes(df)
+        write_store_json(file_path.name, OPTIMIZATION_FILE, optimization)
+    write_column_store(file_path.name, df)
+
+def read_dataset(file_path: Union[str, Path], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Reads a dataset from its columnar cache.
+    Files uploaded before the cache existed are parsed once and converted.
+    """
+    file_path = Path(file_path)
+    dataset_id = file_path.name
+    
+    if not has_column_store(dataset_id):
+        _backfill_column_store(file_path)
+    
+    return read_column_store(dataset_id, columns)
+
+def read_dataset_columns(file_path: Union[str, Path]) -> List[str]:
+    """
+    Returns the column names of a dataset without loading its data
+    """
+    file_path = Path(file_path)
+    dataset_id = file_path.name
+    
+    if not has_column_store(dataset_id):
+        _backfill_column_store(file_path)
+    
+    return read_store_columns(dataset_id)
@@ -0,0 +1,185 @@
+import pandas as pd
+import numpy as np
+from typing import Callable, Dict, List, Tuple
+import json
+
+from .dataset_registry import dataset_registry
+
+AGGREGATIONS = ("count", "sum", "mean", "min", "max", "nunique")
+
+# Aggregations that need numbers (booleans count as 0/1)
+NUMERIC_AGGREGATIONS = ("sum", "mean", "min", "max")
+
+# Group ids of a set of key columns: the id of every row, the rows of
+# each group in id order with where each group starts, and the key values
+# of every group
+GroupIndex = Tuple[np.ndarray, np.ndarray, np.ndarray, pd.DataFrame]
+
+def _codes_dtype(size: int) -> np.dtype:
+    return np.dtype(np.int32) if size < 2 ** 31 else np.dtype(np.int64)
+
+def _factorize(series: pd.Series) -> Tuple[np.ndarray, pd.Series]:
+    """
+    Codes of every value of a column and the distinct values they stand
+    for, in sorted order when the values can be sorted. Missing values form
+    a group of their own, sorted last.
+    """
+    try:
+        codes, uniques = pd.factorize(series, sort=True, use_na_sentinel=False)
+    except TypeError:
+        # Mixed types that cannot be ordered keep their order of appearance
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    return codes.astype(_codes_dtype(len(uniques)), copy=False), pd.Series(uniques, name=series.name)
+
+def get_column_codes(dataset_id: str, column: str, load: Callable[[str], pd.Series]) -> Tuple[np.ndarray, pd.Series]:
+    """
+    Returns the cached codes and distinct values of a column, hashing it
+    with load(column) on first use. Later group-bys on the column (as a
+    key, or counting its distinct values) reuse them.
+    """
+    codes = dataset_registry.get(dataset_id, f"column_codes:{column}")
+    uniques = dataset_registry.get(dataset_id, f"column_uniques:{column}")
+    if codes is None or uniques is None:
+        codes, uniques = _factorize(load(column))
+        codes = dataset_registry.put(dataset_id, codes, f"column_codes:{column}")
+        uniques = dataset_registry.put(dataset_id, uniques, f"column_uniques:{column}")
+    return codes, uniques
+
+def _build_group_index(dataset_id: str, keys: List[str], load: Callable[[str], pd.Series]) -> GroupIndex:
+    columns = [get_column_codes(dataset_id, key, load) for key in keys]
+
+    # Combine the integer codes of the keys; no values are hashed again
+    combined = columns[0][0].astype(np.int64)
+    for codes, uniques in columns[1:]:
+        if len(uniques) and combined.max(initial=0) >= np.iinfo(np.int64).max // len(uniques):
+            # Renumber before the combined codes could overflow
+            combined = pd.factorize(combined, sort=True)[0].astype(np.int64)
+        combined = combined * len(uniques) + codes
+    ids, _ = pd.factorize(combined, sort=True)
+    ids = ids.astype(_codes_dtype(ids.max(initial=-1) + 1), copy=False)
+
+    sizes = np.bincount(ids)
+    order = np.argsort(ids, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+    # Every row of a group has the same keys; the first one is read
+    first_rows = order[starts] if len(ids) else np.empty(0, dtype=np.int64)
+    key_values = pd.DataFrame({
+        key: uniques.to_numpy()[codes[first_rows]]
+        for key, (codes, uniques) in zip(keys, columns)
+    })
+    return ids, order, starts, key_values
+
+def get_group_index(dataset_id: str, keys: List[str], load: Callable[[str], pd.Series]) -> GroupIndex:
+    """
+    Returns the cached group index of a set of key columns, building it
+    from the keys' cached codes on first use. Groups are numbered in the
+    sorted order of their keys.
+    """
+    name = json.dumps(keys)
+    parts = [dataset_registry.get(dataset_id, f"group_{part}:{name}") for part in ("ids", "order", "starts", "keys")]
+    if any(part is None for part in parts):
+        parts = _build_group_index(dataset_id, keys, load)
+        parts = [
+            dataset_registry.put(dataset_id, part, f"group_{kind}:{name}")
+            for kind, part in zip(("ids", "order", "starts", "keys"), parts)
+        ]
+    return tuple(parts)
+
+def aggregate_column(
+    dataset_id: str,
+    series: pd.Series,
+    functions: List[str],
+    index: GroupIndex
+) -> Dict[str, np.ndarray]:
+    """
+    Aggregates one value column over the groups of an index in a single
+    pass: counts and float sums are weighted bincounts of the group ids,
+    integer sums, minima and maxima reductions over the rows in group
+    order, and distinct counts come from the column's cached codes.
+    """
+    ids, order, starts, key_values = index
+    groups = len(key_values)
+    results: Dict[str, np.ndarray] = {}
+
+    # Integers (and booleans, as 0/1) without gaps are reduced as they are,
+    # so sums, minima and maxima stay exact beyond 2**53
+    native = None
+    if (pd.api.types.is_integer_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype)) and not series.hasnans:
+        if pd.api.types.is_bool_dtype(series.dtype):
+            native = series.to_numpy(dtype=np.int64)
+        elif isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+            native = series.to_numpy(dtype=series.dtype.numpy_dtype)
+        else:
+            native = series.to_numpy()
+    if any(function in NUMERIC_AGGREGATIONS for function in functions) or "count" in functions:
+        if native is not None:
+            values = None
+            present = np.ones(len(series), dtype=bool)
+        elif pd.api.types.is_numeric_dtype(series.dtype):
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            present = ~np.isnan(values)
+        else:
+            values = None
+            present = series.notna().to_numpy(dtype=bool)
+        counts = np.bincount(ids[present], minlength=groups) if not present.all() else np.bincount(ids, minlength=groups)
+
+        if "count" in functions:
+            results["count"] = counts
+        if "sum" in functions or "mean" in functions:
+            if native is not None:
+                accumulator = np.uint64 if native.dtype.kind == "u" else np.int64
+                sums = np.add.reduceat(native.astype(accumulator, copy=False)[order], starts) if groups else np.empty(0, dtype=accumulator)
+            else:
+                sums = np.bincount(ids[present], weights=values[present], minlength=groups)
+            if "sum" in functions:
+                results["sum"] = sums
+            if "mean" in functions:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    results["mean"] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        if "min" in functions or "max" in functions:
+            if native is not None:
+                # Every group has rows and none of them is missing
+                ordered, reductions = native[order], (("min", np.minimum), ("max", np.maximum))
+            else:
+                # fmin/fmax skip NaN; groups with no values stay NaN
+                ordered, reductions = values[order], (("min", np.fmin), ("max", np.fmax))
+            for function, reduce in reductions:
+                if function in functions:
+                    results[function] = reduce.reduceat(ordered, starts) if groups else np.empty(0, dtype=ordered.dtype)
+
+    if "nunique" in functions:
+        codes, uniques = get_column_codes(dataset_id, series.name, lambda column: series)
+        # Pairs of group and value, each counted once
+        present = ~uniques.isna().to_numpy()[codes]
+        width = max(len(uniques), 1)
+        pairs = np.unique(ids[present].astype(np.int64) * width + codes[present])
+        results["nunique"] = np.bincount(pairs // width, minlength=groups)
+
+    return results
+
+def group_by(
+    dataset_id: str,
+    keys: List[str],
+    aggregations: Dict[str, List[str]],
+    load: Callable[[List[str]], pd.DataFrame]
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Groups a dataset by one or more key columns and aggregates value
+    columns: `aggregations` maps each value column to functions from
+    AGGREGATIONS. load(columns) reads columns of the dataset; key columns
+    are read only until their codes are cached, value columns once per call.
+    Returns one row per group (keys, "rows" and one "<column>_<function>"
+    column per aggregation) and the number of rows of the dataset.
+    """
+    load_column = lambda column: load([column])[column]
+    index = get_group_index(dataset_id, keys, load_column)
+    ids, order, starts, key_values = index
+
+    result = key_values.copy()
+    result["rows"] = np.diff(np.append(starts, len(ids)))
+    values = load(list(aggregations)) if aggregations else None
+    for column, functions in aggregations.items():
+        aggregated = aggregate_column(dataset_id, values[column], functions, index)
+        for function in functions:
+            result[f"{column}_{function}"] = aggregated[function]
+    return result, len(ids)
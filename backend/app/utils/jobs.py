@@ -0,0 +1,153 @@
+from fastapi import HTTPException
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import uuid
+
+from ..config import JOB_HISTORY_LIMIT
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+class Job:
+    """
+    One background computation: an upload being profiled or an analysis of a dataset.
+    The work reports progress as a fraction between 0 and 1; it may do so from
+    a worker thread.
+    """
+    def __init__(self, kind: str, dataset_id: str, key: Tuple):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.dataset_id = dataset_id
+        self.key = key
+        self.status = PENDING
+        self.progress = 0.0
+        self.message: Optional[str] = None
+        self.result: Any = None
+        self.error: Optional[HTTPException] = None
+        self.subscribers = 1
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def report(self, progress: float, message: Optional[str] = None):
+        """
+        Updates the progress shown to clients polling the job
+        """
+        self.progress = min(max(float(progress), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "dataset_id": self.dataset_id,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "subscribers": self.subscribers,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error.detail if self.error else None
+        }
+
+class JobManager:
+    """
+    Runs analysis work in the background and keeps its status and result.
+    Submitting work identical to a job that is still in flight (same kind,
+    dataset and parameters) returns the existing job instead of starting a
+    second computation (single-flight).
+    """
+    def __init__(self, history_limit: int):
+        self.history_limit = history_limit
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._in_flight: Dict[Tuple, Job] = {}
+
+    def submit(self, kind: str, dataset_id: str, work: Callable[[Job], Awaitable[Any]], params: Tuple = ()) -> Job:
+        """
+        Starts `work(job)` as a background job, or joins the identical job in flight
+        """
+        key = (kind, dataset_id) + tuple(params)
+        job = self._in_flight.get(key)
+        if job is not None:
+            job.subscribers += 1
+            return job
+
+        job = Job(kind, dataset_id, key)
+        self._in_flight[key] = job
+        self._jobs[job.job_id] = job
+        self._prune()
+        job.task = asyncio.create_task(self._run(job, work))
+        return job
+
+    async def run(self, kind: str, dataset_id: str, work: Callable[[Job], Awaitable[Any]], params: Tuple = ()) -> Any:
+        """
+        Submits work and waits for its result, sharing the computation with
+        identical requests in flight. Failures are raised as HTTPException.
+        """
+        job = self.submit(kind, dataset_id, work, params)
+        await asyncio.shield(job.task)
+        return self.result(job)
+
+    async def _run(self, job: Job, work: Callable[[Job], Awaitable[Any]]):
+        job.status = RUNNING
+        job.started_at = datetime.now()
+        try:
+            job.result = await work(job)
+            job.status = SUCCEEDED
+            job.report(1.0, "Completed")
+        except HTTPException as e:
+            job.error = e
+            job.status = FAILED
+        except Exception as e:
+            job.error = HTTPException(status_code=500, detail=str(e))
+            job.status = FAILED
+        finally:
+            job.finished_at = datetime.now()
+            self._in_flight.pop(job.key, None)
+
+    def get(self, job_id: str) -> Job:
+        """
+        Returns a job by id, raising 404 for unknown or expired jobs
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Job '{job_id}' not found"
+            )
+        return job
+
+    def result(self, job: Job) -> Any:
+        """
+        Returns the result of a finished job, or raises the error it failed with
+        """
+        if not job.done:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Job '{job.job_id}' is still {job.status}"
+            )
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _prune(self):
+        # Forget the oldest finished jobs once the history is full
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.history_limit:
+                break
+            if self._jobs[job_id].done:
+                del self._jobs[job_id]
+
+# Shared by all routers so identical work is collapsed across endpoints
+job_manager = JobManager(JOB_HISTORY_LIMIT)
@@ -0,0 +1,76 @@
+import pandas as pd
+import numpy as np
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pathlib import Path
+from typing import Any
+import orjson
+
+# NumPy scalars and numeric arrays are written natively by orjson; NaN and
+# Infinity become null
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def _default(obj: Any) -> Any:
+    """
+    Converts the values orjson does not know natively
+    """
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        # Object, string and non-contiguous arrays
+        return obj.tolist()
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict(orient="records")
+    if isinstance(obj, (pd.Series, pd.Index, pd.Categorical)):
+        return obj.tolist()
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, pd.Timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, Path):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _native_keys(value: Any) -> Any:
+    """
+    Rewrites dictionary keys orjson rejects (NumPy scalars, tuples, ...)
+    """
+    if isinstance(value, BaseModel):
+        value = value.model_dump()
+    if isinstance(value, dict):
+        return {
+            (key.item() if isinstance(key, np.generic) else key if isinstance(key, (str, int, float, bool)) or key is None else str(key)): _native_keys(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_native_keys(item) for item in value]
+    return value
+
+def dumps(content: Any) -> bytes:
+    """
+    Serializes a response or cached result straight to JSON bytes
+    """
+    try:
+        return orjson.dumps(content, default=_default, option=OPTIONS)
+    except TypeError:
+        # Rare: a dictionary keyed by values orjson cannot write as keys
+        return orjson.dumps(_native_keys(content), default=_default, option=OPTIONS)
+
+def loads(data: bytes) -> Any:
+    return orjson.loads(data)
+
+class NumpyJSONResponse(JSONResponse):
+    """
+    JSON response that accepts NumPy and pandas values as they come out of
+    the services, without converting them to Python objects first
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,215 @@
+import pandas as pd
+import numpy as np
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .executors import thread_executor
+
+# Offending values returned per issue, most frequent first
+SAMPLE_LIMIT = 5
+
+# A column is judged against the kind of value most of its cells hold
+MAJORITY_SHARE = 0.5
+
+# Numeric dates ("2024-01-31", "31/01/24 10:00") and dates with month
+# names ("Jan 31, 2024", "31 January 2024"), with an optional time
+_TIME = r"(?:[ T]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?"
+DATE_PATTERN = (
+    r"(?:\d{4}[-/.]\d{1,2}[-/.]\d{1,2}" + _TIME
+    + r"|\d{1,2}[-/.]\d{1,2}[-/.](?:\d{4}|\d{2})" + _TIME
+    + r"|[A-Za-z]{3,9}\.? \d{1,2},? \d{4}"
+    + r"|\d{1,2} [A-Za-z]{3,9},? \d{4})"
+)
+
+NUMBER_STARTS = list("0123456789+-.")
+
+def _value_kinds(uniques: pd.Series, text: np.ndarray, stripped: pd.Series) -> np.ndarray:
+    """
+    Classifies the distinct values of a text column: number, boolean,
+    datetime, numeric_text, date_text, text or other.
+    `text` marks the string values and `stripped` holds them without
+    surrounding whitespace.
+    """
+    kinds = np.full(len(uniques), "other", dtype=object)
+    if not text.all():
+        others = uniques[~text]
+        is_bool = others.map(lambda value: isinstance(value, (bool, np.bool_))).to_numpy()
+        is_number = others.map(lambda value: isinstance(value, (int, float, np.number))).to_numpy() & ~is_bool
+        is_datetime = others.map(lambda value: isinstance(value, (date, datetime, np.datetime64))).to_numpy()
+        other_kinds = np.full(len(others), "other", dtype=object)
+        other_kinds[is_number] = "number"
+        other_kinds[is_bool] = "boolean"
+        other_kinds[is_datetime] = "datetime"
+        kinds[~text] = other_kinds
+
+    if text.any():
+        # Parsing is slow for values that are not numbers or dates, so only
+        # plausible candidates are parsed: numbers start with a digit, sign
+        # or point, dates with a digit or (month names) are 10-18 characters
+        first = stripped.str[:1]
+        starts_numeric = first.isin(NUMBER_STARTS).to_numpy()
+        numeric = np.zeros(len(stripped), dtype=bool)
+        numeric[starts_numeric] = pd.to_numeric(stripped[starts_numeric], errors="coerce").notna().to_numpy()
+        may_be_date = (first.str.isdigit() | (first.str.isalpha() & stripped.str.len().between(10, 18))).to_numpy(dtype=bool) & ~numeric
+        dated = np.zeros(len(stripped), dtype=bool)
+        dated[may_be_date] = stripped[may_be_date].str.fullmatch(DATE_PATTERN).to_numpy(dtype=bool)
+        text_kinds = np.full(len(stripped), "text", dtype=object)
+        text_kinds[numeric] = "numeric_text"
+        text_kinds[dated] = "date_text"
+        kinds[text] = text_kinds
+    return kinds
+
+def _date_formats(values: pd.Series) -> pd.Series:
+    """
+    Reduces date strings to their layout: "2024-01-31" -> "Y-9-9",
+    "31/01/24" -> "9/9/9", "Jan 31, 2024" -> "M 9, Y"
+    """
+    return (
+        values.str.strip()
+        .str.replace(r"[A-Za-z]+", "M", regex=True)
+        .str.replace(r"\d{4}", "Y", regex=True)
+        .str.replace(r"\d+", "9", regex=True)
+    )
+
+def _issue(issue: str, values: pd.Series, counts: np.ndarray, **details: Any) -> Dict[str, Any]:
+    """
+    Describes one issue with its number of cells and the most frequent offending values
+    """
+    order = np.argsort(-counts, kind="stable")[:SAMPLE_LIMIT]
+    return {
+        "issue": issue,
+        "count": int(counts.sum()),
+        "samples": [values.iloc[position] for position in order],
+        **details
+    }
+
+def _inconsistencies(uniques: pd.Series, counts: np.ndarray, text: np.ndarray, stripped: pd.Series) -> List[Dict[str, Any]]:
+    """
+    Finds cells that do not fit the kind of values the rest of a text column holds
+    """
+    if not len(uniques):
+        return []
+
+    kinds = _value_kinds(uniques, text, stripped)
+    total = counts.sum()
+    rows = {kind: counts[kinds == kind].sum() for kind in np.unique(kinds)}
+    issues = []
+
+    numeric_rows = rows.get("number", 0) + rows.get("numeric_text", 0)
+    date_rows = rows.get("datetime", 0) + rows.get("date_text", 0)
+    if numeric_rows >= total * MAJORITY_SHARE:
+        # A numeric column some of whose cells are text
+        numeric_text = kinds == "numeric_text"
+        if numeric_text.any():
+            issues.append(_issue("numbers_stored_as_text", uniques[numeric_text], counts[numeric_text]))
+        others = ~np.isin(kinds, ["number", "numeric_text"])
+        if others.any():
+            issues.append(_issue("non_numeric_values", uniques[others], counts[others]))
+    elif date_rows >= total * MAJORITY_SHARE:
+        # A date column written in more than one layout
+        date_text = kinds == "date_text"
+        if date_text.any():
+            formats = _date_formats(uniques[date_text].reset_index(drop=True))
+            format_rows = pd.Series(counts[date_text], index=formats.to_numpy()).groupby(level=0).sum()
+            if len(format_rows) > 1 or rows.get("datetime", 0):
+                minority = formats != format_rows.idxmax()
+                if minority.any():
+                    issues.append(_issue(
+                        "mixed_date_formats", uniques[date_text][minority.to_numpy()], counts[date_text][minority.to_numpy()],
+                        formats={str(layout): int(count) for layout, count in format_rows.items()}
+                    ))
+        others = ~np.isin(kinds, ["datetime", "date_text"])
+        if others.any():
+            issues.append(_issue("non_date_values", uniques[others], counts[others]))
+    else:
+        # A text column holding cells of other types
+        typed = np.isin(kinds, ["number", "boolean", "datetime", "other"])
+        if typed.any():
+            issues.append(_issue(
+                "mixed_types", uniques[typed], counts[typed],
+                types={kind: int(count) for kind, count in rows.items()}
+            ))
+    return issues
+
+def column_quality(series: pd.Series) -> Dict[str, Any]:
+    """
+    Computes every quality metric of one column in a single pass: the
+    column is factorized once and all checks run on its distinct values,
+    weighted by how often each occurs.
+    Blank means empty or whitespace-only text; missing is null or blank.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        uniques = pd.Series(series.cat.categories, dtype=object)
+    else:
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        uniques = pd.Series(uniques, dtype=object)
+
+    valid = codes >= 0
+    null_count = int(len(codes) - valid.sum())
+    counts = np.bincount(codes[valid], minlength=len(uniques))
+    present = counts > 0
+    uniques = uniques[present].reset_index(drop=True)
+    counts = counts[present]
+
+    is_text = series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(series.dtype)
+    if not is_text:
+        unique_count = len(uniques)
+        return {
+            "unique_count": unique_count,
+            "duplicate_count": int(counts.sum()) - unique_count,
+            "missing_count": null_count,
+            "null_count": null_count,
+            "inconsistent_data": []
+        }
+
+    # Every distinct string is stripped once; the checks below share the result
+    if pd.api.types.infer_dtype(uniques, skipna=True) == "string":
+        text = np.ones(len(uniques), dtype=bool)
+    else:
+        text = uniques.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+    stripped = uniques[text].astype(str).str.strip()
+    blank = np.zeros(len(uniques), dtype=bool)
+    blank[text] = (stripped == "").to_numpy()
+
+    blank_count = int(counts[blank].sum())
+    unique_count = int((~blank).sum())
+    filled = ~blank
+    return {
+        "unique_count": unique_count,
+        "duplicate_count": int(counts[filled].sum()) - unique_count,
+        "missing_count": null_count + blank_count,
+        "null_count": null_count,
+        "inconsistent_data": _inconsistencies(
+            uniques[filled].reset_index(drop=True), counts[filled], text[filled],
+            stripped[~blank[text]].reset_index(drop=True)
+        )
+    }
+
+async def analyze_quality(df: pd.DataFrame, progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+    """
+    Runs column_quality for every column in parallel on the thread pool.
+    `progress(fraction, message)` is called as columns finish.
+    """
+    columns = list(df.columns)
+    results = {}
+    measure = lambda column: column_quality(df[column])
+    async for column, result in thread_executor.as_completed(measure, columns):
+        results[column] = result
+        done = len(results)
+        if progress is not None:
+            progress(done / len(columns), f"Checked {done} of {len(columns)} columns")
+
+    quality = {
+        "unique_counts": {},
+        "duplicate_counts": {},
+        "missing_counts": {},
+        "null_counts": {},
+        "inconsistent_data": {},
+        "total_rows": len(df)
+    }
+    for column in columns:
+        for key in ("unique", "duplicate", "missing", "null"):
+            quality[f"{key}_counts"][column] = results[column][f"{key}_count"]
+        quality["inconsistent_data"][column] = results[column]["inconsistent_data"]
+    return quality
@@ -0,0 +1,201 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import sqlite3
+import threading
+import time
+
+from .json_response import dumps, loads
+from .executors import thread_executor
+from ..config import RESULT_CACHE_PATH, RESULT_CACHE_MEMORY_BYTES, RESULT_CACHE_DISK_BYTES
+
+class ResultCache:
+    """
+    Two-tier cache of analysis results keyed by (content hash, endpoint,
+    column, analysis type). Uploads never change, so a result stays valid for
+    as long as content with the same hash exists.
+    Recent results are kept in memory; every result is also written to SQLite
+    so it survives restarts and re-uploads of the same file. Both tiers evict
+    least-recently-used entries beyond their size budget.
+    Values are stored as JSON, so they read back as plain Python objects.
+    Async code uses the *_async methods, which answer memory hits at once
+    and leave SQLite to the thread pool. The tiers have separate locks, so a
+    memory lookup never waits for a disk write.
+    """
+    def __init__(self, db_path: Path, memory_max_bytes: int, disk_max_bytes: int):
+        self.db_path = Path(db_path)
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[Tuple[str, str, str, str], Tuple[Any, int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.RLock()
+        self._disk_lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use so importing the app does not touch the disk
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " content_hash TEXT NOT NULL, endpoint TEXT NOT NULL, column_name TEXT NOT NULL,"
+                " analysis_type TEXT NOT NULL, value BLOB NOT NULL, size INTEGER NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (content_hash, endpoint, column_name, analysis_type))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, content_hash: str, endpoint: str, column: str = "", analysis_type: str = "") -> Optional[Any]:
+        """
+        Returns a cached result, or None if it has not been computed yet
+        """
+        key = (content_hash, endpoint, column, analysis_type)
+        result = self._get_memory(key)
+        if result is not None:
+            return result
+
+        with self._disk_lock:
+            conn = self._db()
+            row = conn.execute(
+                "SELECT value FROM results WHERE content_hash = ? AND endpoint = ? AND column_name = ? AND analysis_type = ?",
+                key
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE results SET last_used = ? WHERE content_hash = ? AND endpoint = ? AND column_name = ? AND analysis_type = ?",
+                    (time.time(),) + key
+                )
+                conn.commit()
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, row[0])
+        return loads(row[0])
+
+    async def get_async(self, content_hash: str, endpoint: str, column: str = "", analysis_type: str = "") -> Optional[Any]:
+        """
+        get() for async code: memory hits are answered at once, SQLite is
+        read on the thread pool
+        """
+        result = self._get_memory((content_hash, endpoint, column, analysis_type))
+        if result is not None:
+            return result
+        return await thread_executor.run(self.get, content_hash, endpoint, column, analysis_type)
+
+    def _get_memory(self, key: Tuple[str, str, str, str]) -> Optional[Any]:
+        with self._lock:
+            if key not in self._memory:
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+            serialized = self._memory[key][0]
+        return loads(serialized)
+
+    def put(self, content_hash: str, endpoint: str, value: Any, column: str = "", analysis_type: str = "") -> Any:
+        """
+        Stores a result in both tiers.
+        Returns the result as it will be read back from the cache.
+        """
+        key = (content_hash, endpoint, column, analysis_type)
+        serialized = dumps(value)
+        with self._lock:
+            self._remember(key, serialized)
+
+        with self._disk_lock:
+            conn = self._db()
+            conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                key + (serialized, len(serialized), time.time())
+            )
+            self._evict_disk(conn)
+            conn.commit()
+        return loads(serialized)
+
+    async def put_async(self, content_hash: str, endpoint: str, value: Any, column: str = "", analysis_type: str = "") -> Any:
+        """
+        put() for async code, serializing and writing on the thread pool
+        """
+        return await thread_executor.run(self.put, content_hash, endpoint, value, column, analysis_type)
+
+    def invalidate(self, content_hash: str):
+        """
+        Drops every result computed for the given content
+        """
+        with self._lock:
+            for key in [key for key in self._memory if key[0] == content_hash]:
+                self._memory_bytes -= self._memory.pop(key)[1]
+
+        with self._disk_lock:
+            conn = self._db()
+            conn.execute("DELETE FROM results WHERE content_hash = ?", (content_hash,))
+            conn.commit()
+
+    async def invalidate_async(self, content_hash: str):
+        """
+        invalidate() for async code, deleting from SQLite on the thread pool
+        """
+        await thread_executor.run(self.invalidate, content_hash)
+
+    def _remember(self, key: Tuple[str, str, str, str], serialized: bytes):
+        # Results are kept serialized so callers never share mutable objects
+        size = len(serialized)
+        if size > self.memory_max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key)[1]
+        self._memory[key] = (serialized, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_max_bytes:
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+
+    def _evict_disk(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.disk_max_bytes:
+            return
+        # Walk entries from least recently used and delete until under budget
+        excess = total - self.disk_max_bytes
+        rows = conn.execute("SELECT rowid, size FROM results ORDER BY last_used").fetchall()
+        doomed = []
+        for rowid, size in rows:
+            if excess <= 0:
+                break
+            doomed.append((rowid,))
+            excess -= size
+        conn.executemany("DELETE FROM results WHERE rowid = ?", doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._disk_lock:
+            disk_entries, disk_bytes = self._db().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_max_bytes": self.memory_max_bytes,
+                "disk_entries": disk_entries,
+                "disk_bytes": disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses
+            }
+
+    def close(self):
+        with self._disk_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# Shared by all services so any endpoint can reuse another's results
+result_cache = ResultCache(RESULT_CACHE_PATH, RESULT_CACHE_MEMORY_BYTES, RESULT_CACHE_DISK_BYTES)
@@ -0,0 +1,511 @@
+import pandas as pd
+import numpy as np
+import pyarrow.parquet as pq
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import operator
+import re
+
+from .column_store import open_column_store
+
+# Filters are written like SQL WHERE clauses:
+#   price >= 100 AND (region IN ('north', 'south') OR name CONTAINS 'n2')
+#   "unit price" < 9.5 OR NOT (flag = TRUE) OR qty IS NULL
+# Strings take single quotes ('it''s'), column names with spaces or
+# keywords double quotes. A comparison, IN or CONTAINS never matches a
+# missing value, and neither do their NOT IN / NOT CONTAINS / != forms;
+# NOT (...) negates a whole condition, so it does match missing values.
+
+KEYWORDS = {"AND", "OR", "NOT", "IN", "IS", "NULL", "CONTAINS", "TRUE", "FALSE"}
+
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<number>-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+        | (?P<string>'(?:[^']|'')*')
+        | (?P<quoted>"(?:[^"]|"")*")
+        | (?P<operator><=|>=|!=|<>|==|=|<|>)
+        | (?P<punctuation>[(),])
+        | (?P<word>[A-Za-z_][A-Za-z0-9_.]*)
+    )""", re.VERBOSE)
+
+OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    "=": operator.eq, "!=": operator.ne, "<": operator.lt,
+    "<=": operator.le, ">": operator.gt, ">=": operator.ge
+}
+
+# Row group statistics of one column: min, max (None when unknown), nulls, rows
+BlockStats = Tuple[Any, Any, Optional[int], int]
+
+def _quote_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+def _quote_column(name: str) -> str:
+    if re.fullmatch(r"[A-Za-z_][A-Za-z0-9_.]*", name) and name.upper() not in KEYWORDS:
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+def _literal(value: Any) -> str:
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, str):
+        return _quote_string(value)
+    if isinstance(value, pd.Timestamp):
+        return _quote_string(value.isoformat())
+    return repr(value)
+
+def _column_kind(dtype: Any) -> str:
+    if pd.api.types.is_bool_dtype(dtype):
+        return "boolean"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "number"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    return "text"
+
+def _present(series: pd.Series) -> np.ndarray:
+    return series.notna().to_numpy(dtype=bool)
+
+def _as_mask(result: Any) -> np.ndarray:
+    if isinstance(result, pd.Series):
+        return result.to_numpy(dtype=bool, na_value=False)
+    return np.asarray(result, dtype=bool)
+
+class Predicate:
+    """A condition on the rows of a dataset"""
+
+    def columns(self) -> Set[str]:
+        """Columns the condition reads"""
+        raise NotImplementedError
+
+    def bind(self, dtypes: Dict[str, Any]):
+        """
+        Checks every value against the dtype of its column, converting it
+        where needed (dates); raises ValueError on a mismatch
+        """
+        raise NotImplementedError
+
+    def mask(self, frame: pd.DataFrame) -> np.ndarray:
+        """Rows of the frame that match, as a boolean array"""
+        raise NotImplementedError
+
+    def may_match(self, stats: Dict[str, BlockStats]) -> bool:
+        """
+        False when the statistics of a block of rows prove none of them
+        matches, so the block need not be read
+        """
+        return True
+
+class ColumnPredicate(Predicate):
+    def __init__(self, column: str):
+        self.column = column
+        self.kind = "text"
+
+    def columns(self) -> Set[str]:
+        return {self.column}
+
+    def _check(self, value: Any, ordered: bool = False) -> Any:
+        """Returns the value as compared with the column"""
+        if self.kind == "number":
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"Column '{self.column}' holds numbers; compare it with a number")
+            return value
+        if self.kind == "boolean":
+            if not isinstance(value, bool) or ordered:
+                raise ValueError(f"Column '{self.column}' holds booleans; compare it with = or != TRUE or FALSE")
+            return value
+        if self.kind == "datetime":
+            if not isinstance(value, str):
+                raise ValueError(f"Column '{self.column}' holds dates; compare it with a quoted date")
+            try:
+                timestamp = pd.Timestamp(value)
+            except ValueError:
+                raise ValueError(f"'{value}' is not a date")
+            tz = getattr(self.dtype, "tz", None)
+            if tz is not None and timestamp.tz is None:
+                timestamp = timestamp.tz_localize(tz)
+            return timestamp
+        # Booleans with gaps are read as text columns
+        if not isinstance(value, str) and not (isinstance(value, bool) and not ordered):
+            raise ValueError(f"Column '{self.column}' holds text; quote the value")
+        return value
+
+    def bind(self, dtypes: Dict[str, Any]):
+        self.dtype = dtypes[self.column]
+        self.kind = _column_kind(self.dtype)
+
+    def _series(self, frame: pd.DataFrame, ordered: bool = False) -> pd.Series:
+        series = frame[self.column]
+        if ordered and isinstance(series.dtype, pd.CategoricalDtype):
+            # Unordered categories cannot be compared with < or >
+            series = series.astype(object)
+        return series
+
+    def _stats(self, stats: Dict[str, BlockStats]) -> Optional[BlockStats]:
+        return stats.get(self.column)
+
+class Comparison(ColumnPredicate):
+    def __init__(self, column: str, op: str, value: Any):
+        super().__init__(column)
+        self.op = op
+        self.value = value
+
+    def __str__(self) -> str:
+        return f"{_quote_column(self.column)} {self.op} {_literal(self.value)}"
+
+    def bind(self, dtypes: Dict[str, Any]):
+        super().bind(dtypes)
+        self.value = self._check(self.value, ordered=self.op not in ("=", "!="))
+
+    def mask(self, frame: pd.DataFrame) -> np.ndarray:
+        series = self._series(frame, ordered=self.op not in ("=", "!="))
+        try:
+            result = OPERATORS[self.op](series, self.value)
+        except TypeError:
+            raise ValueError(f"Values of column '{self.column}' cannot be compared with {_literal(self.value)}")
+        return _as_mask(result) & _present(series)
+
+    def may_match(self, stats: Dict[str, BlockStats]) -> bool:
+        block = self._stats(stats)
+        if block is None:
+            return True
+        low, high, nulls, rows = block
+        if nulls == rows:
+            return False
+        if low is None:
+            return True
+        try:
+            if self.op == "=":
+                return bool(low <= self.value <= high)
+            if self.op == "!=":
+                return not (low == high == self.value)
+            if self.op in ("<", "<="):
+                return bool(OPERATORS[self.op](low, self.value))
+            return bool(OPERATORS[self.op](high, self.value))
+        except TypeError:
+            return True
+
+class InList(ColumnPredicate):
+    def __init__(self, column: str, values: List[Any], negated: bool = False):
+        super().__init__(column)
+        self.values = values
+        self.negated = negated
+
+    def __str__(self) -> str:
+        keyword = "NOT IN" if self.negated else "IN"
+        return f"{_quote_column(self.column)} {keyword} ({', '.join(_literal(value) for value in self.values)})"
+
+    def bind(self, dtypes: Dict[str, Any]):
+        super().bind(dtypes)
+        self.values = [self._check(value) for value in self.values]
+
+    def mask(self, frame: pd.DataFrame) -> np.ndarray:
+        series = self._series(frame)
+        matched = _as_mask(series.isin(self.values))
+        return (~matched if self.negated else matched) & _present(series)
+
+    def may_match(self, stats: Dict[str, BlockStats]) -> bool:
+        block = self._stats(stats)
+        if block is None:
+            return True
+        low, high, nulls, rows = block
+        if nulls == rows:
+            return False
+        if low is None or self.negated:
+            return True
+        try:
+            return any(low <= value <= high for value in self.values)
+        except TypeError:
+            return True
+
+class IsNull(ColumnPredicate):
+    def __init__(self, column: str, negated: bool = False):
+        super().__init__(column)
+        self.negated = negated
+
+    def __str__(self) -> str:
+        return f"{_quote_column(self.column)} IS {'NOT NULL' if self.negated else 'NULL'}"
+
+    def mask(self, frame: pd.DataFrame) -> np.ndarray:
+        present = _present(frame[self.column])
+        return present if self.negated else ~present
+
+    def may_match(self, stats: Dict[str, BlockStats]) -> bool:
+        block = self._stats(stats)
+        if block is None or block[2] is None:
+            return True
+        _, _, nulls, rows = block
+        return nulls < rows if self.negated else nulls > 0
+
+class Contains(ColumnPredicate):
+    def __init__(self, column: str, text: str, negated: bool = False):
+        super().__init__(column)
+        self.text = text
+        self.negated = negated
+
+    def __str__(self) -> str:
+        keyword = "NOT CONTAINS" if self.negated else "CONTAINS"
+        return f"{_quote_column(self.column)} {keyword} {_literal(self.text)}"
+
+    def bind(self, dtypes: Dict[str, Any]):
+        super().bind(dtypes)
+        if self.kind != "text":
+            raise ValueError(f"CONTAINS needs a text column; '{self.column}' holds {self.kind} values")
+        if not isinstance(self.text, str):
+            raise ValueError("CONTAINS needs a quoted string")
+
+    def mask(self, frame: pd.DataFrame) -> np.ndarray:
+        series = frame[self.column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Each distinct value is searched once
+            found = pd.Series(series.cat.categories).astype(str).str.contains(self.text, regex=False).to_numpy()
+            codes = series.cat.codes.to_numpy()
+            matched = np.where(codes >= 0, found[codes] if len(found) else False, False)
+        else:
+            try:
+                matched = _as_mask(series.str.contains(self.text, regex=False, na=False))
+            except AttributeError:
+                # Text columns without any strings, e.g. booleans with gaps
+                matched = _as_mask(series.astype(str).str.contains(self.text, regex=False))
+        return (~matched if self.negated else matched) & _present(series)
+
+    def may_match(self, stats: Dict[str, BlockStats]) -> bool:
+        block = self._stats(stats)
+        return block is None or block[2] != block[3]
+
+class And(Predicate):
+    def __init__(self, children: List[Predicate]):
+        self.children = children
+
+    def __str__(self) -> str:
+        return " AND ".join(f"({child})" if isinstance(child, Or) else str(child) for child in self.children)
+
+    def columns(self) -> Set[str]:
+        return set().union(*(child.columns() for child in self.children))
+
+    def bind(self, dtypes: Dict[str, Any]):
+        for child in self.children:
+            child.bind(dtypes)
+
+    def mask(self, frame: pd.DataFrame) -> np.ndarray:
+        result = self.children[0].mask(frame)
+        for child in self.children[1:]:
+            if not result.any():
+                break
+            result &= child.mask(frame)
+        return result
+
+    def may_match(self, stats: Dict[str, BlockStats]) -> bool:
+        return all(child.may_match(stats) for child in self.children)
+
+class Or(Predicate):
+    def __init__(self, children: List[Predicate]):
+        self.children = children
+
+    def __str__(self) -> str:
+        return " OR ".join(str(child) for child in self.children)
+
+    def columns(self) -> Set[str]:
+        return set().union(*(child.columns() for child in self.children))
+
+    def bind(self, dtypes: Dict[str, Any]):
+        for child in self.children:
+            child.bind(dtypes)
+
+    def mask(self, frame: pd.DataFrame) -> np.ndarray:
+        result = self.children[0].mask(frame)
+        for child in self.children[1:]:
+            if result.all():
+                break
+            result |= child.mask(frame)
+        return result
+
+    def may_match(self, stats: Dict[str, BlockStats]) -> bool:
+        return any(child.may_match(stats) for child in self.children)
+
+class Not(Predicate):
+    def __init__(self, child: Predicate):
+        self.child = child
+
+    def __str__(self) -> str:
+        return f"NOT ({self.child})"
+
+    def columns(self) -> Set[str]:
+        return self.child.columns()
+
+    def bind(self, dtypes: Dict[str, Any]):
+        self.child.bind(dtypes)
+
+    def mask(self, frame: pd.DataFrame) -> np.ndarray:
+        return ~self.child.mask(frame)
+
+class _Parser:
+    def __init__(self, text: str):
+        self.tokens: List[Tuple[str, str, int]] = []
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = TOKEN_PATTERN.match(text, position)
+            if match is None or match.end() == position:
+                raise ValueError(f"Unexpected character at position {position}: '{text[position:position + 10].strip()}'")
+            kind = match.lastgroup
+            value, start = match.group(kind), match.start(kind)
+            if kind == "word" and value.upper() in KEYWORDS:
+                kind, value = "keyword", value.upper()
+            self.tokens.append((kind, value, start))
+            position = match.end()
+        self.position = 0
+
+    def _peek(self) -> Optional[Tuple[str, str, int]]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _next(self, expected: str) -> Tuple[str, str, int]:
+        token = self._peek()
+        if token is None:
+            raise ValueError(f"Filter ends early; expected {expected}")
+        self.position += 1
+        return token
+
+    def _accept(self, kind: str, value: Optional[str] = None) -> bool:
+        token = self._peek()
+        if token is not None and token[0] == kind and (value is None or token[1] == value):
+            self.position += 1
+            return True
+        return False
+
+    def _expect(self, kind: str, value: str):
+        token = self._next(f"'{value}'")
+        if token[0] != kind or token[1] != value:
+            raise ValueError(f"Expected '{value}' at position {token[2]}, found '{token[1]}'")
+
+    def parse(self) -> Predicate:
+        if not self.tokens:
+            raise ValueError("The filter is empty")
+        predicate = self._or()
+        token = self._peek()
+        if token is not None:
+            raise ValueError(f"Unexpected '{token[1]}' at position {token[2]}")
+        return predicate
+
+    def _or(self) -> Predicate:
+        children = [self._and()]
+        while self._accept("keyword", "OR"):
+            children.append(self._and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def _and(self) -> Predicate:
+        children = [self._not()]
+        while self._accept("keyword", "AND"):
+            children.append(self._not())
+        return children[0] if len(children) == 1 else And(children)
+
+    def _not(self) -> Predicate:
+        if self._accept("keyword", "NOT"):
+            return Not(self._not())
+        if self._accept("punctuation", "("):
+            predicate = self._or()
+            self._expect("punctuation", ")")
+            return predicate
+        return self._condition()
+
+    def _value(self) -> Any:
+        kind, value, position = self._next("a value")
+        if kind == "number":
+            number = float(value)
+            return int(number) if re.fullmatch(r"-?\d+", value) else number
+        if kind == "string":
+            return value[1:-1].replace("''", "'")
+        if kind == "keyword" and value in ("TRUE", "FALSE"):
+            return value == "TRUE"
+        raise ValueError(f"Expected a value at position {position}, found '{value}'")
+
+    def _condition(self) -> Predicate:
+        kind, value, position = self._next("a column name")
+        if kind == "word":
+            column = value
+        elif kind == "quoted":
+            column = value[1:-1].replace('""', '"')
+        else:
+            raise ValueError(f"Expected a column name at position {position}, found '{value}'")
+
+        if self._accept("keyword", "IS"):
+            negated = self._accept("keyword", "NOT")
+            self._expect("keyword", "NULL")
+            return IsNull(column, negated)
+
+        negated = self._accept("keyword", "NOT")
+        if self._accept("keyword", "IN"):
+            self._expect("punctuation", "(")
+            values = [self._value()]
+            while self._accept("punctuation", ","):
+                values.append(self._value())
+            self._expect("punctuation", ")")
+            return InList(column, values, negated)
+        if self._accept("keyword", "CONTAINS"):
+            return Contains(column, self._value(), negated)
+        if negated:
+            raise ValueError(f"Expected IN or CONTAINS after NOT for column '{column}'")
+
+        kind, op, position = self._next("a comparison")
+        if kind != "operator":
+            raise ValueError(f"Expected a comparison, IN, IS or CONTAINS at position {position}, found '{op}'")
+        op = {"==": "=", "<>": "!="}.get(op, op)
+        return Comparison(column, op, self._value())
+
+def parse_filter(text: str, dtypes: Dict[str, Any]) -> Predicate:
+    """
+    Parses a filter and checks it against the dtypes of the dataset's
+    columns. Raises ValueError with a message for the user on any error.
+    """
+    predicate = _Parser(text).parse()
+    for column in predicate.columns():
+        if column not in dtypes:
+            raise ValueError(f"Column '{column}' not found")
+    predicate.bind(dtypes)
+    return predicate
+
+def _block_stats(row_group: pq.RowGroupMetaData, position: int) -> BlockStats:
+    statistics = row_group.column(position).statistics
+    rows = row_group.num_rows
+    if statistics is None:
+        return None, None, None, rows
+    nulls = statistics.null_count if statistics.has_null_count else None
+    if not statistics.has_min_max:
+        return None, None, nulls, rows
+    return statistics.min, statistics.max, nulls, rows
+
+def plan_row_groups(dataset_id: str, predicate: Predicate) -> Tuple[List[Tuple[int, int, int]], int]:
+    """
+    Returns (row group, first row, rows) of the blocks of the stored
+    dataset that may hold matching rows, judged from the min, max and null
+    count Parquet keeps for every column of every row group, and the
+    number of row groups
+    """
+    store = open_column_store(dataset_id)
+    metadata = store.metadata
+    names = store.schema_arrow.names
+    positions = {name: names.index(name) for name in predicate.columns()}
+    blocks = []
+    start = 0
+    for group in range(metadata.num_row_groups):
+        row_group = metadata.row_group(group)
+        stats = {name: _block_stats(row_group, position) for name, position in positions.items()}
+        if predicate.may_match(stats):
+            blocks.append((group, start, row_group.num_rows))
+        start += row_group.num_rows
+    return blocks, metadata.num_row_groups
+
+def filter_positions(dataset_id: str, predicate: Predicate, blocks: List[Tuple[int, int, int]], df: Optional[pd.DataFrame] = None) -> np.ndarray:
+    """
+    Evaluates a filter over the given blocks, reading only the columns it
+    references: sliced from the loaded frame when there is one, otherwise
+    decoded from the store. Returns the positions of the matching rows.
+    """
+    columns = sorted(predicate.columns())
+    parquet_file = None if df is not None else open_column_store(dataset_id)
+    matches = []
+    for group, start, rows in blocks:
+        if df is not None:
+            frame = df[columns].iloc[start:start + rows]
+        else:
+            frame = parquet_file.read_row_group(group, columns=columns).to_pandas()
+        matches.append(np.flatnonzero(predicate.mask(frame)) + start)
+    return np.concatenate(matches) if matches else np.empty(0, dtype=np.int64)
@@ -0,0 +1,122 @@
+import pandas as pd
+import numpy as np
+from typing import Optional, Tuple
+
+from .column_store import get_store_path, read_store_schema, open_column_store
+from .dataset_registry import dataset_registry
+
+FINGERPRINTS_FILE = "row_fingerprints.npy"
+
+# Sets of identical rows: the rows of every set one set after the other,
+# with where each set starts and how many rows it has
+DuplicateGroups = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+def _hash_rows(df: pd.DataFrame) -> np.ndarray:
+    # Text columns hold None or NaN for gaps depending on how they were
+    # read, and the two hash differently
+    gaps = {
+        column: df[column].where(df[column].notna(), None)
+        for column in df.columns
+        if df[column].dtype == object and df[column].hasnans
+    }
+    if gaps:
+        df = df.assign(**gaps)
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+def _save_fingerprints(dataset_id: str, fingerprints: np.ndarray):
+    tmp_path = get_store_path(dataset_id) / f"{FINGERPRINTS_FILE}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, fingerprints)
+    tmp_path.replace(get_store_path(dataset_id) / FINGERPRINTS_FILE)
+
+def build_row_fingerprints(dataset_id: str, df: Optional[pd.DataFrame] = None) -> np.ndarray:
+    """
+    Computes one 64-bit hash per row and saves it next to the columnar copy.
+    Rows with equal values get equal fingerprints; different rows collide
+    with negligible probability (about n^2 / 2^65 for n rows).
+    The loaded frame is hashed when given, otherwise the store is hashed one
+    row group at a time so memory stays bounded.
+    """
+    if df is not None:
+        fingerprints = _hash_rows(df)
+    else:
+        parquet_file = open_column_store(dataset_id)
+        # A row group without nulls reads an integer column as integers and
+        # one with nulls as floats; casting to the dataset's dtypes keeps
+        # equal values hashing equally across groups
+        schema = read_store_schema(dataset_id)
+        fingerprints = np.concatenate([
+            _hash_rows(parquet_file.read_row_group(group).to_pandas().astype(schema))
+            for group in range(parquet_file.metadata.num_row_groups)
+        ] or [np.empty(0, dtype=np.uint64)])
+
+    _save_fingerprints(dataset_id, fingerprints)
+    return fingerprints
+
+def append_row_fingerprints(dataset_id: str, df: pd.DataFrame) -> np.ndarray:
+    """
+    Adds the fingerprints of rows appended to a dataset, hashing only those
+    rows. They must have the dtypes the whole dataset reads back with.
+    """
+    path = get_store_path(dataset_id) / FINGERPRINTS_FILE
+    if not path.exists():
+        return build_row_fingerprints(dataset_id)
+
+    fingerprints = np.concatenate([np.load(path), _hash_rows(df)])
+    _save_fingerprints(dataset_id, fingerprints)
+    return fingerprints
+
+def get_row_fingerprints(dataset_id: str) -> np.ndarray:
+    """
+    Returns the cached fingerprints of a dataset, hashing its store on first use
+    """
+    fingerprints = dataset_registry.get(dataset_id, "fingerprints")
+    if fingerprints is None:
+        path = get_store_path(dataset_id) / FINGERPRINTS_FILE
+        if path.exists():
+            fingerprints = np.load(path, mmap_mode="r")
+        else:
+            fingerprints = build_row_fingerprints(dataset_id)
+        fingerprints = dataset_registry.put(dataset_id, fingerprints, "fingerprints")
+    return fingerprints
+
+def count_duplicate_rows(fingerprints: np.ndarray) -> int:
+    """
+    Counts rows that repeat an earlier row
+    """
+    return int(len(fingerprints) - len(np.unique(fingerprints)))
+
+def duplicate_groups(fingerprints: np.ndarray) -> DuplicateGroups:
+    """
+    Finds every set of identical rows, ordered by the first row of each set
+    """
+    order = np.argsort(fingerprints, kind="stable")
+    ordered = fingerprints[order]
+    # Boundaries between runs of equal fingerprints
+    run_starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1]))) if len(ordered) else np.empty(0, dtype=np.int64)
+    run_sizes = np.diff(np.append(run_starts, len(ordered)))
+    repeated = run_sizes > 1
+    run_starts, run_sizes = run_starts[repeated], run_sizes[repeated]
+
+    # The stable sort keeps each set's rows ascending, so its first row
+    # leads its run
+    by_first_row = np.argsort(order[run_starts], kind="stable")
+    run_starts, sizes = run_starts[by_first_row], run_sizes[by_first_row]
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+    # Gather the runs one after the other in their new order
+    moves = np.repeat(run_starts - starts, sizes)
+    rows = order[np.arange(len(moves)) + moves]
+    return rows, starts, sizes
+
+def get_duplicate_groups(dataset_id: str, fingerprints: np.ndarray) -> DuplicateGroups:
+    """
+    Returns the cached sets of identical rows of a dataset, finding them
+    from its fingerprints on first use
+    """
+    parts = [dataset_registry.get(dataset_id, f"duplicate_{part}") for part in ("rows", "starts", "sizes")]
+    if any(part is None for part in parts):
+        parts = [
+            dataset_registry.put(dataset_id, part, f"duplicate_{kind}")
+            for kind, part in zip(("rows", "starts", "sizes"), duplicate_groups(fingerprints))
+        ]
+    return tuple(parts)
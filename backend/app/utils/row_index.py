@@ -0,0 +1,142 @@
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+from .column_store import get_store_path, read_store_json, write_store_json, read_store_columns, read_store_schema, read_store_text_columns
+from ..config import ROW_INDEX_INTERVAL, UPLOAD_CHUNK_SIZE
+
+ROW_INDEX_FILE = "row_index"
+
+NEWLINE = ord("\n")
+CARRIAGE_RETURN = ord("\r")
+QUOTE = ord('"')
+
+def _scan_rows(f: BinaryIO, position: int, rows: int, interval: int) -> Tuple[np.ndarray, int]:
+    """
+    Reads a CSV file from `position`, which must be the start of row number
+    `rows` (-1 for the header), to its end. Returns the byte offsets of the
+    data rows whose number is a multiple of `interval` and the number of
+    rows read so far.
+    Rows are split the way pandas does: newlines inside quoted fields do not
+    end a row and blank lines are skipped.
+    """
+    offsets = []
+    quotes = 0  # parity of quote characters seen so far
+    record_start = position
+    previous_byte = NEWLINE
+
+    f.seek(position)
+    while block := f.read(UPLOAD_CHUNK_SIZE):
+        data = np.frombuffer(block, dtype=np.uint8)
+
+        # A newline ends a row only outside quotes, i.e. after an even
+        # number of quote characters ("" escapes keep the parity)
+        quote_counts = np.cumsum(data == QUOTE) + quotes
+        newlines = np.flatnonzero(data == NEWLINE)
+        ends = newlines[quote_counts[newlines] % 2 == 0] + position
+        quotes = int(quote_counts[-1] % 2) if len(data) else quotes
+
+        if len(ends):
+            starts = np.concatenate(([record_start], ends[:-1] + 1))
+            lengths = ends - starts
+            # Byte before each newline, to recognise "\r\n"-only lines
+            before = np.where(ends - position > 0, data[np.maximum(ends - position - 1, 0)], previous_byte)
+            blank = (lengths == 0) | ((lengths == 1) & (before == CARRIAGE_RETURN))
+            data_starts = starts[~blank]
+
+            numbers = np.arange(rows, rows + len(data_starts))
+            offsets.append(data_starts[(numbers >= 0) & (numbers % interval == 0)])
+            rows += len(data_starts)
+            record_start = int(ends[-1]) + 1
+
+        previous_byte = int(data[-1])
+        position += len(block)
+
+    # Last row without a trailing newline
+    trailing = position - record_start
+    if trailing > 1 or (trailing == 1 and previous_byte != CARRIAGE_RETURN):
+        if rows >= 0 and rows % interval == 0:
+            offsets.append(np.array([record_start]))
+        rows += 1
+
+    offsets = np.concatenate(offsets).astype(np.int64) if offsets else np.empty(0, dtype=np.int64)
+    return offsets, rows
+
+def _save_row_index(dataset_id: str, offsets: np.ndarray, interval: int, rows: int):
+    store_path = get_store_path(dataset_id)
+    store_path.mkdir(parents=True, exist_ok=True)
+    np.save(store_path / f"{ROW_INDEX_FILE}.npy", offsets)
+    write_store_json(dataset_id, ROW_INDEX_FILE, {"interval": interval, "rows": rows})
+
+def build_row_index(file_path: Union[str, Path], dataset_id: str, interval: int = ROW_INDEX_INTERVAL, expected_rows: Optional[int] = None) -> Optional[int]:
+    """
+    Records the byte offset of every `interval`-th data row of a CSV file so
+    any page of rows can be parsed without reading what comes before it.
+    The first row is the header.
+    Returns the number of data rows, or None (and writes nothing) when it
+    does not match `expected_rows`.
+    """
+    with open(file_path, "rb") as f:
+        offsets, rows = _scan_rows(f, 0, -1, interval)
+
+    rows = max(rows, 0)
+    if expected_rows is not None and rows != expected_rows:
+        return None
+    _save_row_index(dataset_id, offsets, interval, rows)
+    return rows
+
+def extend_row_index(file_path: Union[str, Path], dataset_id: str, start: int, expected_rows: Optional[int] = None) -> Optional[int]:
+    """
+    Adds the rows appended to a CSV file from byte `start` on to its row
+    index, reading only the appended bytes. `start` must be the beginning of
+    a line. Returns the number of data rows, or None (and writes nothing)
+    when there is no index to extend or the count does not match `expected_rows`.
+    """
+    index = load_row_index(dataset_id)
+    if index is None:
+        return None
+
+    with open(file_path, "rb") as f:
+        offsets, rows = _scan_rows(f, start, index["rows"], index["interval"])
+    if expected_rows is not None and rows != expected_rows:
+        return None
+    _save_row_index(dataset_id, np.concatenate([index["offsets"], offsets]), index["interval"], rows)
+    return rows
+
+def load_row_index(dataset_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the row index of a dataset ({"interval", "rows", "offsets"}), or None if it has none
+    """
+    meta = read_store_json(dataset_id, ROW_INDEX_FILE)
+    path = get_store_path(dataset_id) / f"{ROW_INDEX_FILE}.npy"
+    if meta is None or not path.exists():
+        return None
+    return dict(meta, offsets=np.load(path))
+
+def read_csv_rows(file_path: Union[str, Path], dataset_id: str, index: Dict[str, Any], offset: int, limit: int, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Parses rows [offset, offset + limit) of an indexed CSV file, seeking to
+    the nearest indexed row first. The rows get the dtypes of the columnar
+    copy, so a page does not depend on what its own rows look like (a text
+    column of digits, an integer column without gaps).
+    """
+    names = read_store_columns(dataset_id)
+    dtypes = read_store_schema(dataset_id)
+    if offset >= index["rows"] or limit <= 0:
+        return pd.DataFrame(columns=columns or names).astype({name: dtypes[name] for name in columns or names})
+
+    block = offset // index["interval"]
+    skip = offset - block * index["interval"]
+    with open(file_path, "rb") as f:
+        f.seek(int(index["offsets"][block]))
+        # Parsing the few rows before the offset is cheaper than skiprows,
+        # which counts physical lines rather than rows
+        df = pd.read_csv(
+            f, header=None, names=names, usecols=columns, nrows=skip + limit,
+            dtype={name: str for name in read_store_text_columns(dataset_id)}
+        )
+    df = df.iloc[skip:].reset_index(drop=True)
+    df = df.astype({name: dtypes[name] for name in df.columns})
+    # usecols keeps the file's column order
+    return df[columns] if columns else df
@@ -0,0 +1,296 @@
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from statistics import NormalDist
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import io
+import math
+
+from .column_store import (
+    get_store_path,
+    has_column_store,
+    read_store_take,
+    read_store_row_count,
+    write_store_json,
+    read_store_json,
+    _prepare_for_store
+)
+from .column_profiler import profile_dataset
+from .dataset_registry import dataset_registry
+from .file_handlers import read_dataset_columns
+from ..config import CSV_CHUNK_ROWS, SAMPLE_SCAN_BYTES
+
+# Rows sampled for a dataset: <SAMPLE_FILE>.parquet holds the rows in random
+# order, <SAMPLE_FILE>.json how they were drawn
+SAMPLE_FILE = "sample"
+
+# Consecutive rows read from each random offset of a file too large to scan
+SAMPLE_BLOCK_ROWS = 16
+
+def _reservoir_sample(file_path: Path, sample_rows: int, rng: np.random.Generator, progress: Optional[Callable[[float], None]]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Reads the whole CSV in chunks, keeping a uniform sample of its rows
+    (reservoir sampling, Algorithm R). Only the rows that enter the
+    reservoir are kept, so memory stays bounded by the sample.
+    """
+    pieces, slots = [], []
+    seen = 0
+    file_size = file_path.stat().st_size or 1
+    with open(file_path, "rb") as handle:
+        for chunk in pd.read_csv(handle, chunksize=CSV_CHUNK_ROWS):
+            positions = np.arange(seen, seen + len(chunk))
+            # Row i fills slot i while there are free slots, then replaces
+            # a random slot with probability sample_rows / (i + 1)
+            chosen = np.where(positions < sample_rows, positions, rng.integers(0, positions + 1))
+            keep = chosen < sample_rows
+            if keep.any():
+                pieces.append(chunk[keep])
+                slots.append(chosen[keep])
+            seen += len(chunk)
+            if progress:
+                progress(handle.tell() / file_size)
+
+    if not pieces:
+        return pd.read_csv(file_path, nrows=0), {"method": "reservoir", "total_rows": 0, "total_rows_exact": True}
+
+    sample = pd.concat(pieces, ignore_index=True)
+    slots = np.concatenate(slots)
+    # A slot holds the last row drawn for it
+    _, last_from_end = np.unique(slots[::-1], return_index=True)
+    sample = sample.iloc[len(slots) - 1 - last_from_end]
+    return sample, {"method": "reservoir", "total_rows": seen, "total_rows_exact": True}
+
+def _block_sample(file_path: Path, sample_rows: int, rng: np.random.Generator) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Samples a CSV without reading all of it: the file is cut into equal
+    slices of bytes and SAMPLE_BLOCK_ROWS rows are read from a random offset
+    in each (stratified by position). The number of rows is estimated from
+    the average length of the rows read. A random offset can fall inside a
+    quoted field spanning several lines; rows misread that way are skipped
+    when they do not parse.
+    """
+    file_size = file_path.stat().st_size
+    with open(file_path, "rb") as handle:
+        header = handle.readline()
+        data_start = handle.tell()
+        data_bytes = file_size - data_start
+
+        strata = max(1, math.ceil(sample_rows / SAMPLE_BLOCK_ROWS))
+        bounds = [data_start + data_bytes * stratum // strata for stratum in range(strata + 1)]
+        lines, lengths, starts = [], [], set()
+        for low, high in zip(bounds[:-1], bounds[1:]):
+            offset = int(rng.integers(low, max(high, low + 1)))
+            # The first line starting at or after the offset; the line the
+            # offset falls in is skipped, as longer lines are likelier hit
+            handle.seek(max(offset - 1, data_start))
+            if offset > data_start:
+                handle.readline()
+            for _ in range(SAMPLE_BLOCK_ROWS):
+                start = handle.tell()
+                line = handle.readline()
+                if not line:
+                    break
+                if start in starts:
+                    # Runs from neighbouring slices can overlap
+                    continue
+                starts.add(start)
+                lengths.append(len(line))
+                if line.strip():
+                    lines.append(line if line.endswith(b"\n") else line + b"\n")
+
+    sample = pd.read_csv(io.BytesIO(header + b"".join(lines)), on_bad_lines="skip")
+    info = {"method": "stratified_blocks", "total_rows": 0, "total_rows_exact": True}
+    if lengths:
+        lengths = np.asarray(lengths, dtype=np.float64)
+        info.update({
+            "total_rows": int(round(data_bytes / lengths.mean())),
+            "total_rows_exact": False,
+            "data_bytes": data_bytes,
+            "line_bytes": {
+                "mean": float(lengths.mean()),
+                "std": float(lengths.std(ddof=1)) if len(lengths) > 1 else 0.0,
+                "lines": len(lengths)
+            }
+        })
+    return sample, info
+
+def sample_csv(file_path: Union[str, Path], sample_rows: int, seed: Optional[int] = None, progress: Optional[Callable[[float], None]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Draws a random sample of about sample_rows rows from a CSV file: a
+    reservoir over a full read for files up to SAMPLE_SCAN_BYTES, reads at
+    stratified random offsets beyond that. Returns the rows in random order
+    and how they were drawn, with the (possibly estimated) number of rows.
+    """
+    file_path = Path(file_path)
+    rng = np.random.default_rng(seed)
+    if file_path.stat().st_size <= SAMPLE_SCAN_BYTES:
+        sample, info = _reservoir_sample(file_path, sample_rows, rng, progress)
+    else:
+        sample, info = _block_sample(file_path, sample_rows, rng)
+    return sample.iloc[rng.permutation(len(sample))].reset_index(drop=True), info
+
+def sample_store(dataset_id: str, sample_rows: int, seed: Optional[int] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Draws a uniform sample of rows from the columnar copy of a dataset,
+    decoding only the row groups that hold them
+    """
+    rng = np.random.default_rng(seed)
+    total_rows = read_store_row_count(dataset_id)
+    positions = np.sort(rng.choice(total_rows, size=min(sample_rows, total_rows), replace=False))
+    sample = read_store_take(dataset_id, positions)
+    return (
+        sample.iloc[rng.permutation(len(sample))].reset_index(drop=True),
+        {"method": "uniform", "total_rows": total_rows, "total_rows_exact": True}
+    )
+
+def save_sample(dataset_id: str, sample: pd.DataFrame, info: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Persists a sample next to the dataset's columnar copy and caches it
+    """
+    sample = _prepare_for_store(sample)
+    store_path = get_store_path(dataset_id)
+    store_path.mkdir(parents=True, exist_ok=True)
+    tmp_path = store_path / f"{SAMPLE_FILE}.parquet.tmp"
+    sample.to_parquet(tmp_path, index=False)
+    tmp_path.replace(store_path / f"{SAMPLE_FILE}.parquet")
+    write_store_json(dataset_id, SAMPLE_FILE, info)
+    return dataset_registry.put(dataset_id, sample, "sample")
+
+def load_sample(dataset_id: str) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+    """
+    Returns the persisted sample of a dataset and how it was drawn, or None
+    """
+    info = read_store_json(dataset_id, SAMPLE_FILE)
+    path = get_store_path(dataset_id) / f"{SAMPLE_FILE}.parquet"
+    if info is None or not path.exists():
+        return None
+    sample = dataset_registry.get(dataset_id, "sample")
+    if sample is None:
+        sample = dataset_registry.put(dataset_id, pd.read_parquet(path), "sample")
+    return sample, info
+
+def delete_sample(dataset_id: str):
+    """
+    Drops the persisted sample of a dataset whose rows changed
+    """
+    (get_store_path(dataset_id) / f"{SAMPLE_FILE}.parquet").unlink(missing_ok=True)
+    (get_store_path(dataset_id) / f"{SAMPLE_FILE}.json").unlink(missing_ok=True)
+
+def get_sample(dataset_id: str, file_path: Union[str, Path], sample_rows: int, progress: Optional[Callable[[float], None]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Returns a random sample of sample_rows rows of a dataset (or all of
+    them). The persisted sample is reused when it is large enough: its rows
+    are in random order, so any prefix is a random sample too. Otherwise
+    one is drawn from the columnar copy if there is one, else straight from
+    the uploaded CSV, and persisted.
+    """
+    file_path = Path(file_path)
+    kept = load_sample(dataset_id)
+    if kept is not None:
+        sample, info = kept
+        if info["requested_rows"] >= sample_rows:
+            return sample.head(sample_rows), info
+
+    if has_column_store(dataset_id) or file_path.suffix.lower() != ".csv":
+        # Uploads not converted yet are converted once
+        read_dataset_columns(file_path)
+        sample, info = sample_store(dataset_id, sample_rows)
+    else:
+        sample, info = sample_csv(file_path, sample_rows, progress=progress)
+    info["requested_rows"] = sample_rows
+    return save_sample(dataset_id, sample, info), info
+
+def _proportion_interval(successes: int, trials: int, z: float, fpc: float) -> Optional[List[float]]:
+    """
+    Wilson score interval of a proportion, narrowed by the finite population
+    correction (the interval closes on the estimate when the sample is the
+    whole dataset)
+    """
+    if not trials:
+        return None
+    p = successes / trials
+    z2 = z * z * fpc
+    denominator = 1 + z2 / trials
+    center = (p + z2 / (2 * trials)) / denominator
+    half = math.sqrt(z2 * (p * (1 - p) / trials + z2 / (4 * trials ** 2))) / denominator
+    return [max(0.0, center - half), min(1.0, center + half)]
+
+def _total_rows_interval(info: Dict[str, Any], z: float) -> List[Optional[float]]:
+    """
+    Interval of the number of rows estimated from the average row length;
+    the upper bound is None when the lengths vary too much to bound it
+    """
+    if info["total_rows_exact"]:
+        return [info["total_rows"], info["total_rows"]]
+    line_bytes = info["line_bytes"]
+    error = z * line_bytes["std"] / math.sqrt(line_bytes["lines"])
+    low = info["data_bytes"] / (line_bytes["mean"] + error)
+    high = info["data_bytes"] / (line_bytes["mean"] - error) if line_bytes["mean"] > error else None
+    return [low, high]
+
+def _estimate_distinct(series: pd.Series) -> int:
+    """
+    Estimates the distinct values of a column from a sample (bias-corrected
+    Chao1: many values seen once, few seen twice, means many never seen)
+    """
+    counts = series.value_counts(dropna=True)
+    once = int((counts == 1).sum())
+    twice = int((counts == 2).sum())
+    return int(round(len(counts) + once * (once - 1) / (2 * (twice + 1))))
+
+def profile_sample(sample: pd.DataFrame, info: Dict[str, Any], confidence: float) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+    """
+    Profiles a sample in the layout of column_profiler.profile_dataset, with
+    counts scaled to the whole dataset, and returns it with the sample's
+    description: how it was drawn and confidence intervals of the number of
+    rows and of each column's missing share, mean (numeric columns) or share
+    of its most common values (other columns). Shares are percentages.
+    Intervals treat the rows as a simple random sample.
+    """
+    profile = profile_dataset(sample)
+    rows = len(sample)
+    total_rows = max(info["total_rows"], rows)
+    exact = rows == total_rows
+    scale = total_rows / rows if rows else 0.0
+    fpc = max(0.0, 1.0 - rows / total_rows) if total_rows else 0.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    as_percentages = lambda interval: [100 * bound for bound in interval] if interval else None
+    intervals = {}
+    for column, stats in profile.items():
+        column_intervals = {"missing_percentage": as_percentages(_proportion_interval(stats["missing"], rows, z, fpc))}
+        if stats["is_numeric"] and not pd.api.types.is_bool_dtype(stats["dtype"]):
+            if stats["non_null"] > 1:
+                error = z * stats["std"] / math.sqrt(stats["non_null"]) * math.sqrt(fpc)
+                column_intervals["mean"] = [stats["mean"] - error, stats["mean"] + error]
+            else:
+                column_intervals["mean"] = None
+        elif "most_common" in stats:
+            column_intervals["most_common_percentage"] = {
+                value: as_percentages(_proportion_interval(count, rows, z, fpc))
+                for value, count in stats["most_common"].items()
+            }
+        intervals[column] = column_intervals
+
+        if not exact:
+            missing = int(round(stats["missing"] * scale))
+            stats.update({
+                "count": total_rows,
+                "missing": missing,
+                "non_null": total_rows - missing,
+                "unique": min(_estimate_distinct(sample[column]), total_rows - missing),
+                "unique_exact": False
+            })
+            for key in ("most_common", "least_common"):
+                if key in stats:
+                    stats[key] = {value: int(round(count * scale)) for value, count in stats[key].items()}
+
+    description = {
+        "method": info["method"],
+        "rows": rows,
+        "total_rows_exact": info["total_rows_exact"],
+        "confidence": confidence,
+        "total_rows_interval": _total_rows_interval(dict(info, total_rows=total_rows), z),
+        "intervals": intervals
+    }
+    return profile, description
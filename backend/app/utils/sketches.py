@@ -0,0 +1,359 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Any, Optional
+import base64
+import math
+
+from .column_store import write_store_json, read_store_json
+from .dataset_registry import dataset_registry
+
+# HyperLogLog precision: 2^12 registers, about 1.6% relative standard error
+HLL_PRECISION = 12
+# KLL accuracy parameter: about 1.3% normalized rank error
+KLL_K = 200
+# Number of counters kept by the heavy-hitters summary
+HEAVY_HITTERS_CAPACITY = 64
+
+SKETCHES_FILE = "sketches"
+
+_rng = np.random.default_rng()
+
+def _encode_array(values: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(values).tobytes()).decode("ascii")
+
+def _decode_array(data: str, dtype) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=dtype).copy()
+
+def _to_json_value(value: Any) -> Any:
+    """
+    Converts a value-count key to something JSON can store
+    """
+    if isinstance(value, (np.generic,)):
+        value = value.item()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """
+    Vectorized bit length of uint64 values. The two 32-bit halves are
+    converted to float separately so no precision is lost.
+    """
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+class HyperLogLog:
+    """
+    Distinct-count sketch. Sketches merge by taking the register-wise maximum.
+    """
+    def __init__(self, precision: int = HLL_PRECISION, registers: Optional[np.ndarray] = None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, hashes: np.ndarray):
+        """
+        Adds 64-bit hashes of the values
+        """
+        if len(hashes) == 0:
+            return
+        suffix_bits = 64 - self.precision
+        index = (hashes >> np.uint64(suffix_bits)).astype(np.intp)
+        suffix = hashes & np.uint64((1 << suffix_bits) - 1)
+        rank = (suffix_bits - _bit_length(suffix) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and empty:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / empty)
+        return float(estimate)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"precision": self.precision, "registers": _encode_array(self.registers)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HyperLogLog":
+        return cls(data["precision"], _decode_array(data["registers"], np.uint8))
+
+class KLLSketch:
+    """
+    Quantile sketch (Karnin, Lang, Liberty). Items are kept in levels of
+    compactors; an item at level h stands for 2^h original values. Full
+    levels are sorted and every other item is promoted to the next level.
+    """
+    def __init__(self, k: int = KLL_K):
+        self.k = k
+        self.n = 0
+        self.min = np.nan
+        self.max = np.nan
+        self.levels: List[np.ndarray] = [np.empty(0)]
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind so the promoted half is exact
+                keep = items[:len(items) % 2]
+                items = items[len(items) % 2:]
+                promoted = items[_rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values: np.ndarray):
+        """
+        Adds non-missing float values
+        """
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.min = float(np.fmin(self.min, values.min()))
+        self.max = float(np.fmax(self.max, values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = float(np.fmin(self.min, other.min))
+        self.max = float(np.fmax(self.max, other.max))
+        self._compress()
+
+    def quantile(self, q: float) -> float:
+        if self.n == 0:
+            return float("nan")
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2 ** level) for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, q * cumulative[-1])
+        return float(items[order][min(position, len(items) - 1)])
+
+    @property
+    def rank_error(self) -> float:
+        # Empirical single-sided bound used by the Apache DataSketches KLL implementation
+        return 2.296 / self.k ** 0.9723
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "k": self.k,
+            "n": self.n,
+            "min": self.min,
+            "max": self.max,
+            "levels": [_encode_array(items.astype(np.float64)) for items in self.levels]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(data["k"])
+        sketch.n = data["n"]
+        sketch.min = data["min"] if data["min"] is not None else np.nan
+        sketch.max = data["max"] if data["max"] is not None else np.nan
+        sketch.levels = [_decode_array(items, np.float64) for items in data["levels"]]
+        return sketch
+
+class MisraGries:
+    """
+    Heavy-hitters summary. Estimated counts never exceed the true counts and
+    undercount by at most `error`.
+    """
+    def __init__(self, capacity: int = HEAVY_HITTERS_CAPACITY):
+        self.capacity = capacity
+        self.counters = pd.Series(dtype=np.int64)
+        self.error = 0
+
+    def update(self, value_counts: pd.Series):
+        """
+        Adds exact value counts of a batch of values
+        """
+        counters = self.counters.add(value_counts, fill_value=0).astype(np.int64)
+        if len(counters) > self.capacity:
+            counters = counters.sort_values(ascending=False, kind="stable")
+            threshold = int(counters.iloc[self.capacity])
+            counters = counters.iloc[:self.capacity] - threshold
+            counters = counters[counters > 0]
+            self.error += threshold
+        self.counters = counters
+
+    def merge(self, other: "MisraGries"):
+        self.error += other.error
+        self.update(other.counters)
+
+    def top(self, n: int) -> Dict[Any, int]:
+        return self.counters.sort_values(ascending=False, kind="stable").head(n).to_dict()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "error": self.error,
+            "counters": [[_to_json_value(value), int(count)] for value, count in self.counters.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MisraGries":
+        summary = cls(data["capacity"])
+        summary.error = data["error"]
+        if data["counters"]:
+            values, counts = zip(*data["counters"])
+            summary.counters = pd.Series(counts, index=pd.Index(values, dtype=object), dtype=np.int64)
+        return summary
+
+class ColumnSketch:
+    """
+    Mergeable sketches of one column: HyperLogLog for distinct values, KLL for
+    quantiles (numeric columns only) and Misra-Gries for the most common values.
+    """
+    def __init__(self, numeric: bool):
+        self.numeric = numeric
+        self.count = 0
+        self.nulls = 0
+        self.distinct = HyperLogLog()
+        self.quantiles = KLLSketch() if numeric else None
+        self.heavy_hitters = MisraGries()
+
+    @classmethod
+    def from_series(cls, series: pd.Series, numeric: Optional[bool] = None) -> "ColumnSketch":
+        if numeric is None:
+            numeric = pd.api.types.is_numeric_dtype(series)
+        sketch = cls(numeric)
+        sketch.update(series)
+        return sketch
+
+    def update(self, series: pd.Series):
+        """
+        Adds a batch of values (missing values are only counted)
+        """
+        present = series.dropna()
+        self.count += len(series)
+        self.nulls += len(series) - len(present)
+        self.distinct.update(pd.util.hash_pandas_object(present, index=False).to_numpy())
+        if self.numeric:
+            self.quantiles.update(present.to_numpy(dtype=np.float64))
+        value_counts = present.value_counts()
+        if isinstance(value_counts.index, pd.CategoricalIndex):
+            # Categoricals also count categories that do not occur
+            value_counts = value_counts[value_counts > 0]
+            value_counts.index = value_counts.index.astype(object)
+        self.heavy_hitters.update(value_counts)
+
+    def merge(self, other: "ColumnSketch") -> "ColumnSketch":
+        self.count += other.count
+        self.nulls += other.nulls
+        self.distinct.merge(other.distinct)
+        if self.numeric:
+            self.quantiles.merge(other.quantiles)
+        self.heavy_hitters.merge(other.heavy_hitters)
+        return self
+
+    def summary(self, top_n: int = 5) -> Dict[str, Any]:
+        """
+        Returns approximate statistics together with their error bounds
+        """
+        non_null = self.count - self.nulls
+        result = {
+            "basic_stats": {
+                "basic_statistics": {
+                    "count": self.count,
+                    "unique_values": int(round(min(self.distinct.estimate(), non_null))),
+                    "missing_values": self.nulls,
+                    "missing_percentage": float(self.nulls / self.count * 100) if self.count else 0.0
+                }
+            },
+            "error_bounds": {
+                "unique_values": {"relative_standard_error": self.distinct.relative_error},
+                "most_common_values": {"max_count_underestimate": self.heavy_hitters.error}
+            }
+        }
+
+        if self.numeric:
+            result["numeric_stats"] = {
+                "median": self.quantiles.quantile(0.5),
+                "min": self.quantiles.min,
+                "max": self.quantiles.max,
+                "quartiles": {
+                    "25%": self.quantiles.quantile(0.25),
+                    "50%": self.quantiles.quantile(0.50),
+                    "75%": self.quantiles.quantile(0.75)
+                }
+            }
+            result["error_bounds"]["quantiles"] = {"normalized_rank_error": self.quantiles.rank_error}
+
+        result["categorical_stats"] = {
+            "most_common_values": self.heavy_hitters.top(top_n)
+        }
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "numeric": self.numeric,
+            "count": self.count,
+            "nulls": self.nulls,
+            "distinct": self.distinct.to_dict(),
+            "quantiles": self.quantiles.to_dict() if self.numeric else None,
+            "heavy_hitters": self.heavy_hitters.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ColumnSketch":
+        sketch = cls(data["numeric"])
+        sketch.count = data["count"]
+        sketch.nulls = data["nulls"]
+        sketch.distinct = HyperLogLog.from_dict(data["distinct"])
+        if sketch.numeric:
+            sketch.quantiles = KLLSketch.from_dict(data["quantiles"])
+        sketch.heavy_hitters = MisraGries.from_dict(data["heavy_hitters"])
+        return sketch
+
+def build_dataset_sketches(df: pd.DataFrame) -> Dict[str, ColumnSketch]:
+    """
+    Builds the sketches of every column of a DataFrame
+    """
+    return {column: ColumnSketch.from_series(df[column]) for column in df.columns}
+
+def save_dataset_sketches(dataset_id: str, sketches: Dict[str, ColumnSketch]):
+    """
+    Persists the sketches of a dataset and shares them through the registry
+    """
+    write_store_json(dataset_id, SKETCHES_FILE, {column: sketch.to_dict() for column, sketch in sketches.items()})
+    dataset_registry.put(dataset_id, sketches, "sketches")
+
+def load_dataset_sketches(dataset_id: str) -> Optional[Dict[str, ColumnSketch]]:
+    """
+    Returns the sketches of a dataset from the registry or the store,
+    or None if they were never built
+    """
+    sketches = dataset_registry.get(dataset_id, "sketches")
+    if sketches is None:
+        data = read_store_json(dataset_id, SKETCHES_FILE)
+        if data is None:
+            return None
+        sketches = {column: ColumnSketch.from_dict(sketch) for column, sketch in data.items()}
+        dataset_registry.put(dataset_id, sketches, "sketches")
+    return sketches
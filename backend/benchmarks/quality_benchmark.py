@@ -0,0 +1,97 @@
+"""
+Compares the previous data-quality computation with the fused quality engine.
+
+The previous path (AnalysisService._quality_counts) converted every cell
+of every column to a Python string twice, then built value_counts
+separately. The quality engine factorizes each column once, runs all
+checks on the distinct values and spreads the columns over the thread
+pool; it also fills in the inconsistent-data report.
+
+Run from the backend directory:
+
+    python -m benchmarks.quality_benchmark [--rows 200000] [--columns 40]
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+from app.utils.quality_engine import analyze_quality
+
+def previous_quality(df: pd.DataFrame) -> Dict[str, Any]:
+    """The per-column loop used before the quality engine"""
+    quality_analysis = {
+        "unique_counts": {},
+        "duplicate_counts": {},
+        "missing_counts": {},
+        "null_counts": {},
+        "total_rows": len(df)
+    }
+    for column in df.columns:
+        non_null_mask = ~(df[column].isna() | (df[column].astype(str).str.strip() == ''))
+        non_null_values = df.loc[non_null_mask, column]
+        quality_analysis["unique_counts"][column] = int(non_null_values.nunique())
+
+        value_counts = non_null_values.value_counts()
+        duplicates = value_counts[value_counts > 1].sum() - len(value_counts[value_counts > 1])
+        quality_analysis["duplicate_counts"][column] = int(duplicates)
+
+        missing_mask = (
+            df[column].isna() |
+            (df[column].astype(str).str.strip() == '') |
+            (df[column].isnull())
+        )
+        quality_analysis["missing_counts"][column] = int(missing_mask.sum())
+        quality_analysis["null_counts"][column] = int(df[column].isnull().sum())
+    return quality_analysis
+
+def make_dataset(rows: int, columns: int) -> pd.DataFrame:
+    """A wide, string-heavy dataset with blanks, numbers stored as text and mixed date layouts"""
+    rng = np.random.default_rng(0)
+    words = np.array([f"value_{i}" for i in range(5000)] + ["", "  "], dtype=object)
+    data = {}
+    for i in range(columns):
+        if i % 4 == 0:
+            data[f"text_{i}"] = rng.choice(words, size=rows)
+        elif i % 4 == 1:
+            data[f"code_{i}"] = rng.choice(["12", "7.5", "n/a", " 3 ", None], size=rows)
+        elif i % 4 == 2:
+            data[f"date_{i}"] = rng.choice(["2024-01-05", "2024-02-06", "01/03/2024", "Jan 5, 2024"], size=rows)
+        else:
+            data[f"float_{i}"] = np.where(rng.random(rows) < 0.05, np.nan, rng.normal(100, 15, size=rows))
+    return pd.DataFrame(data)
+
+def time_call(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--columns", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_dataset(args.rows, args.columns)
+
+    # Both paths must agree on every count they share
+    previous = previous_quality(df)
+    fused = asyncio.run(analyze_quality(df))
+    for key in ("unique_counts", "duplicate_counts", "missing_counts", "null_counts"):
+        assert previous[key] == fused[key], key
+
+    previous_time = time_call(lambda: previous_quality(df), args.repeat)
+    fused_time = time_call(lambda: asyncio.run(analyze_quality(df)), args.repeat)
+    print(f"{args.rows} rows x {args.columns} columns, best of {args.repeat}")
+    print(f"{'previous (ms)':>16}{'quality_engine (ms)':>22}{'speedup':>10}")
+    print(f"{previous_time * 1000:>16.2f}{fused_time * 1000:>22.2f}{previous_time / fused_time:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
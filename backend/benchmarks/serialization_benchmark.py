@@ -0,0 +1,143 @@
+"""
+Compares the previous response serialization path with NumpyJSONResponse.
+
+The previous path converted NumPy values with a recursive Python walk
+(AnalysisService._convert_to_native_types), then ran FastAPI's
+jsonable_encoder and json.dumps. The new path hands the service output
+straight to orjson.
+
+Run from the backend directory:
+
+    python -m benchmarks.serialization_benchmark [--rows 10000] [--columns 1000]
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+from app.models.data_models import AnalysisResult
+from app.services.analysis_service import AnalysisService
+from app.utils.json_response import dumps
+
+def convert_to_native_types(value: Any) -> Any:
+    """The recursive conversion used before NumpyJSONResponse"""
+    if isinstance(value, (np.int_, np.intc, np.intp, np.int8, np.int16, np.int32, np.int64)):
+        return int(value)
+    elif isinstance(value, (np.float16, np.float32, np.float64)):
+        return float(value)
+    elif isinstance(value, np.bool_):
+        return bool(value)
+    elif isinstance(value, np.ndarray):
+        return convert_to_native_types(value.tolist())
+    elif isinstance(value, dict):
+        return {k: convert_to_native_types(v) for k, v in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [convert_to_native_types(item) for item in value]
+    return value
+
+def previous_path(content: Any) -> bytes:
+    # Starlette's JSONResponse.render after FastAPI's jsonable_encoder
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+def make_dataset(rows: int, columns: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    data = {}
+    for i in range(columns):
+        if i % 5 == 4:
+            data[f"cat_{i}"] = rng.choice(["north", "south", "east", "west"], size=rows)
+        elif i % 2:
+            data[f"int_{i}"] = rng.integers(0, 1000, size=rows)
+        else:
+            data[f"float_{i}"] = rng.normal(100, 15, size=rows)
+    return pd.DataFrame(data)
+
+def time_call(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--columns", type=int, default=1000)
+    parser.add_argument("--head-rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df = make_dataset(args.rows, args.columns)
+    service = AnalysisService()
+
+    # Statistics as the services compute them, before any conversion
+    results = {column: service._column_analysis(df[column]) for column in df.columns}
+    description = service._describe_dataset(df)
+    head = df.head(args.head_rows)
+
+    def previous_analyses():
+        # Results used to be converted before they were wrapped in models
+        return previous_path({
+            "success": True,
+            "column_analyses": {
+                column: AnalysisResult(column_name=column, analysis_type="full", result=convert_to_native_types(result))
+                for column, result in results.items()
+            }
+        })
+
+    def new_analyses():
+        return dumps({
+            "success": True,
+            "column_analyses": {
+                column: AnalysisResult(column_name=column, analysis_type="full", result=result)
+                for column, result in results.items()
+            }
+        })
+
+    def previous_head():
+        return previous_path({
+            "columns": list(head.columns),
+            "data": head.values.tolist(),
+            "preview": head.to_dict(orient="records")
+        })
+
+    def new_head():
+        rows = head.values.tolist()
+        columns = list(head.columns)
+        return dumps({
+            "columns": columns,
+            "data": rows,
+            "preview": [dict(zip(columns, row)) for row in rows]
+        })
+
+    cases: Dict[str, Dict[str, Callable[[], Any]]] = {
+        "all column analyses": {
+            "previous": previous_analyses,
+            "numpy_json": new_analyses
+        },
+        "describe": {
+            "previous": lambda: previous_path(convert_to_native_types(description)),
+            "numpy_json": lambda: dumps(description)
+        },
+        f"head ({args.head_rows} rows)": {
+            "previous": previous_head,
+            "numpy_json": new_head
+        }
+    }
+
+    print(f"{args.rows} rows x {args.columns} columns, best of {args.repeat}")
+    print(f"{'payload':<24}{'previous (ms)':>16}{'numpy_json (ms)':>18}{'speedup':>10}")
+    for name, paths in cases.items():
+        previous = time_call(paths["previous"], args.repeat)
+        new = time_call(paths["numpy_json"], args.repeat)
+        print(f"{name:<24}{previous * 1000:>16.2f}{new * 1000:>18.2f}{previous / new:>9.1f}x")
+
+if __name__ == "__main__":
+    main()